@@ -0,0 +1,131 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from docx import Document
+
+from docx_tables import HEADER_FILL, add_table, format_value
+
+# Word table benchmark.
+# Builds a DataFrame (default 1,000 rows, item-level loading table layout) with
+# docx_tables.add_table and reports the median build time, alone and including
+# `doc.save`. The per-cell `table.cell(i, j).text` loop the generators used to run is
+# timed once on a smaller table (`--per-cell-rows`; it is quadratic, ~40 s at 200 rows)
+# and extrapolated to the full size; both writers must produce the same cell text on it.
+# Bulk times are compared against benchmarks/docx_tables.json; a slowdown beyond the
+# tolerance fails the run.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'docx_tables.json')
+LATEST_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'docx_tables_latest.json')
+METRICS = ['per_cell_s', 'per_cell_est_s', 'bulk_s', 'bulk_save_s']
+
+def sample_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = np.array(['FS', 'PT', 'EC', 'PD'])
+    return pd.DataFrame({
+        'Latent': factors[rng.integers(0, 4, n_rows)],
+        'Item': [f"I{i}" for i in range(n_rows)],
+        'Estimate': rng.normal(0.6, 0.2, n_rows),
+        'Std. Err': rng.uniform(0.02, 0.1, n_rows),
+        'z-value': rng.normal(12, 4, n_rows),
+        'p-value': rng.uniform(0, 0.01, n_rows),
+    })
+
+def per_cell(doc, df, float_format='.3f'):
+    """The cell-by-cell loop (with header shading) the generators used before docx_tables."""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    table = doc.add_table(rows=df.shape[0] + 1, cols=df.shape[1])
+    table.style = 'Table Grid'
+    for j, col in enumerate(df.columns):
+        table.cell(0, j).text = str(col)
+        shd = OxmlElement('w:shd')
+        shd.set(qn('w:fill'), HEADER_FILL)
+        table.cell(0, j)._tc.get_or_add_tcPr().append(shd)
+    for i, row in enumerate(df.itertuples(index=False)):
+        for j, val in enumerate(row):
+            table.cell(i + 1, j).text = format_value(val, float_format)
+    return table
+
+def cell_texts(doc):
+    return [[c.text for c in row.cells] for row in doc.tables[0].rows]
+
+def timed(build, df):
+    doc = Document()
+    t0 = time.perf_counter()
+    build(doc, df)
+    t1 = time.perf_counter()
+    doc.save(io.BytesIO())
+    return doc, t1 - t0, time.perf_counter() - t0
+
+def measure(n_rows, per_cell_rows, repeats):
+    df = sample_frame(n_rows)
+    bulk_runs, bulk_save_runs = [], []
+    for _ in range(repeats):
+        _, t, t_save = timed(add_table, df)
+        bulk_runs.append(t)
+        bulk_save_runs.append(t_save)
+    small = df.head(per_cell_rows)
+    old_doc, per_cell_s, _ = timed(per_cell, small)
+    new_doc, _, _ = timed(add_table, small)
+    return {'per_cell_s': round(per_cell_s, 4),
+            'per_cell_est_s': round(per_cell_s * (n_rows / len(small)) ** 2, 1),
+            'bulk_s': round(statistics.median(bulk_runs), 4),
+            'bulk_save_s': round(statistics.median(bulk_save_runs), 4),
+            'identical': cell_texts(old_doc) == cell_texts(new_doc)}
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-cell vs bulk python-docx table building.")
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--per-cell-rows', type=int, default=100, help="Table size for timing the per-cell loop")
+    parser.add_argument('--repeats', type=int, default=3, help="Runs per method (median is reported)")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative slowdown of the bulk writer")
+    parser.add_argument('--update-baseline', action='store_true', help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    result = measure(args.rows, args.per_cell_rows, args.repeats)
+    payload = {'generated': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0],
+               'rows': args.rows, 'per_cell_rows': args.per_cell_rows, 'repeats': args.repeats, **result,
+               'speedup': round(result['per_cell_est_s'] / result['bulk_s'])}
+    write_json(LATEST_FILE, payload)
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r') as f:
+            baseline = json.load(f)
+    print(f"\n{args.rows}-row table (per-cell loop timed at {args.per_cell_rows} rows)")
+    print(f"{'metric':<16}{'now s':>10}{'base s':>10}")
+    for m in METRICS:
+        ref = baseline.get(m)
+        print(f"{m:<16}{result[m]:>10.3f}{(format(ref, '.3f') if ref is not None else '-'):>10}")
+    print(f"estimated speedup at {args.rows} rows: {payload['speedup']}x, identical cell text: {result['identical']}")
+
+    if not result['identical']:
+        print("\n[FAIL] The bulk writer produced different cell text than the per-cell loop.")
+        return 1
+    if args.update_baseline:
+        write_json(BASELINE_FILE, payload)
+        print(f"\n[SUCCESS] Baseline updated: {BASELINE_FILE}")
+        return 0
+    ref = baseline.get('bulk_s')
+    if ref is not None and baseline.get('rows') == args.rows and result['bulk_s'] > ref * (1 + args.tolerance):
+        print(f"\n[FAIL] bulk_s: {result['bulk_s']:.3f}s vs baseline {ref:.3f}s")
+        return 1
+    print("\n[SUCCESS] No table-building regressions." if baseline else
+          "\n[WARN] No baseline; run with --update-baseline to create one.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import pipeline_profile
+import pipeline_runner
+from pipeline_runner import STAGES, find_r, execute, log
+import synthetic_iri
+
+# End-to-end scale benchmark.
+# For every scale, synthetic raw workbooks are generated into a scratch directory and
+# each pipeline stage script runs there in its own process, so wall time, CPU time and
+# peak RSS are per stage. Hot sections (Excel load, Mahalanobis, CFA fit, linkage, ...)
+# are reported next to the stages. The CFA, figure and manuscript caches live in the
+# scratch directory, so every scale measures a cold build whatever the repository's
+# .cache holds. Results are compared against a stored baseline and the run fails when
+# a stage got slower or heavier than the tolerance allows.
+# Each scale runs --repeat times and every stage/section keeps its median. A fixed
+# calibration workload (interpreter loop + matrix products) is timed right before and
+# after every stage and stored with its row; the gate compares the baseline time scaled
+# by the ratio of the two calibrations, so a slower, throttled or busy machine does not
+# fail it on unchanged code.
+
+BENCH_DIR = os.path.join(pipeline_runner.ROOT_DIR, 'benchmarks')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+LATEST_FILE = os.path.join(BENCH_DIR, 'latest.json')
+
+BENCH_STAGES = ['prep', 'playground', 'sem', 'clustering', 'qca', 'plots', 'summary', 'manuscript']
+DEFAULT_SCALES = [2322, 10000]
+# Above this many respondents the raw data is written as CSV (openpyxl is the bottleneck otherwise)
+XLSX_MAX_ROWS = 20000
+# Persistent caches redirected into the scratch directory (environment variable -> path)
+CACHE_ENV = {'MAP8_CFA_CACHE': 'cfa_cache.sqlite', 'MAP8_FIGURE_CACHE': 'figures', 'MAP8_DOCX_CACHE': 'docx'}
+DEFAULT_REPEAT = 3
+# Allowed relative slowdown / peak RSS growth (after calibration); override with
+# --time-tolerance / --mem-tolerance or MAP8_BENCH_TIME_TOL / MAP8_BENCH_MEM_TOL
+TIME_TOL = 0.3
+MEM_TOL = 0.25
+
+def stage_cmd(stage):
+    script = os.path.join(pipeline_runner.ROOT_DIR, stage.script)
+    if stage.kind == 'python':
+        return [sys.executable, script]
+    r_path = find_r()
+    if r_path is None:
+        return None
+    return [r_path, '--silent', '--no-echo', '--no-save', '--no-restore', '-f', script]
+
+def memory_limit(limit_mb):
+    """preexec_fn capping the child's address space, so an O(n^2) step fails instead of swapping."""
+    if not limit_mb:
+        return None
+    import resource
+    def apply():
+        limit = int(limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply
+
+def run_scale(n, stages, seed=0, fmt=None, mem_limit_mb=None, keep=False):
+    """Benchmark one scale; returns a list of result rows (stages and their hot sections)."""
+    by_name = {s.name: s for s in STAGES}
+    workdir = tempfile.mkdtemp(prefix=f'map8_bench_{n}_')
+    rows = []
+    saved_env = {var: os.environ.get(var) for var in CACHE_ENV}
+    os.environ.update({var: os.path.join(workdir, '.cache', name) for var, name in CACHE_ENV.items()})
+    try:
+        fmt = fmt or ('xlsx' if n <= XLSX_MAX_ROWS else 'csv')
+        start = time.perf_counter()
+        synthetic_iri.write_raw(synthetic_iri.generate(n, seed=seed), workdir, fmt)
+        log(f"[*] n={n}: synthetic data ({fmt}) written in {time.perf_counter() - start:.1f}s -> {workdir}")
+        for name in stages:
+            stage = by_name[name]
+            cmd = stage_cmd(stage)
+            row = {'scale': n, 'stage': name, 'section': None}
+            if cmd is None:
+                log(f"[SKIP] {name}: R not found")
+                rows.append(dict(row, status='skipped'))
+                continue
+            before = calibrate()
+            result = execute(stage, cmd, cwd=workdir, preexec_fn=memory_limit(mem_limit_mb))
+            calibration = round(min(before, calibrate()), 4)  # the less disturbed of the two
+            rows.append(dict(row, status='ok' if result['ok'] else 'failed', wall_s=result['wall_s'],
+                             cpu_s=result['cpu_s'], peak_rss_mb=result['peak_rss_mb'], rows=result['rows'],
+                             calibration_s=calibration))
+            for sec in pipeline_profile.aggregate_sections(result['sections']):
+                rows.append({'scale': n, 'stage': name, 'section': sec['name'], 'status': 'ok',
+                             'wall_s': sec['wall_s'], 'cpu_s': sec['cpu_s'],
+                             'peak_rss_mb': sec['peak_rss_mb'], 'rows': sec['rows'],
+                             'calibration_s': calibration})
+    finally:
+        for var, value in saved_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+        if keep:
+            log(f"[*] kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+def calibrate(repeats=1):
+    """Median wall time (s) of a fixed CPU workload, the machine-speed yardstick."""
+    a = np.random.default_rng(0).standard_normal((200, 200))
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        total = 0
+        for i in range(1500000):
+            total += i * i % 7
+        for _ in range(200):
+            a @ a
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def row_key(row):
+    return f"{row['scale']}/{row['stage']}" + (f"/{row['section']}" if row['section'] else '')
+
+def median_rows(runs):
+    """One row per stage/section: the median wall, CPU and peak RSS over repeated runs."""
+    by_key = {}
+    for rows in runs:
+        for row in rows:
+            by_key.setdefault(row_key(row), []).append(row)
+    out = []
+    for reps in by_key.values():
+        row = dict(reps[0])
+        failed = [r['status'] for r in reps if r['status'] != 'ok']
+        if failed:
+            row['status'] = failed[0]
+        for k in ['wall_s', 'cpu_s', 'peak_rss_mb', 'calibration_s']:
+            values = [r[k] for r in reps if r.get(k) is not None]
+            if values:
+                row[k] = round(float(np.median(values)), 4)
+        row['repeats'] = len(reps)
+        out.append(row)
+    return out
+
+def expected_wall(row, ref):
+    """Baseline wall time of `ref` scaled to the machine speed `row` was measured at."""
+    if row.get('calibration_s') and ref.get('calibration_s'):
+        return ref['wall_s'] * row['calibration_s'] / ref['calibration_s']
+    return ref['wall_s']
+
+def compare(results, baseline, time_tol=TIME_TOL, mem_tol=MEM_TOL, min_time_s=0.5, min_mem_mb=50):
+    """Regressions of `results` against `baseline` (both lists of result rows)."""
+    base = {row_key(r): r for r in baseline}
+    regressions = []
+    for row in results:
+        ref = base.get(row_key(row))
+        if ref is None or ref['status'] != 'ok':
+            continue
+        key = row_key(row)
+        if row['status'] != 'ok':
+            regressions.append(f"{key}: {row['status']} (baseline ok)")
+            continue
+        ref_wall = expected_wall(row, ref)
+        if row['wall_s'] > ref_wall * (1 + time_tol) and row['wall_s'] - ref_wall > min_time_s:
+            regressions.append(f"{key}: wall {row['wall_s']:.2f}s vs baseline {ref_wall:.2f}s (calibrated)")
+        if (row.get('peak_rss_mb') and ref.get('peak_rss_mb')
+                and row['peak_rss_mb'] > ref['peak_rss_mb'] * (1 + mem_tol)
+                and row['peak_rss_mb'] - ref['peak_rss_mb'] > min_mem_mb):
+            regressions.append(f"{key}: peak RSS {row['peak_rss_mb']:.0f}MB vs baseline {ref['peak_rss_mb']:.0f}MB")
+    return regressions
+
+def print_table(results, baseline):
+    base = {row_key(r): r for r in baseline}
+    print("\nBaseline times are scaled to the calibration measured next to each stage.")
+    print(f"\n{'scale/stage/section':<42}{'status':>8}{'wall s':>10}{'base s':>10}{'RSS MB':>9}{'base MB':>9}")
+    for row in results:
+        ref = base.get(row_key(row), {})
+        if ref.get('wall_s') is not None and row.get('wall_s') is not None:
+            ref = dict(ref, wall_s=expected_wall(row, ref))
+        def num(r, k, spec):
+            return format(r[k], spec) if r.get(k) is not None else '-'
+        print(f"{row_key(row):<42}{row['status']:>8}{num(row, 'wall_s', '.2f'):>10}{num(ref, 'wall_s', '.2f'):>10}"
+              f"{num(row, 'peak_rss_mb', '.0f'):>9}{num(ref, 'peak_rss_mb', '.0f'):>9}")
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MAP-8 pipeline on synthetic data at several scales.")
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated respondent counts (e.g. 2322,10000,100000,1000000)")
+    parser.add_argument('--stages', default=','.join(BENCH_STAGES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default=None,
+                        help=f"Raw file format (default: xlsx up to {XLSX_MAX_ROWS} respondents, csv above)")
+    parser.add_argument('--mem-limit-mb', type=int, default=8192, help="Address-space cap per stage (0 = none)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="Runs per scale; every stage and section keeps its median")
+    parser.add_argument('--time-tolerance', type=float, default=float(os.environ.get('MAP8_BENCH_TIME_TOL', TIME_TOL)),
+                        help="Allowed relative slowdown after calibration")
+    parser.add_argument('--mem-tolerance', type=float, default=float(os.environ.get('MAP8_BENCH_MEM_TOL', MEM_TOL)),
+                        help="Allowed relative peak RSS growth")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--update-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch directories")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',') if s]
+    stages = [s for s in args.stages.split(',') if s]
+    unknown = set(stages) - {s.name for s in STAGES}
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    for n in scales:
+        results += median_rows([run_scale(n, stages, seed=args.seed, fmt=args.format,
+                                          mem_limit_mb=args.mem_limit_mb, keep=args.keep)
+                                for _ in range(max(args.repeat, 1))])
+    payload = {'generated': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0],
+               'cpu_count': os.cpu_count(), 'repeat': max(args.repeat, 1), 'results': results}
+    write_json(LATEST_FILE, payload)
+
+    baseline = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+    print_table(results, baseline)
+
+    if args.update_baseline:
+        write_json(args.baseline, payload)
+        print(f"\n[SUCCESS] Baseline updated: {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"\n[WARN] No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    regressions = compare(results, baseline, args.time_tolerance, args.mem_tolerance)
+    if regressions:
+        print("\n[FAIL] Performance regressions:")
+        for r in regressions:
+            print(f"  - {r}")
+        return 1
+    print("\n[SUCCESS] No regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
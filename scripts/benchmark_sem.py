@@ -0,0 +1,175 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from semopy import Model, calc_stats
+
+import synthetic_iri
+from sem_estimator import DEFAULT_ESTIMATOR, ESTIMATOR_FILE, cfa_description
+
+# CFA estimator benchmark.
+# Fits the 4-factor IRI model (and reduced item sets) across semopy objectives,
+# scipy solvers, cold vs. warm starts and dataset sizes. Every fit is compared with
+# the reference estimator (MLW + SLSQP, cold start) on the same data: standardized
+# loadings and CFI / RMSEA must agree within tolerance. `--select` stores the fastest
+# objective/solver that converged and agreed everywhere as the pipeline estimator.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'sem_estimators.csv')
+REAL_DATA = os.path.join(ROOT_DIR, '01_harmonized', 'df_iri_clean_with_md.csv')
+
+OBJECTIVES = ['MLW', 'ULS', 'GLS']
+SOLVERS = ['SLSQP', 'L-BFGS-B', 'TNC']
+STARTS = ['cold', 'warm']
+DEFAULT_SIZES = [500, 2000, 10000]
+
+item_lists = {
+    'FS': [f"FS{i}" for i in [1, 5, 7, 12, 16, 23, 26]],
+    'PT': [f"PT{i}" for i in [3, 8, 11, 15, 21, 25, 28]],
+    'EC': [f"EC{i}" for i in [2, 4, 9, 14, 18, 20, 22]],
+    'PD': [f"PD{i}" for i in [6, 10, 13, 17, 19, 24, 27]]
+}
+MODEL_VARIANTS = {
+    'full_28': item_lists,
+    # Items most often dropped in the IRI literature (FS7, PT3, PT15, EC4, EC14, PD13, PD19)
+    'reduced_21': {k: [i for i in v if i not in ('FS7', 'PT3', 'PT15', 'EC4', 'EC14', 'PD13', 'PD19')]
+                   for k, v in item_lists.items()},
+    'short_16': {k: v[:4] for k, v in item_lists.items()},
+}
+TOLERANCE = {'loading': 0.02, 'CFI': 0.005, 'RMSEA': 0.005}
+
+def datasets(sizes, seed=0, use_real=True):
+    """{label: item DataFrame}: synthetic data per size, plus the real cleaned sample."""
+    model = synthetic_iri.population_model(seed)
+    rng = np.random.default_rng(seed)
+    out = {}
+    for n in sizes:
+        items, _ = synthetic_iri.sample_items(n, model, rng, careless_rate=0.0, outlier_rate=0.0)
+        out[f"synthetic_{n}"] = pd.DataFrame(items, columns=synthetic_iri.all_items).astype(float)
+    if use_real and os.path.exists(REAL_DATA):
+        out['real_with_md'] = pd.read_csv(REAL_DATA)[synthetic_iri.all_items]
+    return out
+
+def summarize(model):
+    std = model.inspect(std_est=True)
+    loadings = std[std['op'] == '~'].set_index(['rval', 'lval'])['Est. Std'].astype(float)
+    stats = calc_stats(model).iloc[0]
+    return loadings, {'CFI': float(stats['CFI']), 'RMSEA': float(stats['RMSEA'])}
+
+def timed_fit(desc, data, obj, solver, start, seed):
+    """One fit; a warm start first fits a 90% subsample (untimed), as after a filter change."""
+    model = Model(desc)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if start == 'warm':
+            model.fit(data.sample(frac=0.9, random_state=seed), obj=obj, solver=solver)
+        t0 = time.perf_counter()
+        res = model.fit(data, obj=obj, solver=solver, clean_slate=False)
+        elapsed = time.perf_counter() - t0
+    return model, res, elapsed
+
+def bench_case(label, data, variant, obj, solver, start, repeats, reference, seed):
+    desc = cfa_description(MODEL_VARIANTS[variant])
+    row = {'dataset': label, 'n': len(data), 'model': variant, 'obj': obj, 'solver': solver, 'start': start}
+    times = []
+    try:
+        for r in range(repeats):
+            model, res, elapsed = timed_fit(desc, data, obj, solver, start, seed + r)
+            times.append(elapsed)
+        loadings, fit = summarize(model)
+        row.update(time_s=round(float(np.median(times)), 4), n_it=res.n_it, success=bool(res.success),
+                   fun=float(res.fun), CFI=fit['CFI'], RMSEA=fit['RMSEA'], error='')
+        if reference is not None:
+            ref_loadings, ref_fit = reference
+            row['max_loading_diff'] = float((loadings - ref_loadings).abs().max())
+            row['d_CFI'] = abs(fit['CFI'] - ref_fit['CFI'])
+            row['d_RMSEA'] = abs(fit['RMSEA'] - ref_fit['RMSEA'])
+        return row, (loadings, fit)
+    except Exception as e:
+        row.update(success=False, error=f"{type(e).__name__}: {e}")
+        return row, None
+
+def within_tolerance(row, tol=TOLERANCE):
+    return (bool(row.get('success'))
+            and row.get('max_loading_diff', 0) <= tol['loading']
+            and row.get('d_CFI', 0) <= tol['CFI']
+            and row.get('d_RMSEA', 0) <= tol['RMSEA'])
+
+def run_benchmark(data_sets, variants, objectives, solvers, starts, repeats=3, seed=0):
+    rows = []
+    ref_key = (DEFAULT_ESTIMATOR['obj'], DEFAULT_ESTIMATOR['solver'], 'cold')
+    grid = [ref_key] + [k for k in itertools.product(objectives, solvers, starts) if k != ref_key]
+    for (label, data), variant in itertools.product(data_sets.items(), variants):
+        reference = None
+        for obj, solver, start in grid:
+            row, summary = bench_case(label, data, variant, obj, solver, start, repeats, reference, seed)
+            if (obj, solver, start) == ref_key:
+                reference = summary
+            row['within_tolerance'] = within_tolerance(row)
+            rows.append(row)
+            print(f"  {label:<16}{variant:<12}{obj:<5}{solver:<10}{start:<6}"
+                  f"{row.get('time_s', float('nan')):>8.3f}s  it={row.get('n_it', '-')!s:<5}"
+                  f"{'ok' if row['within_tolerance'] else 'REJECT'} {row.get('error', '')}")
+    return pd.DataFrame(rows)
+
+def select_estimator(df):
+    """Fastest cold-start objective/solver that converged within tolerance on every case."""
+    cold = df[df['start'] == 'cold']
+    summary = cold.groupby(['obj', 'solver']).agg(
+        cases=('within_tolerance', 'size'), passed=('within_tolerance', 'sum'), total_time_s=('time_s', 'sum'))
+    eligible = summary[summary['passed'] == summary['cases']].sort_values('total_time_s')
+    if eligible.empty:
+        return None, summary
+    obj, solver = eligible.index[0]
+    return {'obj': obj, 'solver': solver}, summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark semopy objectives, solvers and warm starts for the IRI CFA.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--models', default=','.join(MODEL_VARIANTS))
+    parser.add_argument('--objectives', default=','.join(OBJECTIVES))
+    parser.add_argument('--solvers', default=','.join(SOLVERS))
+    parser.add_argument('--starts', default=','.join(STARTS))
+    parser.add_argument('--repeats', type=int, default=3, help="Timed fits per case (median is reported)")
+    parser.add_argument('--no-real', action='store_true', help="Skip the real cleaned sample")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--select', action='store_true',
+                        help=f"Write the fastest estimator within tolerance to {os.path.relpath(ESTIMATOR_FILE, ROOT_DIR)}")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)  # semopy logs every non-converged fit; they are recorded instead
+    split = lambda s: [x for x in s.split(',') if x]
+    data_sets = datasets([int(n) for n in split(args.sizes)], args.seed, not args.no_real)
+    df = run_benchmark(data_sets, split(args.models), split(args.objectives), split(args.solvers),
+                       split(args.starts), args.repeats, args.seed)
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    df.to_csv(RESULTS_FILE, index=False)
+    print(f"\n[SUCCESS] Results saved to {RESULTS_FILE}")
+
+    warm = df.pivot_table(index=['dataset', 'model', 'obj', 'solver'], columns='start', values='time_s')
+    if {'cold', 'warm'} <= set(warm.columns):
+        print(f"Median warm-start speedup: {(warm['cold'] / warm['warm']).median():.2f}x")
+
+    choice, summary = select_estimator(df)
+    print("\n=== Cold-start estimators (all cases) ===")
+    print(summary.sort_values('total_time_s').to_string())
+    if choice is None:
+        print("\n[WARN] No estimator stayed within tolerance on every case; keeping the default.")
+        return 1
+    print(f"\nFastest within tolerance: obj={choice['obj']}, solver={choice['solver']}")
+    if args.select:
+        with open(ESTIMATOR_FILE, 'w') as f:
+            json.dump({**choice, 'tolerance': TOLERANCE, 'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'cases': sorted(df['dataset'].unique().tolist())}, f, indent=2)
+        print(f"[SUCCESS] Estimator selection written to {ESTIMATOR_FILE}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Streamlit playground cold-start benchmark.
+# Each repeat runs the app headless (streamlit.testing AppTest) in a fresh interpreter,
+# as a new container would, and records: the import of the Streamlit test harness, the
+# app's first script run (its imports, data load and cache fills), a warm rerun, the
+# playground data load from CSV vs. the Feather copy, and which heavy modules (semopy,
+# factor_analyzer, scipy.stats, plotly.figure_factory) got imported on the landing page.
+# Medians are compared against benchmarks/startup.json; a heavy import on the landing page
+# or a slowdown beyond the tolerance fails the run.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'startup.json')
+LATEST_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'startup_latest.json')
+HEAVY_MODULES = ['semopy', 'factor_analyzer', 'scipy.stats', 'plotly.figure_factory']
+METRICS = ['harness_import_s', 'first_run_s', 'rerun_s', 'csv_load_s', 'feather_load_s']
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file('streamlit_app.py', default_timeout=300).run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+failed = bool(at.exception)
+heavy = [m for m in json.loads(sys.argv[1]) if m in sys.modules]
+sys.path.insert(0, 'scripts')
+import pandas as pd
+import playground_engine as engine
+t4 = time.perf_counter()
+pd.read_csv(engine.PLAYGROUND_FILE)
+t5 = time.perf_counter()
+pd.read_feather(engine.PLAYGROUND_BINARY)
+t6 = time.perf_counter()
+print(json.dumps({'harness_import_s': t1 - t0, 'first_run_s': t2 - t1, 'rerun_s': t3 - t2,
+                  'csv_load_s': t5 - t4, 'feather_load_s': t6 - t5, 'heavy_modules': heavy, 'failed': failed}))
+'''
+
+def measure(repeats):
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', CHILD, json.dumps(HEAVY_MODULES)], cwd=ROOT_DIR,
+                             capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    result = {m: round(statistics.median(r[m] for r in runs), 4) for m in METRICS}
+    result['heavy_modules'] = sorted({m for r in runs for m in r['heavy_modules']})
+    result['failed'] = any(r['failed'] for r in runs)
+    return result
+
+def compare(result, baseline, tol=0.25, min_s=0.2):
+    problems = []
+    if result['failed']:
+        problems.append("the app raised an exception on start-up")
+    if result['heavy_modules']:
+        problems.append(f"heavy modules imported on the landing page: {', '.join(result['heavy_modules'])}")
+    for m in METRICS:
+        ref = baseline.get(m)
+        if ref is not None and result[m] > ref * (1 + tol) and result[m] - ref > min_s:
+            problems.append(f"{m}: {result[m]:.3f}s vs baseline {ref:.3f}s")
+    return problems
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Streamlit playground cold start.")
+    parser.add_argument('--repeats', type=int, default=3, help="Fresh-interpreter runs (median is reported)")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument('--update-baseline', action='store_true', help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    result = measure(args.repeats)
+    payload = {'generated': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0],
+               'cpu_count': os.cpu_count(), 'repeats': args.repeats, **result}
+    write_json(LATEST_FILE, payload)
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r') as f:
+            baseline = json.load(f)
+    print(f"\n{'metric':<20}{'now s':>10}{'base s':>10}")
+    for m in METRICS:
+        ref = baseline.get(m)
+        print(f"{m:<20}{result[m]:>10.3f}{(format(ref, '.3f') if ref is not None else '-'):>10}")
+    print(f"heavy modules on landing page: {', '.join(result['heavy_modules']) or 'none'}")
+
+    if args.update_baseline:
+        write_json(BASELINE_FILE, payload)
+        print(f"\n[SUCCESS] Baseline updated: {BASELINE_FILE}")
+        return 0
+    problems = compare(result, baseline, args.tolerance)
+    if problems:
+        print("\n[FAIL] Start-up regressions:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print("\n[SUCCESS] No start-up regressions." if baseline else
+          "\n[WARN] No baseline; run with --update-baseline to create one.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
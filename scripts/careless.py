@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Careless-responding indices over the 28 IRI items, vectorized across respondents.
+# Every index is computed on the whole respondents x items matrix at once (no per-row
+# Python loops) and extends the attention checks (calc_qc) and the Mahalanobis screen:
+#   longstring_max/avg  longest and average run of identical consecutive answers,
+#                       in questionnaire order (runs found with np.diff/np.cumsum)
+#   irv                 intra-individual response variability (SD of the 28 answers)
+#   even_odd            even-odd consistency: per subscale, the mean of the odd- and of
+#                       the even-numbered items, correlated across the 4 subscales
+#                       (Spearman-Brown corrected; with only 4 subscales the index is
+#                       noisy, so its filter flags negative consistency, not < .30)
+#   synonyms/antonyms   within-person correlation over item pairs that correlate
+#                       strongly positively / negatively in the sample (antonyms on the
+#                       answers as administered, i.e. reverse-keyed items un-reversed)
+#   person_total        correlation of a respondent's answers with the item means of
+#                       everyone else
+# FILTERS turns the indices into QC rules; step 2 (MAP8_CARELESS, e.g.
+# MAP8_CARELESS=longstring,irv) and the playground (sidebar) choose which of them drop
+# cases. NaN never flags: straightliners have no
+# within-person correlations and are caught by longstring/irv instead.
+
+SUBSCALES = {
+    'FS': [f"FS{i}" for i in [1, 5, 7, 12, 16, 23, 26]],
+    'PT': [f"PT{i}" for i in [3, 8, 11, 15, 21, 25, 28]],
+    'EC': [f"EC{i}" for i in [2, 4, 9, 14, 18, 20, 22]],
+    'PD': [f"PD{i}" for i in [6, 10, 13, 17, 19, 24, 27]]
+}
+# Questionnaire order (item number 1..28)
+ITEMS = sorted((i for items in SUBSCALES.values() for i in items), key=lambda c: int(c[2:]))
+# Reverse-keyed items (reversed in the harmonized data)
+REVERSED_ITEMS = ['FS7', 'FS12', 'PT3', 'PT15', 'EC4', 'EC14', 'EC18', 'PD13', 'PD19']
+SCALE_MAX = 5
+
+# Psychometric synonym/antonym pairs: |r| >= PAIR_CRITVAL, or the MIN_PAIRS strongest
+# pairs when fewer reach it (no IRI item pair reaches the conventional .60)
+PAIR_CRITVAL = 0.60
+MIN_PAIRS = 6
+
+INDICES = ['longstring_max', 'longstring_avg', 'irv', 'even_odd', 'synonyms', 'antonyms', 'person_total']
+# Filter -> (index column, comparison, cutoff, label); a case is flagged when the comparison holds
+FILTERS = {
+    'longstring': ('longstring_max', '>=', 14, "Longstring (14+ identical answers in a row)"),
+    'irv': ('irv', '<', 0.5, "Low response variability (IRV < 0.5)"),
+    'even_odd': ('even_odd', '<', 0.0, "Even-odd inconsistency (< 0)"),
+    'synonyms': ('synonyms', '<', 0.0, "Psychometric synonyms (r < 0)"),
+    'antonyms': ('antonyms', '>', 0.0, "Psychometric antonyms (r > 0)"),
+    'person_total': ('person_total', '<', 0.0, "Person-total correlation (r < 0)"),
+}
+_OPS = {'<': np.less, '>': np.greater, '>=': np.greater_equal}
+
+def row_corr(a, b):
+    """Pearson correlation of every row of `a` with the same row of `b`, over pairwise complete cells."""
+    ok = ~(np.isnan(a) | np.isnan(b))
+    n = ok.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ma = np.where(ok, a, 0).sum(axis=1) / n
+        mb = np.where(ok, b, 0).sum(axis=1) / n
+        da = np.where(ok, a - ma[:, None], 0)
+        db = np.where(ok, b - mb[:, None], 0)
+        r = (da * db).sum(axis=1) / np.sqrt((da ** 2).sum(axis=1) * (db ** 2).sum(axis=1))
+    r[n < 3] = np.nan
+    return r
+
+def longstring(X):
+    """(longest, average) run length of identical consecutive answers per row; a missing answer breaks a run."""
+    n, k = X.shape
+    starts = np.ones((n, k), dtype=bool)
+    starts[:, 1:] = np.diff(X, axis=1) != 0  # NaN differences start a new run
+    run_id = np.cumsum(starts, axis=1) - 1   # 0-based run number within the row
+    lengths = np.bincount((run_id + np.arange(n)[:, None] * k).ravel(), minlength=n * k).reshape(n, k)
+    return lengths.max(axis=1), k / (run_id[:, -1] + 1)
+
+def even_odd(df):
+    halves = {'odd': [], 'even': []}
+    for items in SUBSCALES.values():
+        ordered = sorted(items, key=lambda c: int(c[2:]))
+        halves['odd'].append(df[ordered[0::2]].mean(axis=1))
+        halves['even'].append(df[ordered[1::2]].mean(axis=1))
+    r = row_corr(np.column_stack(halves['odd']), np.column_stack(halves['even']))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.maximum(2 * r / (1 + r), -1)  # r = -1 gives -inf; bounded to [-1, 1]
+
+def psychometric_pairs(X, sign, critval=PAIR_CRITVAL, min_pairs=MIN_PAIRS):
+    """Item index pairs with sample correlation >= critval (sign=1) or <= -critval (sign=-1)."""
+    r = sign * pd.DataFrame(X).corr().to_numpy()
+    i, j = np.triu_indices_from(r, k=1)
+    order = np.argsort(-r[i, j], kind='stable')
+    keep = order[r[i, j][order] >= critval]
+    if len(keep) < min_pairs:
+        keep = order[:min_pairs]
+    return i[keep], j[keep]
+
+def indices(df, items=None):
+    """DataFrame of the careless-responding indices (columns INDICES) for every row of `df`."""
+    items = items or ITEMS
+    X = df[items].to_numpy(dtype=float)
+    out = pd.DataFrame(index=df.index)
+    out['longstring_max'], out['longstring_avg'] = longstring(X)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['irv'] = np.nanstd(X, axis=1, ddof=1)
+    out['even_odd'] = even_odd(df)
+    i, j = psychometric_pairs(X, 1)
+    out['synonyms'] = row_corr(X[:, i], X[:, j])
+    administered = X.copy()
+    reversed_cols = [items.index(c) for c in REVERSED_ITEMS if c in items]
+    administered[:, reversed_cols] = SCALE_MAX + 1 - administered[:, reversed_cols]
+    i, j = psychometric_pairs(administered, -1)
+    out['antonyms'] = row_corr(administered[:, i], administered[:, j])
+    # Leave-one-out item means: (column sum - own answer) / (column count - 1)
+    answered = ~np.isnan(X)
+    sums, counts = np.nansum(X, axis=0), answered.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        others = np.where(answered, (sums - np.nan_to_num(X)) / (counts - 1), np.nan)
+    out['person_total'] = row_corr(X, others)
+    return out
+
+def filter_setting():
+    """Filters step 2 applies: MAP8_CARELESS (comma-separated FILTERS names), default none."""
+    names = [n.strip() for n in os.environ.get('MAP8_CARELESS', '').lower().split(',') if n.strip()]
+    unknown = [n for n in names if n not in FILTERS]
+    if unknown:
+        raise ValueError(f"MAP8_CARELESS must name filters from {list(FILTERS)}, not {unknown}")
+    return names
+
+def flagged(df, filters):
+    """Boolean array: rows of `df` (with the index columns) flagged by any of `filters`."""
+    flag = np.zeros(len(df), dtype=bool)
+    for name in filters:
+        column, op, cutoff, _ = FILTERS[name]
+        flag |= _OPS[op](df[column].to_numpy(dtype=float), cutoff)
+    return flag
@@ -0,0 +1,138 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+import pickle
+import re
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+
+import pandas as pd
+
+from sem_estimator import ROOT_DIR, CFASession, estimator_settings
+
+# Persistent, content-addressed cache of CFA results shared by the SEM stage, the
+# case-dropping script and the Streamlit playground.
+# Key = SHA-256 of (model description, fingerprint of the rows/columns the model sees,
+# estimator settings, warm or cold start, semopy version). A warm start can stop at a
+# slightly different point of the optimizer's tolerance region, so reported (cold) fits
+# never share entries with warm-started ones. Entries hold the fit indices, estimates and
+# standardized estimates in a SQLite file; the least recently used entries are evicted
+# once the cache exceeds its size bound.
+# MAP8_CFA_CACHE=off disables it; MAP8_CFA_CACHE=<path> moves it; MAP8_CFA_CACHE_MB bounds it.
+# semopy itself is only imported when a fit actually runs.
+
+DEFAULT_CACHE_FILE = os.path.join(ROOT_DIR, '.cache', 'cfa_cache.sqlite')
+DEFAULT_MAX_MB = 64
+
+@dataclass
+class CFAResult:
+    stats: pd.DataFrame          # calc_stats(model)
+    estimates: pd.DataFrame      # model.inspect()
+    std_estimates: pd.DataFrame  # model.inspect(std_est=True)
+    n_it: int = None
+    warm: bool = False
+    cached: bool = False
+    precomputed: bool = False    # served from the offline playground grid
+
+def data_fingerprint(desc, data):
+    """Hash of exactly the data a model sees: its observed columns, row by row, in order."""
+    names = set(re.findall(r'[A-Za-z_]\w*', desc))
+    cols = [c for c in data.columns if c in names]
+    h = hashlib.sha256(json.dumps(cols).encode())
+    h.update(pd.util.hash_pandas_object(data[cols], index=False).values.tobytes())
+    return h.hexdigest()
+
+def semopy_version():
+    return importlib.metadata.version('semopy')
+
+def cache_key(desc, data, settings, warm=True):
+    payload = json.dumps({'desc': desc.strip(), 'data': data_fingerprint(desc, data), 'settings': settings,
+                          'start': 'warm' if warm else 'cold', 'semopy': semopy_version()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class CFACache:
+    def __init__(self, path=DEFAULT_CACHE_FILE, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS fits (key TEXT PRIMARY KEY, created REAL, "
+                        "last_used REAL, size INTEGER, payload BLOB)")
+
+    def _connect(self):
+        # One short-lived connection per call: safe across Streamlit threads and processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        with self._connect() as con:
+            row = con.execute("SELECT payload FROM fits WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                result = pickle.loads(zlib.decompress(row[0]))
+            except Exception:
+                # Written by an incompatible pandas version: treat as a miss
+                con.execute("DELETE FROM fits WHERE key = ?", (key,))
+                return None
+            con.execute("UPDATE fits SET last_used = ? WHERE key = ?", (time.time(), key))
+        result.cached = True
+        return result
+
+    def put(self, key, result):
+        blob = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        now = time.time()
+        with self._connect() as con:
+            con.execute("INSERT OR REPLACE INTO fits VALUES (?, ?, ?, ?, ?)", (key, now, now, len(blob), blob))
+            self._evict(con)
+
+    def _evict(self, con):
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM fits").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in con.execute("SELECT key, size FROM fits ORDER BY last_used").fetchall():
+            con.execute("DELETE FROM fits WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._connect() as con:
+            n, size = con.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM fits").fetchone()
+        return {'entries': n, 'size_mb': round(size / (1024 * 1024), 2), 'max_mb': self.max_bytes / (1024 * 1024)}
+
+    def clear(self):
+        with self._connect() as con:
+            con.execute("DELETE FROM fits")
+
+def default_cache():
+    """The cache configured by the environment (None when disabled)."""
+    setting = os.environ.get('MAP8_CFA_CACHE', '')
+    if setting.lower() in ('off', '0', 'false', 'no'):
+        return None
+    return CFACache(setting or DEFAULT_CACHE_FILE, float(os.environ.get('MAP8_CFA_CACHE_MB', DEFAULT_MAX_MB)))
+
+def fit_cached(desc, data, session=None, cache='default'):
+    """Fit `desc` to `data`, consulting the cache first.
+
+    With a `session` the fit is warm-started from its previous solutions; without one it
+    starts cold from semopy's default values, as every reported table does.
+    """
+    cache = default_cache() if cache == 'default' else cache
+    settings = session.settings if session is not None else estimator_settings()
+    key = cache_key(desc, data, settings, warm=session is not None) if cache is not None else None
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    from semopy import calc_stats
+    session = session or CFASession(settings)
+    model = session.fit(desc, data)
+    result = CFAResult(stats=calc_stats(model), estimates=model.inspect(),
+                       std_estimates=model.inspect(std_est=True), n_it=model.last_result.n_it,
+                       warm=session.history[-1]['warm'])
+    if cache is not None and model.last_result.success:
+        cache.put(key, result)
+    return result
@@ -0,0 +1,87 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cfa_cache import cache_key, default_cache, fit_cached
+from sem_estimator import CFASession, estimator_settings
+
+# Background CFA jobs for the Streamlit playground.
+# Fits run in a process pool so the script thread stays responsive; independent fits
+# (e.g. one per survey year) run in parallel. A JobBoard lives in st.session_state: it
+# keys every job by its CFA cache key, keeps completed results, and cancels queued jobs
+# that no longer match the current inputs. A fit that has already started cannot be
+# interrupted; it runs to completion and its result still lands in the CFA cache.
+
+MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+MAX_RESULTS = 64
+_sessions = {}  # per worker process: settings -> CFASession (warm starts between jobs)
+
+def make_pool(max_workers=MAX_WORKERS):
+    # spawn: forking a multi-threaded server process is unsafe
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+def fit_job(desc, data, settings, warm=True):
+    """Worker entry point: a cached fit, warm-started unless `warm` is False."""
+    if not warm:
+        return fit_cached(desc, data)
+    session_key = json.dumps(settings, sort_keys=True)
+    session = _sessions.setdefault(session_key, CFASession(settings))
+    return fit_cached(desc, data, session)
+
+class JobBoard:
+    def __init__(self):
+        self.settings = estimator_settings()
+        self.pending = {}  # key -> Future
+        self.results = {}  # key -> CFAResult or Exception, insertion-ordered (oldest first)
+
+    def key(self, desc, data):
+        return cache_key(desc, data, self.settings)
+
+    def submit(self, pool, desc, data):
+        """Queue a fit unless its result is known or already on its way; returns the job key."""
+        key = self.key(desc, data)
+        if key in self.results or key in self.pending:
+            return key
+        cache = default_cache()
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None:
+            self._store(key, hit)
+        else:
+            self.pending[key] = pool.submit(fit_job, desc, data, self.settings)
+        return key
+
+    def preload(self, key, result):
+        """Record a result obtained without fitting (e.g. the precomputed grid)."""
+        if key not in self.results:
+            self._store(key, result)
+
+    def collect(self):
+        """Move finished futures into the results."""
+        for key, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[key]
+                if not future.cancelled():
+                    try:
+                        self._store(key, future.result())
+                    except Exception as e:
+                        self._store(key, e)
+
+    def cancel_stale(self, wanted):
+        """Cancel queued jobs whose key is not in `wanted`."""
+        for key, future in list(self.pending.items()):
+            if key not in wanted and future.cancel():
+                del self.pending[key]
+
+    def cancel_all(self):
+        self.cancel_stale(set())
+
+    def progress(self, keys):
+        """(finished, total) over `keys`."""
+        keys = list(keys)
+        return sum(k in self.results for k in keys), len(keys)
+
+    def _store(self, key, result):
+        self.results[key] = result
+        while len(self.results) > MAX_RESULTS:
+            self.results.pop(next(iter(self.results)))
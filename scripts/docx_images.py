@@ -0,0 +1,115 @@
+import hashlib
+import io
+import json
+import os
+import time
+
+from docx.shared import Inches
+
+# Size-optimized images for the Word manuscript.
+# Figures arrive as 300 DPI PNGs sized for a full page (figure_farm). Before embedding,
+# each one is resampled to exactly the printed width at the target DPI and re-encoded
+# with the profile of its figure type: flat-colour charts (heatmaps, bars, boxplots) as
+# palette PNGs (fast octree quantization, which keeps text and edges crisp at a fraction
+# of median cut's cost), continuous-tone images as JPEG.
+# Identical inputs are prepared once and embedded as one image part (python-docx
+# shares parts with equal bytes), and prepared images are cached on disk by content
+# (.cache/docx_images/, bounded like the figure cache) so unchanged figures are not
+# re-encoded on the next build (MAP8_DOCX_CACHE=<dir> moves it). Every build records its
+# size and timing.
+# EMF/SVG are not used: python-docx cannot embed vector images.
+
+DEFAULT_DPI = 300
+PROFILES = {
+    'chart': {'format': 'PNG', 'colors': 256},
+    'photo': {'format': 'JPEG', 'quality': 85},
+}
+HISTORY = 20  # builds kept in the build record
+CACHE_DIR = os.path.join(os.environ.get('MAP8_DOCX_CACHE')
+                         or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'),
+                         'docx_images')
+CACHE_MAX_MB = 64
+
+def _cached(key):
+    path = os.path.join(CACHE_DIR, key)
+    if not os.path.exists(path):
+        return None
+    os.utime(path)  # last used
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _store(key, data):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, key)
+    with open(f"{path}.{os.getpid()}.tmp", 'wb') as f:
+        f.write(data)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+    entries = sorted(os.scandir(CACHE_DIR), key=lambda e: e.stat().st_mtime)
+    total = sum(e.stat().st_size for e in entries)
+    for e in entries:
+        if total <= CACHE_MAX_MB * 1024 * 1024:
+            break
+        total -= e.stat().st_size
+        os.remove(e.path)
+
+def encode(data, width_px, settings, dpi):
+    """Resample to at most `width_px` wide and encode with the profile `settings`."""
+    from PIL import Image
+    img = Image.open(io.BytesIO(data))
+    if img.width > width_px:
+        img = img.resize((width_px, round(img.height * width_px / img.width)), Image.LANCZOS)
+    img = img.convert('RGB')  # after resampling: only the printed pixels are converted
+    buf = io.BytesIO()
+    if settings['format'] == 'PNG':
+        img.quantize(settings['colors'], method=Image.Quantize.FASTOCTREE).save(buf, format='PNG', optimize=True,
+                                                                                dpi=(dpi, dpi))
+    else:
+        img.save(buf, format='JPEG', quality=settings['quality'], optimize=True, progressive=True, dpi=(dpi, dpi))
+    return buf.getvalue()
+
+class ImagePipeline:
+    def __init__(self, dpi=DEFAULT_DPI):
+        self.dpi = dpi
+        self.images = []     # one entry per embedded picture
+        self._prepared = {}  # content key -> prepared bytes
+
+    def prepare(self, data, width_in, profile='chart'):
+        """Image bytes resampled to `width_in` inches at the pipeline DPI and encoded per `profile`."""
+        import PIL
+        settings, width_px = PROFILES[profile], round(width_in * self.dpi)
+        key = hashlib.sha256(json.dumps([hashlib.sha256(data).hexdigest(), width_px, self.dpi, settings,
+                                         PIL.__version__]).encode()).hexdigest()
+        entry = {'bytes_in': len(data), 'profile': profile, 'width_px': width_px,
+                 'deduplicated': key in self._prepared, 'cached': False}
+        if key not in self._prepared:
+            prepared = _cached(key)
+            entry['cached'] = prepared is not None
+            self._prepared[key] = prepared if prepared is not None else encode(data, width_px, settings, self.dpi)
+            if prepared is None:
+                _store(key, self._prepared[key])
+        entry['bytes_out'] = len(self._prepared[key])
+        self.images.append(entry)
+        return self._prepared[key]
+
+    def add_picture(self, doc, data, width_in, profile='chart'):
+        return doc.add_picture(io.BytesIO(self.prepare(data, width_in, profile)), width=Inches(width_in))
+
+    def summary(self):
+        return {'dpi': self.dpi, 'images': len(self.images),
+                'unique_images': len(self._prepared),
+                'images_bytes_in': sum(e['bytes_in'] for e in self.images),
+                'images_bytes_out': sum(len(b) for b in self._prepared.values())}
+
+def record_build(ctx, path, docx_bytes, build_s, pipeline, sections=None):
+    """Write the size and timing of this build (plus the last builds) to the JSON record at `path`.
+
+    sections: {section: 'built' | 'cached'} of an incremental build (docx_sections.assemble).
+    """
+    history = json.loads(ctx.read_text(path)).get('history', []) if ctx.exists(path) else []
+    build = {'built': time.strftime('%Y-%m-%d %H:%M:%S'), 'build_s': round(build_s, 3),
+             'docx_bytes': docx_bytes, **pipeline.summary()}
+    if sections is not None:
+        build['sections_rebuilt'] = sum(status == 'built' for status in sections.values())
+    history = (history + [build])[-HISTORY:]
+    ctx.write_text(path, json.dumps({**build, 'sections': sections, 'figures': pipeline.images, 'history': history}, indent=1))
+    return build
@@ -0,0 +1,132 @@
+import base64
+import hashlib
+import importlib.metadata
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable
+
+from lxml import etree
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+
+# Incremental assembly of python-docx manuscripts from cached section fragments.
+# A manuscript is a list of Sections: a builder that appends body elements to the
+# document and the artifacts it reads. A section's key is the SHA-256 of its name, the
+# generator code (module sources, python-docx and Pillow versions) and the bytes of its
+# inputs. After a section is built, the body elements it appended are stored as an XML
+# fragment, together with the images they embed, under that key in .cache/docx_sections/
+# (bounded like the other caches). On the next build unchanged sections are replayed
+# from their fragment (images re-related, drawing ids renumbered) and only sections
+# whose inputs changed are rebuilt.
+# `save_atomic` writes the document immediately through the PipelineContext (temp file
+# renamed over the target), so a failed or refused save never leaves a truncated manuscript.
+# MAP8_DOCX_CACHE=<dir> moves this cache and the prepared-image cache (docx_images).
+
+CACHE_DIR = os.path.join(os.environ.get('MAP8_DOCX_CACHE')
+                         or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'),
+                         'docx_sections')
+CACHE_MAX_MB = 64
+
+@dataclass
+class Section:
+    name: str
+    build: Callable               # build(doc, ctx, *args) appends the section to doc
+    inputs: list = field(default_factory=list)  # artifact paths the builder reads
+
+def _cached(key):
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    os.utime(path)  # last used
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _store(key, fragment):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+    with open(f"{path}.{os.getpid()}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(fragment, f)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+    entries = sorted(os.scandir(CACHE_DIR), key=lambda e: e.stat().st_mtime)
+    total = sum(e.stat().st_size for e in entries)
+    for e in entries:
+        if total <= CACHE_MAX_MB * 1024 * 1024:
+            break
+        total -= e.stat().st_size
+        os.remove(e.path)
+
+def code_version(*paths):
+    """Hash of the generator sources at `paths` and the document libraries."""
+    h = hashlib.sha256(json.dumps([importlib.metadata.version(p) for p in ('python-docx', 'pillow')]).encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def section_key(ctx, section, code):
+    h = hashlib.sha256(json.dumps([section.name, code]).encode())
+    for path in section.inputs:
+        h.update(path.encode())
+        h.update(hashlib.sha256(ctx.read_bytes(path)).digest() if ctx.exists(path) else b'missing')
+    return h.hexdigest()
+
+# --- Fragments ---
+def _body_elements(doc):
+    return [e for e in doc.element.body if e.tag != qn('w:sectPr')]
+
+def _capture(doc, start):
+    """The body elements appended since `start` and the images they embed."""
+    elements = _body_elements(doc)[start:]
+    images = {}
+    for el in elements:
+        for rId in el.xpath('.//a:blip/@r:embed'):
+            images[rId] = base64.b64encode(doc.part.related_parts[rId].blob).decode('ascii')
+    return {'xml': [etree.tostring(el, encoding='unicode') for el in elements], 'images': images}
+
+def _replay(doc, fragment):
+    rIds = {old: doc.part.get_or_add_image(io.BytesIO(base64.b64decode(data)))[0]
+            for old, data in fragment['images'].items()}
+    body = doc.element.body
+    for xml in fragment['xml']:
+        el = parse_xml(xml)
+        for blip in el.xpath('.//a:blip'):
+            blip.set(qn('r:embed'), rIds[blip.get(qn('r:embed'))])
+        for doc_pr in el.xpath('.//wp:docPr'):
+            doc_pr.set('id', str(doc.part.next_id))
+        if body.sectPr is not None:
+            body.sectPr.addprevious(el)
+        else:
+            body.append(el)
+
+def assemble(doc, ctx, sections, code, *args):
+    """Append every section to `doc`, building only those not in the fragment cache.
+
+    Returns {section name: 'built' | 'cached'}.
+    """
+    status = {}
+    for section in sections:
+        key = section_key(ctx, section, code)
+        fragment = _cached(key)
+        if fragment is not None:
+            _replay(doc, fragment)
+            status[section.name] = 'cached'
+            continue
+        start = len(_body_elements(doc))
+        section.build(doc, ctx, *args)
+        _store(key, _capture(doc, start))
+        status[section.name] = 'built'
+    return status
+
+def save_atomic(ctx, doc, path):
+    """Save `doc` to `path` now, through the context's atomic writer; returns the size in bytes."""
+    buf = io.BytesIO()
+    doc.save(buf)
+    try:
+        ctx.write_bytes(path, buf.getvalue())
+        ctx.flush([path])
+    except PermissionError:
+        raise PermissionError(f"{path} is locked (open in Word?). Close it and rerun: "
+                              "unchanged sections are reused from the cache.") from None
+    return len(buf.getvalue())
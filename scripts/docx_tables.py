@@ -0,0 +1,71 @@
+import math
+import numbers
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.table import Table
+
+# Bulk table writer for the python-docx manuscripts.
+# `table.cell(i, j).text` re-walks the table XML on every call, so filling a table
+# cell by cell grows quadratically with its size. `add_table` renders the whole
+# `w:tbl` element for a DataFrame as one XML string (same structure python-docx
+# creates: even column grid, one run per cell), parses it once and appends it to the
+# document. The header row is shaded and marked to repeat on every page.
+
+HEADER_FILL = 'D9D9D9'
+
+def format_value(value, spec, na_rep=''):
+    """Cell text: `spec` is a format spec for floats or a callable taking the raw value."""
+    if callable(spec):
+        return str(spec(value))
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return na_rep
+    if isinstance(value, numbers.Integral) and not isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        return format(value, spec)
+    return str(value)
+
+def _cell_xml(text, width, fill=None):
+    shading = f'<w:shd w:val="clear" w:color="auto" w:fill="{fill}"/>' if fill else ''
+    run = f'<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r>' if text else ''
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/>{shading}</w:tcPr><w:p>{run}</w:p></w:tc>'
+
+def table_xml(header, rows, width, header_fill=HEADER_FILL, repeat_header=True):
+    """`w:tbl` XML for a header and rows of cell strings, `width` (EMU) split evenly between the columns."""
+    cols = len(header)
+    col_width = (width // cols) // 635 if cols else 0  # EMU -> twips
+    parts = [f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblW w:type="auto" w:w="0"/>'
+             '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+             'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid>',
+             f'<w:gridCol w:w="{col_width}"/>' * cols, '</w:tblGrid>',
+             '<w:tr>', '<w:trPr><w:tblHeader/></w:trPr>' if repeat_header else '']
+    parts += [_cell_xml(h, col_width, header_fill) for h in header]
+    parts.append('</w:tr>')
+    for row in rows:
+        parts.append('<w:tr>')
+        parts += [_cell_xml(text, col_width) for text in row]
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+def add_table(doc, df, index_label=None, float_format='.3f', formats=None, na_rep='', style='Table Grid',
+              header_fill=HEADER_FILL, repeat_header=True):
+    """Append `df` as a Word table built in one pass and return it as a python-docx Table.
+
+    index_label: when set, the index becomes the first column under this header.
+    float_format: format spec of float cells; `formats` overrides it per column with a
+    spec or a callable (e.g. {'p-value': p_text}, or {index_label: "Cluster {}".format}).
+    """
+    if index_label is not None:
+        df = df.rename_axis(index_label).reset_index()
+    formats = formats or {}
+    header = [str(c) for c in df.columns]
+    columns = [[format_value(v, formats.get(c, float_format), na_rep) for v in df.iloc[:, j].tolist()]
+               for j, c in enumerate(df.columns)]
+    tbl = parse_xml(table_xml(header, zip(*columns), doc._block_width, header_fill, repeat_header))
+    doc.element.body._insert_tbl(tbl)
+    table = Table(tbl, doc._body)
+    table.style = style
+    return table
@@ -0,0 +1,95 @@
+import os
+
+# Factor scores from the fitted 4-factor CFA (pipeline_step4a_advanced_sem).
+# The loadings (Lambda), residual variances (Theta) and factor covariances (Phi) are read
+# from the semopy estimates, and every respondent is scored as one matrix product of the
+# centered items with a weight matrix:
+#   regression (Thurstone)  W = Sigma^-1 Lambda Phi, Sigma = Lambda Phi Lambda' + Theta
+#   Bartlett                W = Theta^-1 Lambda (Lambda' Theta^-1 Lambda)^-1
+# Rows with missing items are grouped by missingness pattern; each pattern gets the
+# weights of the model restricted to its observed items, computed once and cached on
+# the scorer. A factor without an observed indicator has no Bartlett score (NaN).
+# The SEM stage writes the scores next to the subscale means in
+# 03_sem/factor_scores{suffix}.csv. MAP8_SCORES (mean | regression | bartlett) selects
+# what clustering and the fsQCA calibration use; the default keeps the unweighted means.
+# numpy and pandas are imported lazily so the runner can resolve the score files without them.
+
+FACTORS = ['FS', 'PT', 'EC', 'PD']
+METHODS = {'regression': '_reg', 'bartlett': '_bartlett'}
+SCORE_SETTINGS = ['mean'] + list(METHODS)
+SCORES_FILE = '03_sem/factor_scores{suffix}.csv'
+CLEAN_FILE = '01_harmonized/df_iri_clean{suffix}.csv'
+
+def score_setting():
+    """Subscale scores used downstream: MAP8_SCORES, default 'mean'."""
+    setting = os.environ.get('MAP8_SCORES', 'mean').lower()
+    if setting not in SCORE_SETTINGS:
+        raise ValueError(f"MAP8_SCORES must be one of {SCORE_SETTINGS}, not {setting!r}")
+    return setting
+
+def score_columns(setting=None):
+    """The four subscale score columns for `setting`."""
+    setting = setting or score_setting()
+    return [f"{f}{'_mean' if setting == 'mean' else METHODS[setting]}" for f in FACTORS]
+
+def score_input(suffix, setting=None):
+    """File holding the scores for `setting`: the clean data for means, else the factor scores."""
+    setting = setting or score_setting()
+    return (CLEAN_FILE if setting == 'mean' else SCORES_FILE).format(suffix=suffix)
+
+class FactorScorer:
+    def __init__(self, estimates, item_lists):
+        import numpy as np
+        self.items = [i for f in FACTORS for i in item_lists[f]]
+        pos = {name: k for k, name in enumerate(self.items)}
+        fac = {name: k for k, name in enumerate(FACTORS)}
+        self.loadings = np.zeros((len(self.items), len(FACTORS)))
+        self.theta = np.zeros(len(self.items))
+        self.phi = np.zeros((len(FACTORS), len(FACTORS)))
+        for lval, op, rval, est in estimates[['lval', 'op', 'rval', 'Estimate']].itertuples(index=False):
+            if op == '~' and lval in pos:
+                self.loadings[pos[lval], fac[rval]] = est
+            elif op == '~~' and lval in pos and lval == rval:
+                self.theta[pos[lval]] = est
+            elif op == '~~' and lval in fac and rval in fac:
+                self.phi[fac[lval], fac[rval]] = self.phi[fac[rval], fac[lval]] = est
+        self._weights = {}  # (method, pattern) -> weight matrix over the observed items
+
+    def weights(self, method, observed):
+        """Weight matrix (observed items x factors) for one missingness pattern."""
+        import numpy as np
+        key = (method, observed.tobytes())
+        if key not in self._weights:
+            lam, theta = self.loadings[observed], self.theta[observed]
+            if method == 'regression':
+                sigma = lam @ self.phi @ lam.T + np.diag(theta)
+                w = np.linalg.solve(sigma, lam @ self.phi)
+            else:
+                w = np.full((observed.sum(), len(FACTORS)), np.nan)
+                measured = np.flatnonzero(np.abs(lam).sum(axis=0) > 0)
+                lt = lam[:, measured].T / theta  # Lambda' Theta^-1
+                w[:, measured] = np.linalg.solve(lt @ lam[:, measured], lt).T
+            self._weights[key] = w
+        return self._weights[key]
+
+    def scores(self, df, method):
+        """Factor scores of every row of `df` (NaN for rows without any answered item)."""
+        import numpy as np
+        import pandas as pd
+        X = df[self.items].to_numpy(dtype=float)
+        observed = ~np.isnan(X)
+        centered = np.where(observed, X - np.nanmean(X, axis=0), 0.0)
+        out = np.full((len(X), len(FACTORS)), np.nan)
+        patterns, inverse = np.unique(observed, axis=0, return_inverse=True)
+        for p, pattern in enumerate(patterns):
+            if not pattern.any():
+                continue
+            rows = inverse.ravel() == p
+            out[rows] = centered[np.ix_(rows, pattern)] @ self.weights(method, pattern)
+        return pd.DataFrame(out, index=df.index, columns=[f"{f}{METHODS[method]}" for f in FACTORS])
+
+def add_scores(df, estimates, item_lists):
+    """`df` with regression and Bartlett factor score columns appended."""
+    import pandas as pd
+    scorer = FactorScorer(estimates, item_lists)
+    return pd.concat([df] + [scorer.scores(df, method) for method in METHODS], axis=1)
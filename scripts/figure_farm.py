@@ -0,0 +1,241 @@
+import hashlib
+import importlib.metadata
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+import pipeline_profile
+
+# Cached, content-hashed figure rendering for the pipeline's figure producers.
+# A stage describes each figure as a FigureSpec (renderer name, the DataFrame it plots,
+# plotting parameters, size and DPI) instead of drawing it. The spec's key is the
+# SHA-256 of the data, the parameters, this module's source and the matplotlib/seaborn
+# versions; rendered PNGs live under that key in .cache/figures/. render_all serves
+# unchanged figures from the cache and renders only the changed ones, with the Agg
+# backend, in a process pool whose workers reuse one Figure per size (per thread). Every figure is
+# written as a PNG at report resolution plus a downsampled `<name>_preview.png` for
+# the dashboard.
+# MAP8_FIGURE_CACHE=off disables the cache; MAP8_FIGURE_CACHE=<dir> moves it;
+# MAP8_FIGURE_CACHE_MB bounds it (least recently used figures are evicted).
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, '.cache', 'figures')
+DEFAULT_MAX_MB = 128
+MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+PREVIEW_WIDTH = 640  # px
+
+@dataclass
+class FigureSpec:
+    path: str                     # report PNG; the preview goes next to it
+    kind: str                     # renderer name in RENDERERS
+    data: pd.DataFrame
+    params: dict = field(default_factory=dict)
+    figsize: tuple = (8.5, 6)
+    dpi: int = 300
+
+def preview_path(path):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_preview{ext}"
+
+# --- Renderers: draw `data` on a cleared, reused Figure ---
+def render_cluster_heatmap(fig, data, title):
+    import seaborn as sns
+    ax = fig.add_subplot()
+    sns.heatmap(data, annot=True, cmap='mako', fmt='.2f', annot_kws={"size": 12}, ax=ax)
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel('Dimensions', fontsize=12)
+    ax.set_ylabel('Cluster', fontsize=12)
+
+def render_cluster_boxplots(fig, data, title):
+    import seaborn as sns
+    ax = fig.add_subplot()
+    sns.boxplot(x='variable', y='value', hue='cluster', data=data, palette='mako', ax=ax)
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel('Subscales', fontsize=12)
+    ax.set_ylabel('Score (1-5)', fontsize=12)
+    ax.legend(title='Cluster', loc='upper right')
+
+def render_correlation_heatmap(fig, data, title):
+    import seaborn as sns
+    ax = fig.add_subplot()
+    sns.heatmap(data, annot=True, cmap=sns.color_palette("mako", as_cmap=True), fmt='.2f', vmin=0, vmax=1,
+                annot_kws={"size": 12}, ax=ax)
+    ax.set_title(title, fontsize=14)
+
+def render_cluster_bar(fig, data, title):
+    ax = fig.add_subplot()
+    data.plot(kind='bar', color=['#2c7fb8', '#7fcdbb'], width=0.8, ax=ax)
+    ax.set_title(title, fontsize=14)
+    ax.set_ylim(1, 5)
+    ax.set_ylabel('Mean Score (1-5)', fontsize=12)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    ax.legend(title='Profile Cluster', loc='lower right')
+
+def render_specification_curve(fig, data, metric, label, choices, title):
+    import numpy as np
+    data = data.sort_values(metric, kind='stable').reset_index(drop=True)
+    x = np.arange(len(data))
+    grid = fig.add_gridspec(2, 1, height_ratios=[2, 3], hspace=0.05)
+    top = fig.add_subplot(grid[0])
+    top.scatter(x, data[metric], s=4, color='#2c7fb8', label='Specification')
+    base = data['baseline'].to_numpy(dtype=bool)
+    if base.any():
+        top.scatter(x[base], data.loc[base, metric], s=40, color='#d95f02', zorder=3, label='Published analysis')
+    top.axhline(data[metric].median(), color='grey', linestyle='--', linewidth=0.8)
+    top.set_title(title, fontsize=14)
+    top.set_ylabel(label, fontsize=12)
+    top.tick_params(labelbottom=False)
+    top.legend(loc='upper left', fontsize=9)
+    # Dot matrix: which option of every choice each specification uses
+    bottom = fig.add_subplot(grid[1], sharex=top)
+    levels = [(c, v) for c in choices for v in sorted(data[c].astype(str).unique())]
+    for row, (c, v) in enumerate(levels):
+        hit = (data[c].astype(str) == v).to_numpy()
+        bottom.scatter(x[hit], np.full(hit.sum(), row), s=2, marker='s',
+                       color=['#2c7fb8', '#7fcdbb'][choices.index(c) % 2])
+    bottom.set_yticks(range(len(levels)))
+    bottom.set_yticklabels([f"{c}: {v}" for c, v in levels], fontsize=7)
+    bottom.set_ylim(len(levels) - 0.5, -0.5)
+    bottom.set_xlabel('Specifications (sorted)', fontsize=12)
+
+RENDERERS = {
+    'cluster_heatmap': render_cluster_heatmap,
+    'cluster_boxplots': render_cluster_boxplots,
+    'correlation_heatmap': render_correlation_heatmap,
+    'cluster_bar': render_cluster_bar,
+    'specification_curve': render_specification_curve,
+}
+
+# --- Keys ---
+def _code_version():
+    with open(__file__, 'rb') as f:
+        source = hashlib.sha256(f.read()).hexdigest()
+    return [source] + [importlib.metadata.version(p) for p in ('matplotlib', 'seaborn', 'pandas')]
+
+def spec_key(spec, code_version=None):
+    h = hashlib.sha256(json.dumps({'kind': spec.kind, 'params': spec.params, 'figsize': list(spec.figsize),
+                                   'dpi': spec.dpi, 'code': code_version or _code_version(),
+                                   'columns': [str(c) for c in spec.data.columns],
+                                   'index': [str(i) for i in spec.data.index]}, sort_keys=True).encode())
+    h.update(pd.util.hash_pandas_object(spec.data, index=False).values.tobytes())
+    return h.hexdigest()
+
+# --- Rendering (runs in the pool workers, or in-process) ---
+_local = threading.local()  # per thread: figsize -> reused Figure (in-process stages may overlap)
+
+def load_backend():
+    """Import matplotlib (Agg), seaborn and Pillow; once per process, outside 'figure_render'."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import seaborn  # noqa: F401 (used by the renderers)
+    from PIL import Image  # noqa: F401
+
+def render(kind, data, params, figsize, dpi):
+    """(report PNG, preview PNG) bytes of one figure."""
+    load_backend()
+    from matplotlib.figure import Figure
+    from PIL import Image
+    figures = _local.__dict__.setdefault('figures', {})
+    fig = figures.get(tuple(figsize))
+    if fig is None:
+        fig = figures[tuple(figsize)] = Figure(figsize=figsize)
+    fig.clf()
+    RENDERERS[kind](fig, data, **params)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    png = buf.getvalue()
+    img = Image.open(io.BytesIO(png))
+    img.thumbnail((PREVIEW_WIDTH, PREVIEW_WIDTH * img.height // img.width), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.convert('RGB').quantize(256).save(buf, format='png', optimize=True)
+    return png, buf.getvalue()
+
+def make_pool(max_workers=MAX_WORKERS):
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+# --- Cache ---
+class FigureCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        return os.path.join(self.directory, f"{key}.png"), os.path.join(self.directory, f"{key}_preview.png")
+
+    def get(self, key):
+        paths = self._paths(key)
+        try:
+            out = []
+            for p in paths:
+                with open(p, 'rb') as f:
+                    out.append(f.read())
+                os.utime(p)  # last used
+        except FileNotFoundError:
+            return None
+        return tuple(out)
+
+    def put(self, key, pngs):
+        for p, data in zip(self._paths(key), pngs):
+            tmp = f"{p}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, p)
+        self._evict()
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith('.png')]
+        total = sum(e.stat().st_size for e in entries)
+        for e in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= e.stat().st_size
+            os.remove(e.path)
+
+def default_cache():
+    """The cache configured by the environment (None when disabled)."""
+    setting = os.environ.get('MAP8_FIGURE_CACHE', '')
+    if setting.lower() in ('off', '0', 'false', 'no'):
+        return None
+    return FigureCache(setting or DEFAULT_CACHE_DIR, float(os.environ.get('MAP8_FIGURE_CACHE_MB', DEFAULT_MAX_MB)))
+
+def render_all(ctx, specs, workers=MAX_WORKERS, cache='default'):
+    """Write every spec's PNG and preview through `ctx`, rendering only figures not in the cache."""
+    cache = default_cache() if cache == 'default' else cache
+    code_version = _code_version()
+    keys = [spec_key(s, code_version) for s in specs]
+    done, todo = {}, {}
+    for key, spec in zip(keys, specs):
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None:
+            done[key] = hit
+        elif key not in todo:
+            todo[key] = spec
+
+    jobs = {k: (s.kind, s.data, s.params, s.figsize, s.dpi) for k, s in todo.items()}
+    pooled = len(jobs) > 1 and workers > 1
+    if jobs and not pooled:
+        load_backend()
+    with pipeline_profile.section('figure_render'):
+        if pooled:
+            with make_pool(min(workers, len(jobs))) as pool:
+                futures = {k: pool.submit(render, *args) for k, args in jobs.items()}
+                rendered = {k: f.result() for k, f in futures.items()}
+        else:
+            rendered = {k: render(*args) for k, args in jobs.items()}
+    for key, pngs in rendered.items():
+        if cache is not None:
+            cache.put(key, pngs)
+    done.update(rendered)
+
+    for key, spec in zip(keys, specs):
+        png, preview = done[key]
+        ctx.write_bytes(spec.path, png)
+        ctx.write_bytes(preview_path(spec.path), preview)
+    return {'figures': len(specs), 'rendered': len(rendered), 'cached': len(specs) - len(rendered)}
@@ -1,36 +1,126 @@
-import os
+import json
+import re
+from datetime import date
+
+from pipeline_context import PipelineContext
+from results_store import VARIANTS, ResultsStore
 
 # Define paths
-eda_path = '02_eda/eda_cleaning_report.txt'
-sem_path = '03_sem/advanced_sem_detailed_report.txt'
 qca_path = '04_qca/qca_report_r.txt'
-cluster_path = '05_clustering/cluster_profiles.csv'
 output_report = '06_reports/MAP8_Implementation_Summary.md'
+metrics_path = '06_reports/run_metrics.json'
+
+TIMING_START = '<!-- run-metrics:start -->'
+TIMING_END = '<!-- run-metrics:end -->'
 
-def read_file_safe(path):
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return f.read()
+def read_file_safe(ctx, path):
+    if ctx.exists(path):
+        return ctx.read_text(path)
     return f"File {path} not found."
 
-# Load summaries
-eda_sum = read_file_safe(eda_path)
-sem_sum = read_file_safe(sem_path)
-qca_sum = read_file_safe(qca_path)
-cluster_sum = read_file_safe(cluster_path)
+def fmt(val, spec):
+    return "-" if val is None else format(val, spec)
+
+def cleaning_section(results):
+    prep = results.get('prep')
+    if prep is None:
+        return "No data preparation results recorded yet (run `python main.py prep`)."
+    applied = prep.get('careless_applied') or {}
+    lines = [
+        "| Step | Cases |", "|---|---:|",
+        f"| Raw cases total | {prep['n_raw']} |",
+        f"| After Quality Control (AC2/AC3 + careless filters + no item responses) | {prep['n_qc']} |",
+        f"| After Outlier Removal (Mahalanobis Distance, p < {prep['md_p']:g}, df = {prep['md_df']}) | {prep['n_final']} |",
+        f"| Dropped as inattentive | {prep['dropped_inattentive']} |",
+        f"| Dropped as careless (filters: {', '.join(applied) or 'none'}) | {fmt(prep.get('dropped_careless'), 'd')} |",
+        f"| Dropped with no item responses | {fmt(prep.get('dropped_empty'), 'd')} |",
+        f"| Dropped as potentially random | {prep['dropped_random']} |"]
+    flagged = prep.get('careless_flagged') or {}
+    if flagged:
+        lines += ["", "| Careless-responding index | Raw cases flagged |", "|---|---:|"]
+        lines += [f"| {name}{' (applied)' if name in applied else ''} | {n} |" for name, n in flagged.items()]
+    return "\n".join(lines)
+
+def sem_section(results):
+    sem = {s: results.get('sem', s) for s in VARIANTS}
+    if not any(sem.values()):
+        return "No SEM results recorded yet (run `python main.py sem`)."
+    lines = ["| Metric | " + " | ".join(VARIANTS) + " |", "|---|" + "---:|" * len(VARIANTS)]
+
+    def row(label, get, spec):
+        lines.append(f"| {label} | " + " | ".join(fmt(get(r), spec) if r else "-" for r in sem.values()) + " |")
+
+    row("N", lambda r: r['n'], 'd')
+    row("Global KMO MSA", lambda r: r['kmo'], '.3f')
+    row("Bartlett p", lambda r: r['bartlett_p'], '.3e')
+    for name in next(r for r in sem.values() if r)['alpha']:
+        row(f"Alpha {name}", lambda r: r['alpha'].get(name), '.3f')
+    for index in ['chi2', 'DoF', 'CFI', 'TLI', 'RMSEA', 'AIC', 'BIC']:
+        row(index, lambda r: r['fit'].get(index), '.3f')
+    return "\n".join(lines)
 
-# Build Markdown Report
-report = f"""# MAP-8 Pipeline Execution Summary
-Date: 2026-02-10
+def cluster_section(results):
+    clusters = results.get('clustering', '_with_md')
+    if clusters is None:
+        return "No clustering results recorded yet (run `python main.py clustering`)."
+    features = list(next(iter(clusters['profiles'].values())))
+    lines = ["| Cluster | N | " + " | ".join(features) + " |", "|---|---:|" + "---:|" * len(features)]
+    for cluster, profile in clusters['profiles'].items():
+        lines.append(f"| {cluster} | {clusters['sizes'].get(cluster, '-')} | "
+                     + " | ".join(fmt(profile[f], '.3f') for f in features) + " |")
+    return "\n".join(lines)
+
+def timing_section(metrics):
+    """Markdown timing tables for the stages and hot sections of a run_metrics.json payload."""
+    if not metrics:
+        return f"{TIMING_START}\nNo run metrics recorded yet (run `python main.py`).\n{TIMING_END}"
+    lines = [TIMING_START,
+             f"Run: {metrics['generated']} | Mode: {metrics.get('mode', '-')} | "
+             f"Total wall time: {fmt(metrics.get('total_wall_s'), '.2f')} s",
+             "",
+             "Peak RSS is the high-water mark of the process that ran the stage; in-process stages share "
+             "one interpreter, so theirs is cumulative and RSS growth is how much the stage itself raised it.",
+             "",
+             "| Stage | Status | Wall (s) | CPU (s) | Peak RSS (MB) | RSS growth (MB) | Rows |",
+             "|---|---|---:|---:|---:|---:|---:|"]
+    for st in metrics['stages']:
+        lines.append(f"| {st['stage']} | {st['status']} | {fmt(st['wall_s'], '.2f')} | {fmt(st['cpu_s'], '.2f')} "
+                     f"| {fmt(st['peak_rss_mb'], '.1f')} | {fmt(st.get('rss_growth_mb'), '.1f')} "
+                     f"| {fmt(st['rows'], 'd')} |")
+    if metrics.get('skipped'):
+        lines.append(f"\nUp-to-date (skipped): {', '.join(metrics['skipped'])}")
+    if metrics.get('sections'):
+        lines += ["", "| Stage | Hot section | Calls | Wall (s) | CPU (s) | Peak RSS (MB) | RSS growth (MB) | Rows |",
+                  "|---|---|---:|---:|---:|---:|---:|---:|"]
+        for sec in sorted(metrics['sections'], key=lambda r: -r['wall_s']):
+            lines.append(f"| {sec['stage']} | {sec['name']} | {sec['calls']} | {fmt(sec['wall_s'], '.2f')} "
+                         f"| {fmt(sec['cpu_s'], '.2f')} | {fmt(sec['peak_rss_mb'], '.1f')} "
+                         f"| {fmt(sec.get('rss_growth_mb'), '.1f')} | {fmt(sec['rows'], 'd')} |")
+    lines.append(TIMING_END)
+    return "\n".join(lines)
+
+def replace_timing_section(report, metrics):
+    pattern = re.compile(re.escape(TIMING_START) + ".*?" + re.escape(TIMING_END), re.S)
+    return pattern.sub(lambda _: timing_section(metrics), report)
+
+def run(ctx):
+    # Load summaries (exact values from the results store; the fsQCA report is R text)
+    results = ResultsStore.load(ctx)
+    qca_sum = read_file_safe(ctx, qca_path)
+    metrics = json.loads(ctx.read_text(metrics_path)) if ctx.exists(metrics_path) else None
+
+    # Build Markdown Report
+    report = f"""# MAP-8 Pipeline Execution Summary
+Date: {date.today().isoformat()}
 
 ## 1. Data Preparation and EDA
-{eda_sum}
+{cleaning_section(results)}
 
 ## 2. Measurement Reliability (Step 4A)
-{sem_sum}
+{sem_section(results)}
 
-## 3. Empathy Profiles - Clustering (Step 4C)
-{cluster_sum}
+## 3. Empathy Profiles - Clustering (Step 4C, final sample)
+{cluster_section(results)}
 
 ## 4. fsQCA Calibration (Step 4B)
 {qca_sum}
@@ -46,10 +136,15 @@ Date: 2026-02-10
 06_reports/      - This summary report
 ```
 
+## 6. Pipeline Performance
+{timing_section(metrics)}
+
 *Execution complete according to MAP8_IRI_pipeline.md guidelines.*
 """
 
-with open(output_report, 'w') as f:
-    f.write(report)
+    ctx.write_text(output_report, report)
+
+    print("Final summary report generated in 06_reports/.")
 
-print("Final summary report generated in 06_reports/.")
+if __name__ == "__main__":
+    run(PipelineContext.standalone())
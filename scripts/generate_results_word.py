@@ -1,20 +1,24 @@
-import os
+import io
+
 import pandas as pd
 from docx import Document
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
-def set_table_header_bg(cell, color_hex="D9D9D9"):
-    from docx.oxml.ns import qn
-    from docx.oxml import OxmlElement
-    tcPr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement('w:shd')
-    shd.set(qn('w:fill'), color_hex)
-    tcPr.append(shd)
+from docx_tables import add_table
+from pipeline_context import PipelineContext
+from results_store import ResultsStore, fmt
 
-def create_results_report():
+def create_results_report(ctx):
     print("Generating Academic Results Report in Word...")
     doc = Document()
+    # Exact values recorded by the pipeline stages, loaded once (see scripts/results_store.py)
+    results = ResultsStore.load(ctx)
+    prep = results.get('prep', default={})
+    sem = results.get('sem', '_with_md', default={})
+    alpha = sem.get('alpha', {})
+    fit = sem.get('fit', {})
+    clusters = results.get('clustering', '_with_md', default={})
     
     # Title
     title = doc.add_heading('Research Results Analysis: IRI Empathy Configurations', 0)
@@ -23,30 +27,27 @@ def create_results_report():
     # 1. Descriptive & Cleaning Summary
     doc.add_heading('1. Data Strategy and Preliminary Diagnostics', level=1)
     doc.add_paragraph("The study processed a multi-cohort dataset (2023-2024) through a three-stage cleaning filter. "
-                   "The final analytical sample consists of N = 1,083 high-quality cases.")
+                   f"The final analytical sample consists of N = {fmt(prep.get('n_final'), ',d')} high-quality cases.")
     
     # Table 1: Cleaning Stats
-    table = doc.add_table(rows=4, cols=2)
-    table.style = 'Table Grid'
     data = [
-        ("Stage", "Sample Size (N)"),
-        ("Raw Input", "2,081"),
-        ("After Attention QC", "1,138"),
-        ("Final (QC + Mahalanobis)", "1,083")
+        ("Raw Input", fmt(prep.get('n_raw'), ',d')),
+        ("After Attention QC", fmt(prep.get('n_qc'), ',d')),
+        ("Final (QC + Mahalanobis)", fmt(prep.get('n_final'), ',d'))
     ]
-    for i, (label, val) in enumerate(data):
-        table.cell(i, 0).text = label
-        table.cell(i, 1).text = val
-        if i == 0: set_table_header_bg(table.cell(i,0)); set_table_header_bg(table.cell(i,1))
+    add_table(doc, pd.DataFrame(data, columns=["Stage", "Sample Size (N)"]))
     
-    doc.add_paragraph("\nPsychometric adequacy was validated via Global KMO MSA (0.888) and Bartlett’s test (p < .001). "
-                   "Reliability estimates (Cronbach's Alpha) for FS (0.709), PT (0.718), and PD (0.756) were strong, "
-                   "while EC (0.671) showed acceptable multidimensional breadth.")
+    bartlett_p = sem.get('bartlett_p')
+    bartlett_p = "N/A" if bartlett_p is None else ("< .001" if bartlett_p < 0.001 else f"= {bartlett_p:.3f}")
+    doc.add_paragraph(f"\nPsychometric adequacy was validated via Global KMO MSA ({fmt(sem.get('kmo'))}) and Bartlett’s test (p {bartlett_p}). "
+                   f"Reliability estimates (Cronbach's Alpha) were FS ({fmt(alpha.get('FS'))}), PT ({fmt(alpha.get('PT'))}), "
+                   f"EC ({fmt(alpha.get('EC'))}) and PD ({fmt(alpha.get('PD'))}); values of .70 and above are conventionally "
+                   "considered strong, and values just below it acceptable for multidimensional breadth.")
 
     # 2. SEM/CFA Structure
     doc.add_heading('2. Latent Structure (CFA)', level=1)
     doc.add_paragraph("Confirmatory Factor Analysis confirmed the four-factor hierarchy. While the global fit indices "
-                   "(CFI = 0.698, RMSEA = 0.086) reflect the complexity of the 28-item instrument, the factorability "
+                   f"(CFI = {fmt(fit.get('CFI'))}, RMSEA = {fmt(fit.get('RMSEA'))}) reflect the complexity of the 28-item instrument, the factorability "
                    "and significant paths support the construct validity of the IRI empathy subscales.")
     
     # 3. configurational Analysis (fsQCA)
@@ -65,20 +66,14 @@ def create_results_report():
 
     # 4. Clustering (Profiles)
     doc.add_heading('4. Empathy Profiles (Clustering)', level=1)
-    doc.add_paragraph("Hierarchical clustering identified two distinct profiles of empathizers in the population:")
+    doc.add_paragraph(f"Hierarchical clustering identified {fmt(clusters.get('k'), 'd')} distinct profiles of empathizers in the population:")
     
-    # Load cluster profiles
-    cp_path = '05_clustering/cluster_profiles_with_md.csv'
-    if os.path.exists(cp_path):
-        df_p = pd.read_csv(cp_path, index_col=0)
-        table = doc.add_table(rows=df_p.shape[0]+1, cols=df_p.shape[1]+1)
-        table.style = 'Table Grid'
-        table.cell(0,0).text = "Subscale"
-        for j, col in enumerate(df_p.columns): table.cell(0, j+1).text = str(col)
-        for i, (idx, row) in enumerate(df_p.iterrows()):
-            table.cell(i+1, 0).text = f"Group {idx}"
-            for j, val in enumerate(row): table.cell(i+1, j+1).text = f"{val:.2f}"
-        for cell in table.rows[0].cells: set_table_header_bg(cell)
+    # Cluster profiles
+    profiles = clusters.get('profiles', {})
+    if profiles:
+        df_p = pd.DataFrame.from_dict(profiles, orient='index')
+        df_p.insert(0, "N", [clusters['sizes'].get(idx) for idx in df_p.index])
+        add_table(doc, df_p, index_label="Subscale", float_format='.2f', formats={"Subscale": "Group {}".format})
 
     # 5. Sensitivity & Robustness
     doc.add_heading('5. Sensitivity and Validation', level=1)
@@ -88,8 +83,13 @@ def create_results_report():
 
     # Save
     out_path = '06_reports/Results_Section_Final.docx'
-    doc.save(out_path)
+    buf = io.BytesIO()
+    doc.save(buf)
+    ctx.write_bytes(out_path, buf.getvalue())
     print(f"Results Word document saved to {out_path}")
 
+def run(ctx):
+    create_results_report(ctx)
+
 if __name__ == "__main__":
-    create_results_report()
+    run(PipelineContext.standalone())
@@ -1,36 +1,43 @@
 import os
+import time
+
 import pandas as pd
-import re
 from docx import Document
-from docx.shared import Inches, Pt, RGBColor
+from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 
-def set_table_header_bg(cell):
-    shading_elm = OxmlElement('w:shd')
-    shading_elm.set(qn('w:fill'), 'D9D9D9')
-    cell._tc.get_or_add_tcPr().append(shading_elm)
+import pipeline_profile
+from docx_images import ImagePipeline, record_build
+from docx_sections import Section, assemble, code_version, save_atomic
+from docx_tables import add_table
+from pipeline_context import PipelineContext
+from results_store import ResultsStore, fmt, record_path, record_paths
+
+def p_text(p, estimate):
+    try:
+        return "Fixed" if str(p).strip() in ['-', '0.0'] and float(estimate) == 1.0 else ("< 0.001" if float(p) < 0.001 else f"{float(p):.3f}")
+    except (TypeError, ValueError):
+        return str(p)
 
 def add_spacer(doc):
     doc.add_paragraph()
 
-def create_report():
-    print("Generating Academic Manuscript following MAP-8 Example Structure...")
-    doc = Document()
-    
-    # Global Font settings
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Arial'
-    font.size = Pt(11)
+BUILD_RECORD = '06_reports/manuscript_build.json'
+DOC_FILE = '06_reports/Manuscript_Results_Replication.docx'
+FIGURE_WIDTH_IN = 5.0
+DESC_PATH = '02_eda/descriptive_stats.csv'
+CFA_PATH = '03_sem/cfa_estimates.csv'
+QCA_REPORT_PATH = '04_qca/qca_report_r.txt'
+CLUSTER_PROFILES_PATH = '05_clustering/cluster_profiles.csv'
+VARIANTS = ['_raw', '_no_md', '_with_md']
 
-    # Title
+# --- Sections (each rebuilt only when its inputs change, see scripts/docx_sections.py) ---
+def title_section(doc, ctx, results, images):
     title = doc.add_heading("MAP-8 Case Study Using the Interpersonal Reactivity Index (IRI)", 0)
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
     add_spacer(doc)
 
-    # --- Step 1 ---
+def step1(doc, ctx, results, images):
     doc.add_heading("Step 1. Problem definition and analytical objective", level=1)
     doc.add_paragraph("The objective of this case study is to characterize empathy as a multidimensional construct and to "
                    "demonstrate methodological complementariedad by combining correlational, configurational, and segmentation-based analyses. "
@@ -45,19 +52,14 @@ def create_report():
     p = doc.add_paragraph(style='List Bullet')
     p.add_run("And whether the population is heterogeneous, exhibiting distinct empathy profiles.")
 
-    # --- Step 2 ---
+def step2(doc, ctx, results, images):
+    prep = results.get('prep', default={})
+    sem = results.get('sem', '_with_md', default={})
     doc.add_heading("Step 2. Data acquisition, quality control, and exploratory diagnostics", level=1)
     
-    # Load cleaning stats
-    eda_path = '02_eda/eda_cleaning_report.txt'
-    raw_n, qc_n, final_n, dropped_n = "2322", "1322", "1262", "60" # Defaulting to your numbers if file missing
-    if os.path.exists(eda_path):
-        with open(eda_path, 'r') as f:
-            content = f.read()
-            raw_n = re.search(r"Raw cases: (\d+)", content).group(1) if re.search(r"Raw cases: (\d+)", content) else raw_n
-            qc_n = re.search(r"Cases after QC.*: (\d+)", content).group(1) if re.search(r"Cases after QC.*: (\d+)", content) else qc_n
-            final_n = re.search(r"Cases after MD.*: (\d+)", content).group(1) if re.search(r"Cases after MD.*: (\d+)", content) else final_n
-            dropped_n = re.search(r"Dropped as potentially random: (\d+)", content).group(1) if re.search(r"Dropped as potentially random: (\d+)", content) else dropped_n
+    # Cleaning stats
+    raw_n, qc_n, final_n = (fmt(prep.get(k), 'd') for k in ('n_raw', 'n_qc', 'n_final'))
+    dropped_n = fmt(prep.get('dropped_random'), 'd')
 
     doc.add_paragraph(f"The initial dataset consisted of {raw_n} raw cases collected via an online survey across two cohorts (2023-2024). "
                    "In Step 2, data was unified into a common 1-5 Likert scale (converting 2023's 0-4 scale via +1 transformation). "
@@ -81,39 +83,21 @@ def create_report():
     run_eq.font.size = Pt(12)
     
     doc.add_paragraph("Where x represents the vector of item responses for an individual, \u03BC is the vector of means, and S\u207B\u00B9 is the inverse of the covariance matrix. "
-                   "Specifically, we used a \u03C7\u00B2 threshold with 28 degrees of freedom (p < 0.001) "
+                   f"Specifically, we used a \u03C7\u00B2 threshold with {fmt(prep.get('md_df'), 'd')} degrees of freedom "
+                   f"(p < {fmt(prep.get('md_p'), 'g')}) "
                    "to isolate and remove these inconsistent profiles, ensuring the subsequent SEM and QCA models are not biased by noise.")
 
     # Descriptive Statistics Table
-    desc_path = '02_eda/descriptive_stats.csv'
-    if os.path.exists(desc_path):
+    if ctx.exists(DESC_PATH):
         doc.add_heading("Table 1. Descriptive Statistics (Cleaned Sample)", level=2)
-        df_desc = pd.read_csv(desc_path, index_col=0)
-        table = doc.add_table(rows=df_desc.shape[0]+1, cols=df_desc.shape[1]+1)
-        table.style = 'Table Grid'
-        
-        # Header
-        table.cell(0, 0).text = "Statistic"
-        for j, col in enumerate(df_desc.columns):
-            table.cell(0, j+1).text = str(col)
-            set_table_header_bg(table.cell(0, j+1))
-        set_table_header_bg(table.cell(0, 0))
-        
-        # Rows
-        for i, (idx, row) in enumerate(df_desc.iterrows()):
-            table.cell(i+1, 0).text = str(idx)
-            for j, val in enumerate(row):
-                table.cell(i+1, j+1).text = f"{val:.3f}"
+        df_desc = ctx.read_csv(DESC_PATH, index_col=0)
+        add_table(doc, df_desc, index_label="Statistic")
         add_spacer(doc)
 
     # Factorability stats
-    sem_report_path = '03_sem/advanced_sem_detailed_report.txt'
-    kmo, bartlett_p = "N/A", "N/A"
-    if os.path.exists(sem_report_path):
-        with open(sem_report_path, 'r') as f:
-            content = f.read()
-            kmo = re.search(r"Global KMO MSA: ([\d\.]+)", content).group(1) if re.search(r"Global KMO MSA: ([\d\.]+)", content) else "N/A"
-            bartlett_p = "< 0.001" if "p=0.000" in content or "p-value  chi2" in content else "significant"
+    kmo = fmt(sem.get('kmo'))
+    bartlett_p = sem.get('bartlett_p')
+    bartlett_p = "N/A" if bartlett_p is None else ("< 0.001" if bartlett_p < 0.001 else f"= {bartlett_p:.3f}")
 
     doc.add_paragraph("Exploratory factorability diagnostics confirmed the suitability of the data:")
     p = doc.add_paragraph(style='List Bullet')
@@ -123,101 +107,66 @@ def create_report():
 
     # Table 2 Reliability
     doc.add_heading("Table 2. Reliability Metrics (Cronbach's Alpha) per Subscale", level=2)
-    rel_path = '03_sem/reliability_stats.csv'
-    if os.path.exists(rel_path):
-        df_rel = pd.read_csv(rel_path)
-        table = doc.add_table(rows=len(df_rel)+1, cols=2)
-        table.style = 'Table Grid'
-        table.cell(0,0).text = "Dimensions"
-        table.cell(0,1).text = "Alpha (\u03B1)"
-        for cell in table.rows[0].cells: set_table_header_bg(cell)
-        for i, row in df_rel.iterrows():
-            table.cell(i+1, 0).text = str(row['Construct'])
-            table.cell(i+1, 1).text = f"{row['Alpha']:.3f}"
-
-    # --- Step 3 ---
+    alphas = sem.get('alpha', {})
+    if alphas:
+        add_table(doc, pd.DataFrame({"Dimensions": list(alphas), "Alpha (\u03B1)": list(alphas.values())}), na_rep="N/A")
+
+def step3(doc, ctx, results, images):
     doc.add_heading("Step 3. Model specification (three complementary logics)", level=1)
     doc.add_paragraph("Three analytical lenses were specified in parallel, integrating linear and configurational logic:")
     doc.add_paragraph("1. CB-SEM (Confirmatory Bias Structural Equation Modeling): A correlational logic seeking to validate the latent structure.", style='List Bullet')
     doc.add_paragraph("2. fsQCA (Fuzzy-Set Qualitative Comparative Analysis): A configurational logic exploring how conditions combine to produce an outcome.", style='List Bullet')
     doc.add_paragraph("3. HCA (Hierarchical Cluster Analysis): A segmentation logic to identify natural subgroups.", style='List Bullet')
 
-    # --- Step 4 ---
+def step4(doc, ctx, results, images):
+    sem = results.get('sem', '_with_md', default={})
     doc.add_heading("Step 4. Model estimation", level=1)
     doc.add_paragraph("4.1 Confirmatory Factor Analysis", style='Heading 2')
     
-    # Load Fit Indices - FIXED VERSION
-    fit_path = '03_sem/cfa_fit_indices.csv'
-    cfi, tli, rmsea = "N/A", "N/A", "N/A"
-    if os.path.exists(fit_path):
-        df_fit = pd.read_csv(fit_path, index_col=0)
-        if 'CFI' in df_fit.columns: cfi = f"{df_fit.loc['Value', 'CFI']:.3f}"
-        if 'TLI' in df_fit.columns: tli = f"{df_fit.loc['Value', 'TLI']:.3f}"
-        if 'RMSEA' in df_fit.columns: rmsea = f"{df_fit.loc['Value', 'RMSEA']:.3f}"
-
-    doc.add_paragraph(f"The CFA was estimated with {final_n} cases. Global fit indices were as follows: "
+    # Fit indices
+    fit = sem.get('fit', {})
+    cfi, tli, rmsea = (fmt(fit.get(k)) for k in ('CFI', 'TLI', 'RMSEA'))
+
+    doc.add_paragraph(f"The CFA was estimated with {fmt(sem.get('n'), 'd')} cases. Global fit indices were as follows: "
                    f"CFI = {cfi}, TLI = {tli}, RMSEA = {rmsea}. "
                    "Interpretation: Values of CFI/TLI above 0.90 are usually preferred, though in large multidimensional "
                    "scales like IRI, moderate fit is common. RMSEA below 0.08 is considered acceptable.")
 
     # Load CFA table
-    cfa_path = '03_sem/cfa_estimates.csv'
-    if os.path.exists(cfa_path):
+    if ctx.exists(CFA_PATH):
         doc.add_heading("Table 3. Standardized Factor Loadings", level=2)
-        df_cfa = pd.read_csv(cfa_path)
+        df_cfa = ctx.read_csv(CFA_PATH)
         loadings = df_cfa[df_cfa['op'] == '~']
-        table = doc.add_table(rows=1, cols=4)
-        table.style = 'Table Grid'
-        hdr = ["Latent", "Item", "Estimate", "p-value"]
-        for j, h in enumerate(hdr):
-            table.cell(0,j).text = h
-            set_table_header_bg(table.cell(0,j))
-        for _, r in loadings.iterrows():
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(r['rval'])
-            row_cells[1].text = str(r['lval'])
-            row_cells[2].text = f"{r['Estimate']:.3f}"
-            p = r['p-value']
-            try:
-                p_text = "Fixed" if str(p).strip() in ['-', '0.0'] and float(r['Estimate']) == 1.0 else ("< 0.001" if float(p) < 0.001 else f"{float(p):.3f}")
-            except: p_text = str(p)
-            row_cells[3].text = p_text
+        add_table(doc, pd.DataFrame({
+            "Latent": loadings['rval'].astype(str), "Item": loadings['lval'].astype(str),
+            "Estimate": loadings['Estimate'],
+            "p-value": [p_text(p, est) for p, est in zip(loadings['p-value'], loadings['Estimate'])]}))
 
     doc.add_paragraph("4.2 fsQCA Estimation", style='Heading 2')
     doc.add_paragraph("Sociodemographic analysis was integrated by including Gender and SES (Socioeconomic Status) as conditions. "
                    "Gender was dummy-coded (1=Female, 0=Male) and SES was dichotomized (1=High SES [Level 3+], 0=Low SES). "
                    "The sufficiency analysis seeks the minimal combination of empathy dimensions and sociodemographic conditions leading to high empathy.")
     
-    qca_report_path = '04_qca/qca_report_r.txt'
-    if os.path.exists(qca_report_path):
-        with open(qca_report_path, 'r') as f:
-            qca_text = f.read()
-            doc.add_heading("Table 4. Parsimonious Solution for High Total Empathy", level=2)
-            if "--- Parsimonious Solution" in qca_text:
-                sol_part = qca_text.split("--- Parsimonious Solution")[1].strip()
-                p = doc.add_paragraph()
-                run = p.add_run(sol_part)
-                run.font.name = 'Courier New'
-                run.font.size = Pt(9)
-            doc.add_paragraph("How to interpret QCA tables: 'inclS' (Inclusion) measures the degree to which a configuration is a subset of the outcome; "
-                           "'covS' (Coverage) measures how much of the outcome is explained by that specific recipe. Values above 0.75 in inclusion "
-                           "usually indicate sufficient pathways.")
+    if ctx.exists(QCA_REPORT_PATH):
+        qca_text = ctx.read_text(QCA_REPORT_PATH)
+        doc.add_heading("Table 4. Parsimonious Solution for High Total Empathy", level=2)
+        if "--- Parsimonious Solution" in qca_text:
+            sol_part = qca_text.split("--- Parsimonious Solution")[1].strip()
+            p = doc.add_paragraph()
+            run = p.add_run(sol_part)
+            run.font.name = 'Courier New'
+            run.font.size = Pt(9)
+        doc.add_paragraph("How to interpret QCA tables: 'inclS' (Inclusion) measures the degree to which a configuration is a subset of the outcome; "
+                       "'covS' (Coverage) measures how much of the outcome is explained by that specific recipe. Values above 0.75 in inclusion "
+                       "usually indicate sufficient pathways.")
 
     doc.add_paragraph("4.3 Hierarchical clustering", style='Heading 2')
-    cluster_profiles_path = '05_clustering/cluster_profiles.csv'
-    if os.path.exists(cluster_profiles_path):
-        df_p = pd.read_csv(cluster_profiles_path, index_col=0)
+    if ctx.exists(CLUSTER_PROFILES_PATH):
+        df_p = ctx.read_csv(CLUSTER_PROFILES_PATH, index_col=0)
         doc.add_heading("Table 5. Mean Scores by Cluster (IRI profiles)", level=2)
-        table = doc.add_table(rows=df_p.shape[0]+1, cols=df_p.shape[1]+1)
-        table.style = 'Table Grid'
-        table.cell(0,0).text = "Cluster"
-        for j, col in enumerate(df_p.columns): table.cell(0, j+1).text = str(col)
-        for i, (idx, row) in enumerate(df_p.iterrows()):
-            table.cell(i+1, 0).text = f"Cluster {idx}"
-            for j, val in enumerate(row): table.cell(i+1, j+1).text = f"{val:.2f}"
-        for cell in table.rows[0].cells: set_table_header_bg(cell)
-
-    # --- Step 5, 6, 7 ---
+        add_table(doc, df_p, index_label="Cluster", float_format='.2f', formats={"Cluster": "Cluster {}".format})
+
+def steps5_7(doc, ctx, results, images):
     doc.add_heading("Step 5. Model evaluation and robustness", level=1)
     doc.add_paragraph("Each method passed its own validity criteria. Rather than seeking perfect convergence, MAP-8 evaluates whether "
                    "results are mutually informative. We verified that fsQCA solutions remain stable even when demographics are added.")
@@ -231,7 +180,9 @@ def create_report():
     doc.add_paragraph("Results suggest that high empathy is a configurational achievement. Management and social interventions "
                    "should target profiles (clusters) rather than assuming a one-size-fits-all linear increase in empathy.")
 
-    # --- Step 8: Sensitivity Analysis ---
+def step8(doc, ctx, results, images):
+    prep = results.get('prep', default={})
+    raw_n, qc_n, final_n = (fmt(prep.get(k), 'd') for k in ('n_raw', 'n_qc', 'n_final'))
     doc.add_heading("Step 8. Validation and Sensitivity Analysis (Multi-Stage Cleanup)", level=1)
     doc.add_paragraph("Following the MAP-8 methodology, this project implements a 3-stage sensitivity analysis to quantify the impact of "
                    "data cleaning on psychometric validity and configurational results. We contrast the following versions:")
@@ -241,77 +192,92 @@ def create_report():
 
     # Comparative Table 6: Sample & Fit
     doc.add_heading("Table 6. Global Sensitivity Comparison: Quality vs Fit", level=2)
-    table = doc.add_table(rows=6, cols=4)
-    table.style = 'Table Grid'
     hdrs = ["Metric", "Raw (No Filter)", "QC Only", "Final (QC+MD)"]
-    for j, h in enumerate(hdrs):
-        table.cell(0,j).text = h
-        set_table_header_bg(table.cell(0,j))
-    
-    # Data extraction for fit
-    fits = {}
-    for s in ['_raw', '_no_md', '_with_md']:
-        path = f'03_sem/cfa_fit_indices{s}.csv'
-        if os.path.exists(path): fits[s] = pd.read_csv(path, index_col=0)
-    
-    rows_data = [
-        ("Sample Size (N)", str(raw_n), str(qc_n), str(final_n)),
-        ("CFI (Target > .90)", "N/A", "N/A", "N/A"),
-        ("TLI (Target > .90)", "N/A", "N/A", "N/A"),
-        ("RMSEA (Target < .08)", "N/A", "N/A", "N/A"),
-        ("SRMR (Target < .08)", "N/A", "N/A", "N/A")
-    ]
-    
-    for i, (label, *_) in enumerate(rows_data):
-        table.cell(i+1, 0).text = label
-        if i == 0:
-            table.cell(i+1, 1).text = str(raw_n)
-            table.cell(i+1, 2).text = str(qc_n)
-            table.cell(i+1, 3).text = str(final_n)
-        else:
-            metric = label.split(" ")[0]
-            for j, s in enumerate(['_raw', '_no_md', '_with_md']):
-                if s in fits and metric in fits[s].columns:
-                    val = fits[s].loc['Value', metric]
-                    table.cell(i+1, j+1).text = f"{val:.3f}"
+    sample_n = results.across('prep', 'n', VARIANTS)
+    fits = results.across('sem', 'fit', VARIANTS, default={})
+    rows_data = ["Sample Size (N)", "CFI (Target > .90)", "TLI (Target > .90)",
+                 "RMSEA (Target < .08)", "SRMR (Target < .08)"]
+
+    rows = [[label] + [fmt(sample_n[s], 'd') if i == 0 else fmt(fits[s].get(label.split(" ")[0])) for s in VARIANTS]
+            for i, label in enumerate(rows_data)]
+    add_table(doc, pd.DataFrame(rows, columns=hdrs))
 
     add_spacer(doc)
 
+def step8_matrices(doc, ctx, results, images):
     # Visual Sensitivity: Correlation Heatmaps (Separate for readability)
     doc.add_heading("8.1 Psychometric Matrix Stability", level=2)
     doc.add_paragraph("The following high-resolution (300 DPI) heatmaps contrast the inter-correlation structure across cleaning stages. "
                    "The preservation of construct relationships despite data reduction confirms the absence of systematic bias from outliers.")
     
     for i, (s, title) in enumerate([('_raw', 'Baseline/Raw'), ('_no_md', 'QC Only'), ('_with_md', 'Clean (Final)')]):
-        img_path = f'06_reports/figures/correlation_heatmap{s}.jpg'
-        if os.path.exists(img_path):
-            doc.add_picture(img_path, width=Inches(5.0))
+        img_path = f'06_reports/figures/correlation_heatmap{s}.png'
+        if ctx.exists(img_path):
+            images.add_picture(doc, ctx.read_bytes(img_path), FIGURE_WIDTH_IN)
             para = doc.add_paragraph(f"Figure {i+1}. Inter-correlation Structure: {title} dataset.")
             para.alignment = WD_ALIGN_PARAGRAPH.CENTER
             add_spacer(doc)
 
+def step8_clusters(doc, ctx, results, images):
     # Visual Sensitivity: Clustering
     doc.add_heading("8.2 Cluster Centroid Stability", level=2)
     doc.add_paragraph("Comparison of cluster profiles identifies consistent patterns across the three data versions, "
                    "validating that the empathy segments identified are structural characteristics of the population.")
     
     for i, (s, title) in enumerate([('_raw', 'Baseline'), ('_no_md', 'QC Only'), ('_with_md', 'Final')]):
-        img_bar = f'06_reports/figures/cluster_profiles_bar{s}.jpg'
-        if os.path.exists(img_bar):
-            doc.add_picture(img_bar, width=Inches(5.0))
+        img_bar = f'06_reports/figures/cluster_profiles_bar{s}.png'
+        if ctx.exists(img_bar):
+            images.add_picture(doc, ctx.read_bytes(img_bar), FIGURE_WIDTH_IN)
             para = doc.add_paragraph(f"Figure {i+4}. Profile Identification Stability: {title} dataset.")
             para.alignment = WD_ALIGN_PARAGRAPH.CENTER
             add_spacer(doc)
 
-    # Final Save
-    doc_file = '06_reports/Manuscript_Results_Replication.docx'
-    try:
-        doc.save(doc_file)
-        print(f"Final Academic Manuscript saved to {doc_file}")
-    except PermissionError:
-        doc_file_v2 = '06_reports/Manuscript_Results_Replication_v2.docx'
-        doc.save(doc_file_v2)
-        print(f"Saved backup version to {doc_file_v2} due to permission error.")
+# Manuscript order. Inputs are every artifact (and result record) a section reads.
+SECTIONS = [
+    Section('title', title_section),
+    Section('step1', step1),
+    Section('step2', step2, [record_path('prep'), record_path('sem', '_with_md'), DESC_PATH]),
+    Section('step3', step3),
+    Section('step4', step4, [record_path('sem', '_with_md'), CFA_PATH, QCA_REPORT_PATH, CLUSTER_PROFILES_PATH]),
+    Section('steps5_7', steps5_7),
+    Section('step8', step8, [record_path('prep')] + record_paths('prep') + record_paths('sem')),
+    Section('step8_matrices', step8_matrices, [f'06_reports/figures/correlation_heatmap{s}.png' for s in VARIANTS]),
+    Section('step8_clusters', step8_clusters, [f'06_reports/figures/cluster_profiles_bar{s}.png' for s in VARIANTS]),
+]
+
+def create_report(ctx):
+    print("Generating Academic Manuscript following MAP-8 Example Structure...")
+    start = time.perf_counter()
+    doc = Document()
+    # Figures are resampled to their printed size and re-encoded before embedding
+    images = ImagePipeline()
+    # Exact values recorded by the pipeline stages, loaded once (see scripts/results_store.py)
+    results = ResultsStore.load(ctx)
+    
+    # Global Font settings
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Arial'
+    font.size = Pt(11)
+
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    code = code_version(*(os.path.join(scripts_dir, f) for f in
+                          ('generate_word_report.py', 'docx_tables.py', 'docx_images.py', 'docx_sections.py')))
+    sections = assemble(doc, ctx, SECTIONS, code, results, images)
+
+    # Written to a temp file and renamed: a locked target leaves the previous manuscript intact
+    docx_bytes = save_atomic(ctx, doc, DOC_FILE)
+    print(f"Final Academic Manuscript saved to {DOC_FILE}")
+
+    build = record_build(ctx, BUILD_RECORD, docx_bytes, time.perf_counter() - start, images, sections)
+    rebuilt = [name for name, status in sections.items() if status == 'built']
+    print(f"Manuscript: {build['docx_bytes'] / 1024:.0f} KB in {build['build_s']:.2f}s "
+          f"({len(rebuilt)}/{len(sections)} sections rebuilt{': ' + ', '.join(rebuilt) if rebuilt else ''}; "
+          f"{build['unique_images']} images prepared)")
+
+def run(ctx):
+    with pipeline_profile.section('docx_build'):
+        create_report(ctx)
 
 if __name__ == "__main__":
-    create_report()
+    run(PipelineContext.standalone())
@@ -0,0 +1,172 @@
+import numpy as np
+
+# Multiple imputation of incomplete IRI item responses.
+# Respondents who skipped items used to be dropped listwise (playground) or left out of
+# the Mahalanobis screen (step 2). Instead:
+#   em_mvn             ML mean and covariance of the items under a multivariate normal,
+#                      by EM. Conditional moments come from the precision matrix: for the
+#                      missing items m of a row, E[x_m | x_o] = mu_m - P_mm^-1 (P d)_m with
+#                      d the centred row (missing cells 0) and Cov = P_mm^-1. Rows are
+#                      batched by their number of missing items, so an iteration costs one
+#                      small stacked inverse per batch instead of a solve per pattern.
+#   pattern_distances  Mahalanobis distances over each row's answered items (compared
+#                      against chi2 with that many degrees of freedom), via the same
+#                      Schur complement.
+#   impute             M completed copies of the item matrix. Every imputation re-estimates
+#                      the EM parameters on a bootstrap resample (parameter uncertainty,
+#                      as in Amelia's EMB), then fills the missing cells either with draws
+#                      from the conditional normal ('mvn', continuous) or by predictive mean
+#                      matching ('pmm': for each item, one of the K respondents who answered
+#                      it and whose predicted value from the other items is closest, so
+#                      imputations stay on the 1-5 response scale). Imputations run in
+#                      a process pool when one is passed.
+#   rubin              pools per-imputation estimates and their sampling variances.
+# Rows without any answered item stay missing (step 2 drops them before the screen).
+# Only numpy is imported, so step 2 and the playground can use the EM estimates cheaply.
+
+METHODS = ['pmm', 'mvn']
+DEFAULT_M = 20
+PMM_DONORS = 5
+EM_MAX_ITER = 500
+EM_TOL = 1e-6
+
+def _blocks(missing):
+    """[(rows, cols)] of the partially answered rows, batched by their number k of missing
+    items; `cols` (rows x k) holds each row's missing item indices."""
+    counts = missing.sum(axis=1)
+    out = []
+    for k in np.unique(counts):
+        if k == 0 or k == missing.shape[1]:
+            continue
+        rows = np.flatnonzero(counts == k)
+        out.append((rows, np.nonzero(missing[rows])[1].reshape(len(rows), k)))
+    return out
+
+def _conditionals(X, mu, prec, blocks):
+    """`X` with its missing cells set to their conditional means, and the conditional
+    covariances [(rows, cols, cov)] of every block."""
+    d = np.nan_to_num(X - mu)
+    pd_ = d @ prec
+    filled = mu + d
+    out = []
+    for rows, cols in blocks:
+        cov = np.linalg.inv(prec[cols[:, :, None], cols[:, None, :]])
+        shift = np.einsum('rij,rj->ri', cov, np.take_along_axis(pd_[rows], cols, axis=1))
+        filled[rows[:, None], cols] = mu[cols] - shift
+        out.append((rows, cols, cov))
+    return filled, out
+
+def em_mvn(X, max_iter=EM_MAX_ITER, tol=EM_TOL):
+    """(mean, covariance, iterations) of `X` (rows x items, NaN = missing) by EM."""
+    p = X.shape[1]
+    X = X[~np.isnan(X).all(axis=1)]
+    n_used = len(X)
+    blocks = _blocks(np.isnan(X))
+    mu = np.nanmean(X, axis=0)
+    sigma = np.diag(np.nanvar(X, axis=0))
+    for it in range(1, max_iter + 1):
+        filled, conds = _conditionals(X, mu, np.linalg.inv(sigma), blocks)
+        sxx = filled.T @ filled
+        for _, cols, cov in conds:
+            cell = (cols[:, :, None] * p + cols[:, None, :]).ravel()
+            sxx += np.bincount(cell, weights=cov.ravel(), minlength=p * p).reshape(p, p)
+        new_mu = filled.sum(axis=0) / n_used
+        new_sigma = sxx / n_used - np.outer(new_mu, new_mu)
+        change = max(np.abs(new_mu - mu).max(), np.abs(new_sigma - sigma).max())
+        mu, sigma = new_mu, new_sigma
+        if change < tol:
+            break
+    return mu, sigma, it
+
+def pattern_distances(X, mu, sigma):
+    """Mahalanobis distance of every row over its observed items (NaN for rows with none)."""
+    missing = np.isnan(X)
+    prec = np.linalg.inv(sigma)
+    d = np.nan_to_num(X - mu)
+    pd_ = d @ prec
+    sq = np.einsum('ij,ij->i', d, pd_)
+    for rows, cols in _blocks(missing):
+        g = np.take_along_axis(pd_[rows], cols, axis=1)
+        sq[rows] -= np.einsum('ri,ri->r', g, np.linalg.solve(prec[cols[:, :, None], cols[:, None, :]], g[:, :, None])[:, :, 0])
+    out = np.sqrt(np.clip(sq, 0, None))
+    out[missing.all(axis=1)] = np.nan
+    return out
+
+def _pmm(pred, donor_pred, donor_values, rng, k):
+    """Value of one of the `k` donors whose predicted value is closest to each of `pred`."""
+    order = np.argsort(donor_pred, kind='stable')
+    donor_pred, donor_values = donor_pred[order], donor_values[order]
+    width = min(2 * k, len(donor_pred))
+    start = np.clip(np.searchsorted(donor_pred, pred) - k, 0, len(donor_pred) - width)
+    window = start[:, None] + np.arange(width)
+    nearest = np.argsort(np.abs(donor_pred[window] - pred[:, None]), axis=1, kind='stable')[:, :min(k, width)]
+    pick = nearest[np.arange(len(pred)), rng.integers(0, nearest.shape[1], len(pred))]
+    return donor_values[window[np.arange(len(pred)), pick]]
+
+def impute_once(X, method='pmm', seed=0, k=PMM_DONORS):
+    """One completed copy of `X` (pool worker entry point)."""
+    rng = np.random.default_rng(seed)
+    missing = np.isnan(X)
+    answered = np.flatnonzero(~missing.all(axis=1))
+    mu, sigma, _ = em_mvn(X[rng.choice(answered, len(answered))])
+    prec = np.linalg.inv(sigma)
+    filled, conds = _conditionals(X, mu, prec, _blocks(missing))
+    if method == 'mvn':
+        for rows, cols, cov in conds:
+            noise = np.einsum('rij,rj->ri', np.linalg.cholesky(cov), rng.standard_normal(cols.shape))
+            filled[rows[:, None], cols] += noise
+        filled[missing.all(axis=1)] = np.nan
+        return filled
+    # PMM: every row's predicted value of item j given its other items (the recipients'
+    # predictions are their conditional means); donors are the rows that answered j
+    d = filled - mu
+    pred = mu - (d @ prec - d * np.diag(prec)) / np.diag(prec)
+    out = X.copy()
+    for j in range(X.shape[1]):
+        rows = np.flatnonzero(missing[:, j])
+        rows = rows[~missing[rows].all(axis=1)]
+        donors = np.flatnonzero(~missing[:, j])
+        if len(rows) == 0:
+            continue
+        if len(donors) == 0:
+            out[rows, j] = filled[rows, j]
+            continue
+        out[rows, j] = _pmm(pred[rows, j], pred[donors, j], X[donors, j], rng, k)
+    return out
+
+def impute(X, m=DEFAULT_M, method='pmm', seed=0, pool=None):
+    """List of `m` completed copies of `X`; imputation i uses seed `seed + i`."""
+    if method not in METHODS:
+        raise ValueError(f"Imputation method must be one of {METHODS}, not {method!r}")
+    if pool is None:
+        return [impute_once(X, method, seed + i) for i in range(m)]
+    futures = [pool.submit(impute_once, X, method, seed + i) for i in range(m)]
+    return [f.result() for f in futures]
+
+def rubin(estimates, variances):
+    """Pool `m` estimates (first axis) and their sampling variances with Rubin's rules.
+
+    Returns {estimate, se, within, between, df, fmi}; df is Rubin's (1987) and fmi the
+    fraction of missing information (0 when all imputations agree).
+    """
+    q, u = np.asarray(estimates, dtype=float), np.asarray(variances, dtype=float)
+    m = q.shape[0]
+    qbar, within = q.mean(axis=0), u.mean(axis=0)
+    between = q.var(axis=0, ddof=1) if m > 1 else np.zeros_like(qbar)
+    total = within + (1 + 1 / m) * between
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (1 + 1 / m) * between / within
+        df = np.where(between > 0, (m - 1) * (1 + 1 / r) ** 2, np.inf)
+        fmi = (r + 2 / (df + 3)) / (r + 1)
+    return {'estimate': qbar, 'se': np.sqrt(total), 'within': within, 'between': between, 'df': df, 'fmi': fmi}
+
+def alpha_variance(values):
+    """Cronbach's alpha of the columns of `values` and its asymptotic sampling variance
+    (van Zyl, Neudecker & Nel, 2000)."""
+    n, k = values.shape
+    s = np.cov(values, rowvar=False)
+    total, trace = s.sum(), np.trace(s)
+    alpha = k / (k - 1) * (1 - trace / total)
+    q = 2 * k ** 2 / ((k - 1) ** 2 * total ** 3) * (total * (np.trace(s @ s) + trace ** 2)
+                                                      - 2 * trace * (s @ s).sum())
+    return alpha, q / n
@@ -0,0 +1,236 @@
+import argparse
+import hashlib
+import itertools
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import cfa_jobs
+import pipeline_profile
+import playground_engine as engine
+import results_store
+from figure_farm import FigureSpec, render_all
+from pipeline_context import PipelineContext
+from playground_grid import reliability
+from sem_estimator import estimator_settings
+
+# Multiverse sensitivity analysis.
+# Instead of the three hand-picked variants (_raw, _no_md, _with_md), every combination
+# of the cleaning choices is evaluated: attention-check strictness x Mahalanobis
+# p-threshold (or no MD filter) x survey-year subset x item set (all items or each
+# single-item drop) x reverse-keyed items (kept as harmonized, or excluded). Each grid
+# point is reduced to its respondent mask (the raw rows it keeps) and item set; points
+# with the same mask hash and items are analyzed once. Per unique subset the engine
+# computes subscale alpha, KMO, CFA fit (through the CFA cache, warm-started, in the
+# CFA process pool), Ward clusters (k = 2, high/low profile) and the consistency and
+# coverage of the baseline fsQCA solution (04_qca/qca_report_r.txt; calibrated like the
+# R script). Results go to one tidy table (one row per grid point) plus specification
+# curves in 06_reports/figures/; the range of every metric is recorded in the results store.
+# The published analysis (Strict QC, p = 0.001, both years, all items) is the baseline.
+#
+#   python main.py multiverse   (or: python scripts/multiverse.py [--md-grid ...] [--no-item-drops] [--workers N])
+
+SOURCE_FILE = '01_harmonized/df_iri_clean_raw.csv'
+QCA_REPORT = '04_qca/qca_report_r.txt'
+TABLE_FILE = '06_reports/multiverse/multiverse.csv'
+DEFAULT_MD_GRID = [None, 0.0001, 0.001, 0.01]
+# Reverse-keyed IRI items (already reversed in the harmonized data)
+REVERSED_ITEMS = ['FS7', 'FS12', 'PT3', 'PT15', 'EC4', 'EC14', 'EC18', 'PD13', 'PD19']
+REVERSAL = {'keep': (), 'exclude': tuple(REVERSED_ITEMS)}
+BASELINE = {'qc': 'Strict', 'md_p': 0.001, 'items': 'all', 'reversed': 'keep'}
+DEFAULT_TERMS = ['pt_f*pd_f']  # used when no R report is available
+MIN_N = 50
+# metric -> axis label of its specification curve
+CURVES = {'CFI': 'CFI', 'RMSEA': 'RMSEA', 'alpha_mean': "Mean Cronbach's alpha",
+          'qca_incl': 'fsQCA solution consistency (inclS)'}
+SUBSCALES = list(engine.SUBSCALES)
+
+def solution_terms(text):
+    """Terms of the first parsimonious solution (M1) of an R QCA report."""
+    match = re.search(r'M1:(.*?)->', text or '', re.S)
+    if match is None:
+        return DEFAULT_TERMS
+    return [t.strip() for t in match.group(1).split('+') if t.strip()]
+
+def mask_hash(index):
+    """Fingerprint of the respondent mask: the sorted raw row labels a subset keeps."""
+    return hashlib.sha256(np.sort(np.asarray(index, dtype=np.int64)).tobytes()).hexdigest()[:16]
+
+def years_label(years):
+    return '+'.join(str(int(y)) for y in sorted(years))
+
+# --- Grid ---
+def grid_points(df, qc_levels, md_grid, item_drops=True):
+    """Yield (spec, active items, kept row index) for every point of the multiverse."""
+    all_years = sorted(int(y) for y in df['year'].unique())
+    year_sets = [c for r in range(1, len(all_years) + 1) for c in itertools.combinations(all_years, r)]
+    item_sets = [('all', ())] + ([(f"-{i}", (i,)) for i in engine.ALL_ITEMS] if item_drops else [])
+    # Item set outermost: consecutive fits share a model structure and warm-start each other
+    for (items, dropped), (reversal, excluded) in itertools.product(item_sets, REVERSAL.items()):
+        active = [i for i in engine.ALL_ITEMS if i not in dropped and i not in excluded]
+        for qc, years in itertools.product(qc_levels, year_sets):
+            temp, md = engine.distances(df, qc, active, years)
+            for p in md_grid:
+                data = temp if p is None else engine.remove_outliers(temp, md, p, len(active))
+                spec = {'qc': qc.split(' ')[0], 'md_p': p, 'years': years_label(years), 'items': items,
+                        'reversed': reversal, 'n_items': len(active)}
+                yield spec, active, data.index
+
+# --- Analyses of one subset (run in the pool workers, or in-process) ---
+def calibrate(x, probs=(0.05, 0.5, 0.95)):
+    """Direct-method fuzzy calibration on quantile anchors (QCA::calibrate, logistic, idm = 0.95)."""
+    e, c, i = np.nanquantile(x, probs)
+    if len({e, c, i}) < 3:
+        e, c, i = np.nanmin(x), np.nanmean(x), np.nanmax(x)
+    scale = np.log(0.95 / 0.05)
+    dev = np.where(x >= c, (x - c) / (i - c), (x - c) / (c - e)) * scale
+    res = 1 / (1 + np.exp(-dev))
+    res[res == 0.5] = 0.501
+    return res
+
+def qca_fit(means, gender, ses, terms):
+    """Consistency and coverage of the sufficiency solution `terms` for high total empathy."""
+    ok = ~(np.isnan(gender) | np.isnan(ses))
+    sets = {f"{k.split('_')[0].lower()}_f": calibrate(v[ok]) for k, v in means.items()}
+    sets['gen_f'] = (gender[ok] == 2).astype(float)
+    sets['ses_f'] = (ses[ok] >= 3).astype(float)
+    outcome = calibrate(np.mean(list(means.values()), axis=0)[ok])
+    solution = np.zeros(ok.sum())
+    for term in terms:
+        member = np.ones(ok.sum())
+        for cond in term.split('*'):
+            name = cond.lstrip('~')
+            member = np.minimum(member, 1 - sets[name] if cond.startswith('~') else sets[name])
+        solution = np.maximum(solution, member)
+    overlap = np.minimum(solution, outcome).sum()
+    return {'qca_incl': overlap / solution.sum(), 'qca_cov': overlap / outcome.sum()}
+
+def clusters(means):
+    """Ward clustering (k = 2) of the standardized subscale means; profiles ordered high -> low."""
+    from scipy.cluster.hierarchy import fcluster, linkage
+    X = np.column_stack(list(means.values()))
+    labels = fcluster(linkage((X - X.mean(axis=0)) / X.std(axis=0), method='ward'), 2, criterion='maxclust')
+    groups = sorted(np.unique(labels), key=lambda k: -X[labels == k].mean())
+    out = {'high_share': float(np.mean(labels == groups[0]))}
+    for level, k in zip(['high', 'low'], groups):
+        out.update({f"{level}_{name}": float(v) for name, v in zip(means, X[labels == k].mean(axis=0))})
+    return out
+
+def analyze(data, active, terms, settings):
+    """Every multiverse metric of one subset (rows x active items)."""
+    from factor_analyzer import calculate_kmo
+    items = data[active]
+    out = {}
+    alpha = reliability(items, active)['alpha']
+    out.update({f"alpha_{k}": alpha.get(k) for k in SUBSCALES})
+    out['alpha_mean'] = float(np.mean(list(alpha.values()))) if alpha else None
+    out['kmo'] = float(calculate_kmo(items)[1])
+    try:
+        stats = cfa_jobs.fit_job(engine.model_description(active), items, settings).stats
+        out.update({k: float(stats[k].iloc[0]) for k in ['CFI', 'TLI', 'RMSEA'] if k in stats})
+    except Exception as e:
+        out['cfa_error'] = f"{type(e).__name__}: {e}"
+    values = items.to_numpy(dtype=float)
+    means = {f"{name}_mean": values[:, [active.index(i) for i in subscale if i in active]].mean(axis=1)
+             for name, subscale in engine.SUBSCALES.items()}
+    out.update(clusters(means))
+    out.update(qca_fit(means, data['gender'].to_numpy(dtype=float), data['ses'].to_numpy(dtype=float), terms))
+    return out
+
+# --- Engine ---
+def evaluate(df, qc_levels, md_grid, item_drops, workers, terms):
+    """Tidy DataFrame with one row per grid point; identical subsets are analyzed once."""
+    settings = estimator_settings()
+    pool = cfa_jobs.make_pool(workers) if workers > 1 else None
+    rows, results = [], {}  # analysis key -> metrics
+    start = time.perf_counter()
+    try:
+        for items, batch in itertools.groupby(grid_points(df, qc_levels, md_grid, item_drops),
+                                              key=lambda pt: (pt[0]['items'], pt[0]['reversed'])):
+            jobs = {}
+            for spec, active, index in batch:
+                key = (mask_hash(index), tuple(active))
+                rows.append({**spec, 'n': len(index), 'subset': key[0], 'analysis': key})
+                if key not in results and key not in jobs and len(index) >= MIN_N:
+                    jobs[key] = (df.loc[index, active + ['gender', 'ses']], active)
+            futures = {key: pool.submit(analyze, data, active, terms, settings)
+                       for key, (data, active) in jobs.items()} if pool else {}
+            for key, (data, active) in jobs.items():
+                results[key] = futures[key].result() if pool else analyze(data, active, terms, settings)
+            print(f"  items={'/'.join(items):<14} points={len(rows):<6} analyses={len(results):<5} "
+                  f"{time.perf_counter() - start:7.1f}s")
+    finally:
+        if pool:
+            pool.shutdown()
+
+    table = pd.DataFrame(rows)
+    ids = {key: i for i, key in enumerate(dict.fromkeys(table['analysis']), 1)}
+    metrics = pd.DataFrame([{'analysis': k, **results.get(k, {})} for k in ids]).round(4)
+    table = table.merge(metrics, on='analysis', how='left')
+    table['analysis'] = table['analysis'].map(ids)
+    table['baseline'] = ((table['qc'] == BASELINE['qc']) & (table['md_p'] == BASELINE['md_p'])
+                         & (table['years'] == years_label(df['year'].unique()))
+                         & (table['items'] == BASELINE['items']) & (table['reversed'] == BASELINE['reversed']))
+    return table
+
+def curve_figures(table):
+    """Specification curves of the headline metrics (the item choice is shown as all / one dropped)."""
+    frame = table.assign(md_p=table['md_p'].map(lambda p: 'none' if pd.isnull(p) else f"{p:g}"),
+                         items=np.where(table['items'] == 'all', 'all', 'one dropped'))
+    choices = ['qc', 'md_p', 'years', 'items', 'reversed']
+    return [FigureSpec(f'06_reports/figures/multiverse_{metric}.png', 'specification_curve',
+                       frame[[metric, 'baseline'] + choices].dropna(subset=[metric]).reset_index(drop=True),
+                       {'metric': metric, 'label': label, 'choices': choices,
+                        'title': f'Specification curve: {label} ({frame[metric].notna().sum()} specifications)'},
+                       figsize=(8.5, 7))
+            for metric, label in CURVES.items() if metric in frame]
+
+def summary(table):
+    """Results-store record: grid size and the spread of every headline metric."""
+    metrics = ['n', 'CFI', 'TLI', 'RMSEA', 'kmo', 'alpha_mean', 'qca_incl', 'qca_cov', 'high_share']
+    metrics = [m for m in metrics if m in table]
+    base = table[table['baseline']]
+    return {'n_points': len(table), 'n_subsets': table['subset'].nunique(),
+            'n_analyses': table.loc[table['kmo'].notna(), 'analysis'].nunique(),
+            'baseline': {m: base[m].iloc[0] for m in metrics} if not base.empty else {},
+            'spread': {m: {'min': table[m].min(), 'median': table[m].median(), 'max': table[m].max()}
+                       for m in metrics}}
+
+def run(ctx, md_grid=DEFAULT_MD_GRID, qc_levels=tuple(engine.QC_MAX), item_drops=True,
+        workers=cfa_jobs.MAX_WORKERS):
+    df = ctx.read_csv(SOURCE_FILE)
+    terms = solution_terms(ctx.read_text(QCA_REPORT) if ctx.exists(QCA_REPORT) else None)
+    print(f"[*] Multiverse over QC {list(qc_levels)} x MD {list(md_grid)} x years x "
+          f"{'single-item drops' if item_drops else 'all items'} x reverse-keyed items (workers: {workers})...")
+    with pipeline_profile.section('multiverse', rows=len(df)):
+        table = evaluate(df, qc_levels, md_grid, item_drops, workers, terms)
+    ctx.write_csv(table, TABLE_FILE, index=False)
+
+    record = summary(table)
+    results_store.record(ctx, 'multiverse', **record)
+    stats = render_all(ctx, curve_figures(table))
+    print(f"[SUCCESS] {record['n_points']} specifications -> {record['n_subsets']} distinct respondent subsets, "
+          f"{record['n_analyses']} analyses -> {TABLE_FILE} ({stats['rendered']} curves rendered, "
+          f"{stats['cached']} from cache)")
+    for metric in CURVES:
+        spread = record['spread'].get(metric)
+        if spread:
+            print(f"  {metric:<11} baseline {results_store.fmt(record['baseline'].get(metric))}  "
+                  f"range {spread['min']:.3f} - {spread['max']:.3f} (median {spread['median']:.3f})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multiverse sensitivity analysis over the cleaning choices.")
+    parser.add_argument('--md-grid', default=','.join('none' if p is None else str(p) for p in DEFAULT_MD_GRID),
+                        help="Mahalanobis p-thresholds ('none' = no MD filter)")
+    parser.add_argument('--no-item-drops', action='store_true', help="Only the full item set (no single-item drops)")
+    parser.add_argument('--workers', type=int, default=cfa_jobs.MAX_WORKERS)
+    args = parser.parse_args(argv)
+    md_grid = [None if p.strip().lower() == 'none' else float(p) for p in args.md_grid.split(',') if p.strip()]
+    run(PipelineContext.standalone(), md_grid, item_drops=not args.no_item_drops, workers=args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+import pipeline_profile
+
+# Shared I/O context for pipeline stages.
+# Stages read and write every artifact through a PipelineContext. When the runner
+# executes stages in one process, frames written by an upstream stage are handed to
+# downstream stages in memory and nothing touches the disk until `flush()`. A frame is
+# serialized once when written; readers parse those exact CSV bytes (once per index
+# layout), so they see the same values a read of the flushed file gives, and in-process
+# runs reproduce subprocess runs bit for bit. Standalone script runs use a
+# write-through context instead.
+# Every artifact is written crash-safe: to a temp file next to the target, fsynced and
+# renamed over it, so a crashed or concurrent run never leaves a half-written file for
+# the next stage to read. Each flushed artifact is recorded with its size and SHA-256 in
+# the run manifest (06_reports/run_manifest.json). Aliases (e.g. df_iri_clean.csv for
+# df_iri_clean_with_md.csv) are hardlinks to their target instead of second writes.
+# pandas is imported lazily so the runner can check fingerprints without it.
+
+MANIFEST_FILE = '06_reports/run_manifest.json'
+
+
+def _fsync_dir(directory):
+    if os.name == 'posix':
+        fd = os.open(directory or '.', os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_atomic(path, data):
+    """Write `data` to `path` through a fsynced temp file and an atomic rename."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(directory)
+
+
+def link_atomic(target, path):
+    """Make `path` a hardlink to `target` (a copy where hardlinks are unsupported), replacing it atomically."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(target, tmp)
+    except OSError:
+        shutil.copyfile(target, tmp)
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+class PipelineContext:
+    def __init__(self, write_through=False):
+        self.write_through = write_through
+        self._frames = {}       # path -> CSV bytes of a frame written during this run
+        self._disk_frames = {}  # (path, index_col) -> DataFrame parsed from those bytes or from disk
+        self._pending = {}      # path -> (owner stage, bytes or _Alias)
+        self._aliases = {}      # alias path -> target path declared during this run
+        self._lock = threading.RLock()
+        self._local = threading.local()  # stage running on this thread (owner of its writes)
+
+    @classmethod
+    def standalone(cls):
+        return cls(write_through=True)
+
+    @property
+    def stage(self):
+        return getattr(self._local, 'stage', None)
+
+    @stage.setter
+    def stage(self, name):
+        self._local.stage = name
+
+    # --- Reading ---
+    def exists(self, path):
+        with self._lock:
+            path = self._aliases.get(path, path)
+            return path in self._pending or path in self._frames or os.path.exists(path)
+
+    def read_csv(self, path, index_col=None):
+        with self._lock:
+            path = self._aliases.get(path, path)
+            key = (path, index_col)
+            if key not in self._disk_frames:
+                import pandas as pd
+                data = self._frames.get(path)
+                source = path if data is None else io.BytesIO(data)
+                self._disk_frames[key] = pd.read_csv(source, index_col=index_col)
+            df = self._disk_frames[key].copy()
+        pipeline_profile.add_rows(len(df))
+        return df
+
+    def read_raw(self, path):
+        """Raw survey workbook. A CSV export with the same stem is used when the workbook is absent
+        (large synthetic datasets, see scripts/synthetic_iri.py)."""
+        import pandas as pd
+        csv_path = os.path.splitext(path)[0] + '.csv'
+        if not os.path.exists(path) and os.path.exists(csv_path):
+            df = pd.read_csv(csv_path)
+        else:
+            df = pd.read_excel(path)
+        pipeline_profile.add_rows(len(df))
+        return df
+
+    def read_bytes(self, path):
+        with self._lock:
+            path = self._aliases.get(path, path)
+            pending = self._pending.get(path)
+            if pending is not None and isinstance(pending[1], bytes):
+                return pending[1]
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def read_text(self, path):
+        return self.read_bytes(path).decode('utf-8', errors='replace')
+
+    def open_binary(self, path):
+        """File-like object for `path` (e.g. for `doc.add_picture`)."""
+        return io.BytesIO(self.read_bytes(path))
+
+    # --- Writing ---
+    def write_csv(self, df, path, index=True):
+        data = df.to_csv(index=index).encode('utf-8')
+        with self._lock:
+            self._aliases.pop(path, None)
+            self._frames[path] = data
+            self._disk_frames = {k: v for k, v in self._disk_frames.items() if k[0] != path}
+            self._stage_write(path, data)
+
+    def write_text(self, path, text):
+        self.write_bytes(path, text.encode('utf-8'))
+
+    def write_bytes(self, path, data):
+        with self._lock:
+            self._aliases.pop(path, None)
+            self._frames.pop(path, None)
+            self._disk_frames = {k: v for k, v in self._disk_frames.items() if k[0] != path}
+            self._stage_write(path, bytes(data))
+
+    def alias(self, path, target):
+        """Publish the artifact `target` under a second name; on disk `path` becomes a hardlink to it."""
+        with self._lock:
+            self._aliases[path] = target
+            self._frames.pop(path, None)
+            self._disk_frames = {k: v for k, v in self._disk_frames.items() if k[0] != path}
+            self._stage_write(path, _Alias(target))
+
+    def save_figure(self, fig, path, **savefig_kwargs):
+        """Render a matplotlib figure now; the encoded image is written on flush."""
+        buf = io.BytesIO()
+        with pipeline_profile.section('figure_render'):
+            fig.savefig(buf, format=os.path.splitext(path)[1].lstrip('.'), **savefig_kwargs)
+        self.write_bytes(path, buf.getvalue())
+
+    def _stage_write(self, path, payload):
+        self._pending[path] = (self.stage, payload)
+        if self.write_through:
+            self.flush([path])
+
+    # --- Persistence ---
+    def pending_paths(self):
+        with self._lock:
+            return list(self._pending)
+
+    def discard(self, stage):
+        """Drop everything a failed stage queued so downstream stages never see partial output."""
+        with self._lock:
+            for path in [p for p, (owner, _) in self._pending.items() if owner == stage]:
+                del self._pending[path]
+                self._frames.pop(path, None)
+                self._aliases.pop(path, None)
+                self._disk_frames = {k: v for k, v in self._disk_frames.items() if k[0] != path}
+
+    def flush(self, paths=None):
+        """Persist pending artifacts atomically and record them in the run manifest."""
+        with self._lock:
+            written = {}
+            for path in list(self._pending if paths is None else paths):
+                self._flush_one(path, written)
+            if written:
+                self._update_manifest(written)
+
+    def _flush_one(self, path, written):
+        if path not in self._pending:
+            return
+        owner, payload = self._pending.pop(path)
+        if isinstance(payload, _Alias):
+            self._flush_one(payload.target, written)  # the target goes first
+            link_atomic(payload.target, path)
+            entry = written.get(payload.target) or _file_entry(payload.target, owner)
+            written[path] = {**entry, 'alias_of': payload.target}
+            return
+        write_atomic(path, payload)
+        written[path] = {'size': len(payload), 'sha256': hashlib.sha256(payload).hexdigest(), 'stage': owner}
+
+    def _update_manifest(self, written):
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        manifest = {'artifacts': {}}
+        if os.path.exists(MANIFEST_FILE):
+            try:
+                with open(MANIFEST_FILE, 'r') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                pass  # unreadable manifest: start a new one
+        for path, entry in written.items():
+            manifest['artifacts'][path] = {**entry, 'written': now}
+        manifest['updated'] = now
+        manifest['artifacts'] = dict(sorted(manifest['artifacts'].items()))
+        write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=1).encode('utf-8'))
+
+
+class _Alias:
+    def __init__(self, target):
+        self.target = target
+
+
+def _file_entry(path, stage):
+    """Manifest entry of an artifact already on disk."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return {'size': os.path.getsize(path), 'sha256': h.hexdigest(), 'stage': stage}
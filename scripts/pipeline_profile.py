@@ -0,0 +1,131 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight timing / memory instrumentation for pipeline stages.
+# `stage(name)` and `section(name, rows=...)` record wall time, CPU time, the peak
+# resident set size of the process so far (a high-water mark, cumulative over every
+# in-process stage) and how much the block raised it (rss_growth_mb). Section names used across the pipeline:
+#   excel_load, mahalanobis, kmo_bartlett, cfa_fit, linkage, figure_render, docx_build
+# When a stage runs in a subprocess, the runner passes MAP8_STAGE / MAP8_METRICS_FILE
+# and the child dumps its records there on exit. In-process stages may run on
+# concurrent threads, so the current stage is tracked per thread.
+
+_lock = threading.Lock()
+_records = []
+_stage_rows = {}
+_local = threading.local()
+_default_stage = os.environ.get('MAP8_STAGE')
+
+
+def current_stage():
+    return getattr(_local, 'stage', _default_stage)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None when it cannot be measured)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def add_rows(n):
+    """Attribute `n` processed rows to the current stage."""
+    with _lock:
+        stage = current_stage()
+        _stage_rows[stage] = _stage_rows.get(stage, 0) + int(n)
+
+
+@contextmanager
+def section(name, rows=None, kind='section'):
+    """Time a named hot section. The yielded record's 'rows' may be filled in by the caller."""
+    rec = {'stage': current_stage(), 'name': name, 'kind': kind, 'rows': rows}
+    wall0, cpu0, peak0 = time.perf_counter(), time.process_time(), peak_rss_mb()
+    try:
+        yield rec
+    finally:
+        rec['wall_s'] = round(time.perf_counter() - wall0, 4)
+        rec['cpu_s'] = round(time.process_time() - cpu0, 4)
+        rec['peak_rss_mb'] = peak_rss_mb()
+        rec['rss_growth_mb'] = round(rec['peak_rss_mb'] - peak0, 1) if peak0 is not None else None
+        with _lock:
+            _records.append(rec)
+
+
+@contextmanager
+def stage(name):
+    previous, _local.stage = current_stage(), name
+    try:
+        with section(name, kind='stage') as rec:
+            rec['stage'] = name
+            yield rec
+        rec['rows'] = _stage_rows.get(name)
+    finally:
+        _local.stage = previous
+
+
+def records():
+    with _lock:
+        return [dict(r) for r in _records]
+
+
+def stage_rows():
+    with _lock:
+        return dict(_stage_rows)
+
+
+def aggregate_sections(recs):
+    """Collapse repeated calls of the same (stage, section) into one row."""
+    out = {}
+    for r in recs:
+        if r['kind'] != 'section':
+            continue
+        agg = out.setdefault((r['stage'], r['name']), {'stage': r['stage'], 'name': r['name'], 'calls': 0,
+                                                       'wall_s': 0.0, 'cpu_s': 0.0, 'rows': None,
+                                                       'peak_rss_mb': None, 'rss_growth_mb': None})
+        agg['calls'] += 1
+        agg['wall_s'] = round(agg['wall_s'] + r['wall_s'], 4)
+        agg['cpu_s'] = round(agg['cpu_s'] + r['cpu_s'], 4)
+        if r.get('rows') is not None:
+            agg['rows'] = (agg['rows'] or 0) + r['rows']
+        if r.get('peak_rss_mb') is not None:
+            agg['peak_rss_mb'] = max(agg['peak_rss_mb'] or 0, r['peak_rss_mb'])
+        if r.get('rss_growth_mb') is not None:
+            agg['rss_growth_mb'] = round((agg['rss_growth_mb'] or 0) + r['rss_growth_mb'], 1)
+    return list(out.values())
+
+
+def write_run_metrics(path, stages, sections, **meta):
+    payload = {'generated': time.strftime('%Y-%m-%d %H:%M:%S'), **meta,
+               'stages': stages, 'sections': aggregate_sections(sections)}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+    return payload
+
+
+def _dump_child_metrics():
+    process = {'cpu_s': round(time.process_time(), 4), 'peak_rss_mb': peak_rss_mb(),
+               'rows': _stage_rows.get(_default_stage)}
+    with open(os.environ['MAP8_METRICS_FILE'], 'w') as f:
+        json.dump({'process': process, 'sections': records()}, f)
+
+
+if os.environ.get('MAP8_METRICS_FILE'):
+    atexit.register(_dump_child_metrics)
@@ -0,0 +1,560 @@
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import factor_scores
+import pipeline_profile
+from pipeline_context import PipelineContext, write_atomic
+
+# Incremental MAP-8 pipeline runner.
+# Every stage declares its inputs, code, outputs and the environment settings it reads.
+# A stage is skipped (make-style) when the fingerprint of its command, code, inputs and
+# settings matches the last successful run and all of its outputs still exist.
+# Independent stages (SEM, clustering, fsQCA) run concurrently on a bounded worker pool.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_FILE = os.path.join(ROOT_DIR, '.pipeline_state.json')
+SCRIPTS_DIR = os.path.join(ROOT_DIR, 'scripts')
+METRICS_FILE = os.path.join(ROOT_DIR, '06_reports', 'run_metrics.json')
+PROFILES_DIR = os.path.join(ROOT_DIR, '06_reports', 'profiles')
+R_WINDOWS_PATH = r'C:\Program Files\R\R-4.5.1\bin\R.exe'
+DEFAULT_JOBS = max(1, min(4, os.cpu_count() or 1))
+
+VARIANTS = ['_raw', '_no_md', '_with_md']
+# Shared modules every Python stage imports
+COMMON_CODE = ['scripts/pipeline_context.py', 'scripts/pipeline_profile.py']
+CLEAN_FILES = [f'01_harmonized/df_iri_clean{s}.csv' for s in VARIANTS]
+# Structured result records (scripts/results_store.py)
+RESULTS_DIR = '06_reports/results'
+RESULT_RECORDS = {stage: [f'{RESULTS_DIR}/{stage}{s}.json' for s in VARIANTS] for stage in ['prep', 'sem', 'clustering']}
+RESULT_RECORDS['prep'].append(f'{RESULTS_DIR}/prep.json')
+# CFA factor scores (scripts/factor_scores.py); clustering and fsQCA read them instead of
+# the clean data when MAP8_SCORES selects them (and then wait for the SEM stage). Their
+# env lists MAP8_SCORES, since regression and bartlett scores come from the same files.
+SCORE_FILES = [factor_scores.SCORES_FILE.format(suffix=s) for s in VARIANTS]
+SCORE_INPUTS = [factor_scores.score_input(s) for s in VARIANTS]
+# CFA estimator overrides read by sem_estimator.estimator_settings()
+SEM_ENV = ['MAP8_SEM_OBJ', 'MAP8_SEM_SOLVER']
+
+
+@dataclass
+class Stage:
+    name: str
+    description: str
+    script: str
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    code: list = field(default_factory=list)
+    env: list = field(default_factory=list)  # environment variables that change the stage's results
+    kind: str = 'python'  # 'python', 'r' or 'pip'
+
+
+STAGES = [
+    Stage('deps', "Updating Python Dependencies", 'requirements.txt',
+          inputs=['requirements.txt'], kind='pip'),
+    Stage('prep', "Data Harmonization & Outlier Detection", 'scripts/pipeline_step2_data_prep.py',
+          inputs=['00_raw/1_2023_data_IRI.xlsx', '00_raw/2_2024_data_IRI.xlsx'],
+          code=['scripts/results_store.py', 'scripts/careless.py', 'scripts/imputation.py'], env=['MAP8_CARELESS'],
+          outputs=CLEAN_FILES + ['01_harmonized/df_iri_clean.csv', '02_eda/descriptive_stats.csv',
+                                 '02_eda/eda_cleaning_report.txt']
+                  + [f'02_eda/descriptive_stats{s}.csv' for s in VARIANTS] + RESULT_RECORDS['prep']),
+    Stage('playground', "Playground Data Harmonization (2023-2025)", 'scripts/prepare_playground_data.py',
+          inputs=['00_raw/1_2023_data_IRI.xlsx', '00_raw/2_2024_data_IRI.xlsx', '00_raw/3_2025_data_IRI.xlsx'],
+          code=['scripts/stats_cube.py', 'scripts/playground_engine.py', 'scripts/careless.py'],
+          outputs=['01_harmonized/df_iri_playground.csv', '01_harmonized/df_iri_playground.feather',
+                   '01_harmonized/iri_stats_cube.npz']),
+    # Offline precompute for the hosted playground; slow, so only built on request
+    Stage('playground_grid', "Playground Precomputed Grid", 'scripts/playground_grid.py',
+          inputs=['01_harmonized/df_iri_playground.csv', 'benchmarks/sem_estimator.json'],
+          code=['scripts/playground_engine.py', 'scripts/sem_estimator.py', 'scripts/cfa_cache.py',
+                'scripts/cfa_jobs.py', 'scripts/stats_cube.py'], env=SEM_ENV,
+          outputs=['01_harmonized/playground_grid.sqlite']),
+    Stage('sem', "CB-SEM & Reliability Analysis", 'scripts/pipeline_step4a_advanced_sem.py',
+          inputs=CLEAN_FILES + ['benchmarks/sem_estimator.json'],
+          code=['scripts/sem_estimator.py', 'scripts/cfa_cache.py', 'scripts/results_store.py',
+                'scripts/factor_scores.py'], env=SEM_ENV,
+          outputs=[f'03_sem/{name}{s}.{ext}' for s in VARIANTS + ['']
+                   for name, ext in [('reliability_stats', 'csv'), ('factor_correlations', 'csv'),
+                                     ('cfa_estimates', 'csv'), ('cfa_fit_indices', 'csv'),
+                                     ('advanced_sem_detailed_report', 'txt')]]
+                  + [f'03_sem/subscale_corr{s}.csv' for s in VARIANTS] + SCORE_FILES + RESULT_RECORDS['sem']),
+    Stage('clustering', "Hierarchical Cluster Analysis", 'scripts/pipeline_step4c_clustering.py',
+          inputs=SCORE_INPUTS, code=['scripts/results_store.py', 'scripts/figure_farm.py', 'scripts/factor_scores.py'],
+          env=['MAP8_SCORES'],
+          outputs=[f'05_clustering/cluster_profiles{s}.csv' for s in VARIANTS]
+                  + [f'05_clustering/cluster_{name}{s}{preview}.png' for s in VARIANTS
+                     for name in ['profiles', 'boxplots'] for preview in ['', '_preview']]
+                  + ['05_clustering/cluster_profiles.csv'] + RESULT_RECORDS['clustering']),
+    Stage('qca', "fsQCA Analysis (R)", 'code/pipeline_step4b_qca.R', kind='r',
+          inputs=SCORE_INPUTS, env=['MAP8_SCORES'],
+          outputs=[f'04_qca/qca_report_r{s}.txt' for s in VARIANTS + ['']]),
+    Stage('qca_sweep', "fsQCA Robustness Sweep (R)", 'code/pipeline_step4b_qca_sweep.R', kind='r',
+          inputs=SCORE_INPUTS, env=['MAP8_SCORES'],
+          outputs=[f'04_qca/qca_sweep_{name}{s}.{ext}' for s in VARIANTS
+                   for name, ext in [('grid', 'csv'), ('terms', 'csv'), ('report', 'txt')]]),
+    Stage('plots', "3-Way Comparative Visualizations", 'scripts/generate_visual_plots.py',
+          inputs=[f'03_sem/subscale_corr{s}.csv' for s in VARIANTS]
+                 + [f'05_clustering/cluster_profiles{s}.csv' for s in VARIANTS],
+          code=['scripts/figure_farm.py'],
+          outputs=[f'06_reports/figures/{name}{s}{preview}.png' for s in VARIANTS
+                   for name in ['correlation_heatmap', 'cluster_profiles_bar'] for preview in ['', '_preview']]),
+    Stage('summary', "Technical Pipeline Summary (MD)", 'scripts/generate_final_report.py',
+          inputs=['04_qca/qca_report_r.txt'] + [p for records in RESULT_RECORDS.values() for p in records],
+          code=['scripts/results_store.py'], outputs=['06_reports/MAP8_Implementation_Summary.md']),
+    Stage('manuscript', "Academic Manuscript (Word)", 'scripts/generate_word_report.py',
+          inputs=['02_eda/descriptive_stats.csv', '03_sem/cfa_estimates.csv', '04_qca/qca_report_r.txt',
+                  '05_clustering/cluster_profiles.csv'] + RESULT_RECORDS['prep'] + RESULT_RECORDS['sem']
+                 + [f'06_reports/figures/{name}{s}.png' for s in VARIANTS
+                    for name in ['correlation_heatmap', 'cluster_profiles_bar']],
+          code=['scripts/results_store.py', 'scripts/docx_tables.py', 'scripts/docx_images.py',
+                'scripts/docx_sections.py'],
+          outputs=['06_reports/Manuscript_Results_Replication.docx', '06_reports/manuscript_build.json']),
+    # Short results section; built on request
+    Stage('results_section', "Results Section (Word)", 'scripts/generate_results_word.py',
+          inputs=RESULT_RECORDS['prep'] + RESULT_RECORDS['sem'] + RESULT_RECORDS['clustering'],
+          code=['scripts/results_store.py', 'scripts/docx_tables.py'], outputs=['06_reports/Results_Section_Final.docx']),
+    # Multiple imputation with Rubin-pooled alpha, CFA and clusters; built on request
+    Stage('imputation', "Multiple Imputation & Pooled Analyses", 'scripts/pipeline_step4d_imputation.py',
+          inputs=CLEAN_FILES + ['benchmarks/sem_estimator.json'],
+          code=['scripts/imputation.py', 'scripts/sem_estimator.py', 'scripts/cfa_cache.py', 'scripts/cfa_jobs.py',
+                'scripts/results_store.py'], env=SEM_ENV,
+          outputs=[f'06_reports/imputation/pooled_{name}{s}.csv' for s in VARIANTS
+                   for name in ['reliability', 'cfa', 'fit', 'clusters']]
+                  + [f'{RESULTS_DIR}/imputation{s}.json' for s in VARIANTS]),
+    # Multiverse over every cleaning choice (minutes); built on request
+    Stage('multiverse', "Multiverse Sensitivity Analysis", 'scripts/multiverse.py',
+          inputs=['01_harmonized/df_iri_clean_raw.csv', '04_qca/qca_report_r.txt', 'benchmarks/sem_estimator.json'],
+          code=['scripts/playground_engine.py', 'scripts/playground_grid.py', 'scripts/sem_estimator.py',
+                'scripts/cfa_cache.py', 'scripts/cfa_jobs.py', 'scripts/stats_cube.py', 'scripts/figure_farm.py',
+                'scripts/results_store.py'], env=SEM_ENV,
+          outputs=['06_reports/multiverse/multiverse.csv', f'{RESULTS_DIR}/multiverse.json']
+                  + [f'06_reports/figures/multiverse_{metric}{preview}.png'
+                     for metric in ['CFI', 'RMSEA', 'alpha_mean', 'qca_incl'] for preview in ['', '_preview']]),
+]
+STAGE_MAP = {s.name: s for s in STAGES}
+
+# Targets of `python main.py` and `python run_full_reproduction.py`
+MAIN_TARGETS = ['prep', 'sem', 'clustering', 'qca', 'qca_sweep', 'summary']
+FULL_TARGETS = ['deps', 'prep', 'playground', 'sem', 'clustering', 'qca', 'qca_sweep',
+                'plots', 'summary', 'manuscript']
+
+
+def find_r():
+    if os.path.exists(R_WINDOWS_PATH):
+        return R_WINDOWS_PATH
+    return shutil.which('R')
+
+
+def stage_command(stage):
+    if stage.kind == 'python':
+        return [sys.executable, stage.script]
+    if stage.kind == 'pip':
+        return [sys.executable, '-m', 'pip', 'install', '-r', stage.script]
+    r_path = find_r()
+    if r_path is None:
+        return None
+    return [r_path, '--silent', '--no-echo', '--no-save', '--no-restore', '-f', stage.script]
+
+
+def producers():
+    """Map every declared output path to the stage that writes it."""
+    return {out: s.name for s in STAGES for out in s.outputs}
+
+
+def dependencies(stage, produced_by):
+    return sorted({produced_by[p] for p in stage.inputs if p in produced_by and produced_by[p] != stage.name})
+
+
+def resolve_order(targets):
+    """Topologically sort the targets plus their upstream stages (declaration order otherwise)."""
+    produced_by = producers()
+    ordered, seen = [], set()
+
+    def visit(name):
+        if name in seen: return
+        seen.add(name)
+        for dep in dependencies(STAGE_MAP[name], produced_by):
+            visit(dep)
+        ordered.append(name)
+
+    for s in STAGES:
+        if s.name in targets: visit(s.name)
+    return ordered
+
+
+# --- Fingerprinting ---
+def load_state():
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state):
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+
+def file_digest(path, file_cache):
+    """SHA-256 of a file, memoized on (size, mtime) so unchanged files are never re-read."""
+    full = os.path.join(ROOT_DIR, path)
+    try:
+        st = os.stat(full)
+    except FileNotFoundError:
+        return 'missing'
+    stamp = [st.st_size, st.st_mtime_ns]
+    cached = file_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(full, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    file_cache[path] = [stamp, h.hexdigest()]
+    return h.hexdigest()
+
+
+def stage_fingerprint(stage, file_cache):
+    h = hashlib.sha256()
+    h.update(json.dumps([stage.kind, stage.script, {var: os.environ.get(var, '') for var in stage.env}]).encode())
+    code = stage.code + (COMMON_CODE if stage.kind == 'python' else [])
+    for path in sorted(set([stage.script] + code + stage.inputs)):
+        h.update(f"{path}={file_digest(path, file_cache)}\n".encode())
+    return h.hexdigest()
+
+
+def is_up_to_date(stage, fingerprint, state):
+    if state['stages'].get(stage.name, {}).get('fingerprint') != fingerprint:
+        return False
+    return all(os.path.exists(os.path.join(ROOT_DIR, p)) for p in stage.outputs)
+
+
+# --- Execution ---
+_print_lock = threading.RLock()
+
+
+def log(msg):
+    with _print_lock:
+        print(msg, flush=True)
+
+
+class StagePrefixedStdout:
+    """sys.stdout proxy that prefixes lines printed by in-process stages with `[stage]`."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def set_prefix(self, prefix):
+        self.local.prefix = prefix
+        self.local.buffer = ''
+
+    def write(self, text):
+        prefix = getattr(self.local, 'prefix', None)
+        if prefix is None:
+            return self.stream.write(text)
+        self.local.buffer += text
+        *lines, self.local.buffer = self.local.buffer.split('\n')
+        with _print_lock:
+            for line in lines:
+                self.stream.write(f"    [{prefix}] {line}\n")
+            self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        prefix = getattr(self.local, 'prefix', None)
+        if prefix is not None and self.local.buffer:
+            self.write('\n')
+        self.stream.flush()
+
+
+def profile_path(stage, profiler):
+    ext = 'html' if profiler == 'pyinstrument' else 'prof'
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    return os.path.join(PROFILES_DIR, f'{stage.name}.{ext}')
+
+
+def execute(stage, cmd, profiler=None, cwd=ROOT_DIR, preexec_fn=None):
+    """Run one stage, streaming its combined stdout/stderr with a `[stage]` prefix.
+
+    Returns the stage metrics; Python children report their own CPU time, peak RSS
+    and hot sections through MAP8_METRICS_FILE. A child's peak RSS is its own, so no
+    separate growth figure is reported for it.
+    """
+    log(f"[*] {stage.name}: {stage.description}...")
+    if profiler and stage.kind == 'python':
+        out = profile_path(stage, profiler)
+        if profiler == 'pyinstrument':
+            cmd = cmd[:1] + ['-m', 'pyinstrument', '-r', 'html', '-o', out] + cmd[1:]
+        else:
+            cmd = cmd[:1] + ['-m', 'cProfile', '-o', out] + cmd[1:]
+    fd, metrics_file = tempfile.mkstemp(prefix=f'map8_{stage.name}_', suffix='.json')
+    os.close(fd)
+    start = time.perf_counter()
+    env = dict(os.environ, PYTHONUNBUFFERED='1', MAP8_STAGE=stage.name, MAP8_METRICS_FILE=metrics_file)
+    try:
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, bufsize=1, preexec_fn=preexec_fn)
+        for line in proc.stdout:
+            log(f"    [{stage.name}] {line.rstrip()}")
+        ok = proc.wait() == 0
+        result = {'ok': ok, 'wall_s': round(time.perf_counter() - start, 4),
+                  'cpu_s': None, 'peak_rss_mb': None, 'rss_growth_mb': None, 'rows': None, 'sections': []}
+        try:
+            with open(metrics_file, 'r') as f:
+                child = json.load(f)
+            result.update(child['process'])
+            result['sections'] = child['sections']
+        except (OSError, ValueError, KeyError):
+            pass  # R / pip stages, or a child that crashed before reporting
+        return result
+    finally:
+        os.remove(metrics_file)
+
+
+def execute_inprocess(stage, ctx, profiler=None):
+    """Import the stage module and call its `run(ctx)` entry point in this process."""
+    log(f"[*] {stage.name}: {stage.description} (in-process)...")
+    ctx.stage = stage.name
+    if isinstance(sys.stdout, StagePrefixedStdout):
+        sys.stdout.set_prefix(stage.name)
+    prof = None
+    try:
+        with pipeline_profile.stage(stage.name) as rec:
+            module = importlib.import_module(os.path.splitext(os.path.basename(stage.script))[0])
+            if profiler == 'pyinstrument':
+                from pyinstrument import Profiler
+                prof = Profiler()
+                prof.start()
+            elif profiler:
+                import cProfile
+                prof = cProfile.Profile()
+                prof.enable()
+            try:
+                module.run(ctx)
+            finally:
+                if profiler == 'pyinstrument': prof.stop()
+                elif profiler: prof.disable()
+        ok = True
+    except Exception:
+        traceback.print_exc(file=sys.stdout)
+        ctx.discard(stage.name)
+        ok = False
+    finally:
+        if isinstance(sys.stdout, StagePrefixedStdout):
+            sys.stdout.flush()
+            sys.stdout.set_prefix(None)
+    if prof is not None:
+        out = profile_path(stage, profiler)
+        if profiler == 'pyinstrument':
+            with open(out, 'w') as f:
+                f.write(prof.output_html())
+        else:
+            prof.dump_stats(out)
+    return {'ok': ok, 'wall_s': rec['wall_s'], 'cpu_s': rec['cpu_s'],
+            'peak_rss_mb': rec['peak_rss_mb'], 'rss_growth_mb': rec['rss_growth_mb'], 'rows': rec['rows'],
+            'sections': []}
+
+
+def stage_dependencies(name, scheduled, produced_by):
+    deps = dependencies(STAGE_MAP[name], produced_by)
+    # Python stages wait for the dependency install when it is part of the run
+    if 'deps' in scheduled and name != 'deps' and STAGE_MAP[name].kind == 'python':
+        deps.append('deps')
+    return deps
+
+
+def run_pipeline(targets, force=(), force_all=False, jobs=None, mode='inprocess', profiler=None):
+    """Run `targets` (and their upstream stages) with at most `jobs` stages in flight.
+
+    A stage starts as soon as every stage it depends on has finished. When a stage
+    fails, its downstream stages are blocked while independent siblings keep running.
+
+    In 'inprocess' mode Python stages run on threads of this interpreter and share a
+    PipelineContext, so harmonized frames are passed in memory and artifacts are
+    persisted once at the end (R and pip stages still run as subprocesses, with their
+    inputs flushed first). Overlapping in-process stages share the GIL: they gain from
+    numpy/semopy/Agg code that releases it, not from pure-Python work; CPU time and
+    peak RSS of overlapping stages are process-wide. 'subprocess' mode runs every stage
+    in isolation.
+
+    Wall time, CPU time, peak RSS (in-process: the interpreter's high-water mark so far,
+    plus how much the stage raised it) and row counts of every executed stage and hot
+    section are written to 06_reports/run_metrics.json; `profiler` ('cprofile' or
+    'pyinstrument') additionally dumps a profile per stage into 06_reports/profiles.
+    Returns the {stage: status} map.
+    """
+    unknown = [t for t in list(targets) + list(force) if t not in STAGE_MAP]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Available: {', '.join(STAGE_MAP)}")
+
+    jobs = jobs or DEFAULT_JOBS
+    state = load_state()
+    produced_by = producers()
+    pending = resolve_order(set(targets))
+    deps = {name: stage_dependencies(name, pending, produced_by) for name in pending}
+    status, running, deferred = {}, {}, []
+    stage_metrics, child_sections = [], []
+    run_start = time.perf_counter()
+    ctx = PipelineContext()
+
+    original_stdout = sys.stdout
+    if mode == 'inprocess':
+        sys.path.insert(0, SCRIPTS_DIR)
+        sys.stdout = StagePrefixedStdout(original_stdout)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        try:
+            while pending or running:
+                # Topological order guarantees one pass settles every stage whose upstream is done
+                for name in list(pending):
+                    if any(status.get(d) in ('failed', 'blocked') for d in deps[name]):
+                        pending.remove(name)
+                        status[name] = 'blocked'
+                        log(f"[BLOCKED] {name}: upstream failure in "
+                            f"{', '.join(d for d in deps[name] if status.get(d) in ('failed', 'blocked'))}")
+                        continue
+                    if not all(d in status for d in deps[name]):
+                        continue
+                    pending.remove(name)
+                    stage = STAGE_MAP[name]
+                    inprocess = mode == 'inprocess' and stage.kind == 'python'
+
+                    # Inputs still held in memory were rebuilt during this run
+                    in_memory = set(stage.inputs) & set(ctx.pending_paths())
+                    fingerprint = None if in_memory else stage_fingerprint(stage, state['files'])
+                    if (not (force_all or name in force) and fingerprint is not None
+                            and is_up_to_date(stage, fingerprint, state)):
+                        status[name] = 'skipped'
+                        log(f"[UP-TO-DATE] {name}: {stage.description}")
+                        continue
+
+                    if inprocess:
+                        running[pool.submit(execute_inprocess, stage, ctx, profiler)] = (name, None)
+                        continue
+
+                    cmd = stage_command(stage)
+                    if cmd is None:
+                        status[name] = 'unavailable'
+                        log(f"[SKIP] {name}: R not found. Keeping existing outputs.")
+                        continue
+                    # Isolated stages read from disk: persist what they consume first
+                    if in_memory:
+                        ctx.flush(in_memory)
+                        fingerprint = stage_fingerprint(stage, state['files'])
+                    running[pool.submit(execute, stage, cmd, profiler)] = (name, fingerprint)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fingerprint = running.pop(future)
+                    try:
+                        result = future.result()
+                    except OSError as e:
+                        log(f"[ERROR] {name}: {e}")
+                        result = {'ok': False, 'wall_s': 0.0, 'cpu_s': None, 'peak_rss_mb': None,
+                                  'rss_growth_mb': None, 'rows': None, 'sections': []}
+                    ok, elapsed = result['ok'], result['wall_s']
+                    child_sections.extend(result.pop('sections'))
+                    stage_metrics.append({'stage': name, 'status': 'ok' if ok else 'failed',
+                                          'mode': 'subprocess' if fingerprint is not None else 'inprocess',
+                                          **{k: v for k, v in result.items() if k != 'ok'}})
+                    if ok:
+                        status[name] = 'ok'
+                        if fingerprint is None:
+                            deferred.append(name)
+                        else:
+                            state['stages'][name] = {'fingerprint': fingerprint, 'finished': time.time()}
+                            save_state(state)
+                        log(f"[SUCCESS] {name} ({elapsed:.1f}s)")
+                    else:
+                        status[name] = 'failed'
+                        log(f"[ERROR] {name} failed after {elapsed:.1f}s")
+        finally:
+            sys.stdout = original_stdout
+
+    # Persist in-memory artifacts, then record fingerprints of the stages that produced them
+    ctx.flush()
+    for name in deferred:
+        state['stages'][name] = {'fingerprint': stage_fingerprint(STAGE_MAP[name], state['files']),
+                                 'finished': time.time()}
+    save_state(state)
+
+    # A no-op run keeps the metrics of the last run that did some work
+    if stage_metrics:
+        metrics = pipeline_profile.write_run_metrics(
+            METRICS_FILE, stage_metrics, pipeline_profile.records() + child_sections,
+            mode=mode, jobs=jobs, total_wall_s=round(time.perf_counter() - run_start, 4),
+            skipped=[n for n, v in status.items() if v == 'skipped'])
+        embed_run_metrics(metrics)
+    return status
+
+
+def embed_run_metrics(metrics):
+    """Refresh the timing table of the implementation summary with the latest run."""
+    summary_path = os.path.join(ROOT_DIR, STAGE_MAP['summary'].outputs[0])
+    if not os.path.exists(summary_path):
+        return
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    import generate_final_report
+    with open(summary_path, 'r', encoding='utf-8') as f:
+        report = f.read()
+    write_atomic(summary_path, generate_final_report.replace_timing_section(report, metrics).encode('utf-8'))
+
+
+def build_parser(default_targets):
+    import argparse
+    parser = argparse.ArgumentParser(description="Incremental MAP-8 IRI pipeline runner.")
+    parser.add_argument('stages', nargs='*', default=default_targets,
+                        help=f"Stages to bring up to date (default: {' '.join(default_targets)}).")
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE',
+                        help="Rerun STAGE even if its fingerprint is unchanged (repeatable).")
+    parser.add_argument('--force-all', action='store_true', help="Rerun every selected stage.")
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f"Maximum number of stages running concurrently (default: {DEFAULT_JOBS}).")
+    parser.add_argument('--mode', choices=['inprocess', 'subprocess'], default='inprocess',
+                        help="Run Python stages in this process sharing in-memory data (default), "
+                             "or each in its own interpreter for isolation.")
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], default=None,
+                        help="Dump a cProfile (.prof) or pyinstrument (.html) profile per Python stage "
+                             "into 06_reports/profiles/.")
+    parser.add_argument('--list', action='store_true', help="List stages and their up-to-date status.")
+    return parser
+
+
+def list_stages():
+    state = load_state()
+    for stage in STAGES:
+        fresh = is_up_to_date(stage, stage_fingerprint(stage, state['files']), state)
+        print(f"{stage.name:<12} {'up-to-date' if fresh else 'stale':<11} {stage.description}")
+
+
+def main(default_targets=MAIN_TARGETS, argv=None):
+    args = build_parser(default_targets).parse_args(argv)
+    if args.list:
+        list_stages()
+        return 0
+    status = run_pipeline(args.stages, force=args.force, force_all=args.force_all,
+                          jobs=args.jobs, mode=args.mode, profiler=args.profile)
+    return 1 if any(v in ('failed', 'blocked') for v in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
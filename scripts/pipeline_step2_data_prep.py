@@ -1,18 +1,12 @@
 import pandas as pd
 import numpy as np
-import os
 from scipy.stats import chi2
 
-# Create directories
-os.makedirs('01_harmonized', exist_ok=True)
-os.makedirs('02_eda', exist_ok=True)
-
-# 1. Load Raw Data (Excluding 2025 as per user request)
-df23_raw = pd.read_excel('00_raw/1_2023_data_IRI.xlsx')
-df24_raw = pd.read_excel('00_raw/2_2024_data_IRI.xlsx')
-
-df23_raw['year'] = 2023
-df24_raw['year'] = 2024
+import careless
+import imputation
+import pipeline_profile
+import results_store
+from pipeline_context import PipelineContext
 
 # Item indices
 fs_idx = [1, 5, 7, 12, 16, 23, 26]
@@ -29,19 +23,6 @@ def get_canonical(idx):
 
 all_items = [get_canonical(idx) for idx in range(1, 29)]
 
-# 2. Harmonization Logic
-# 2023: 0-4 to 1-5 (+1), already reversed
-df23 = df23_raw.copy()
-for cid in all_items:
-    if cid in df23.columns:
-        df23[cid] = df23[cid] + 1
-
-# 2024: 1-5, already reversed
-df24 = df24_raw.copy()
-mapping24 = {f"E{get_canonical(i)}": get_canonical(i) for i in range(1, 29)}
-df24 = df24.rename(columns=mapping24)
-
-# 3. Concatenate (Excluding 2025)
 def get_h(df, year):
     map_cols = {
         'ID': 'respondent_id', 'iri_id': 'respondent_id',
@@ -58,33 +39,18 @@ def get_h(df, year):
         if c not in df_h.columns: df_h[c] = np.nan
     return df_h[cols]
 
-df_all = pd.concat([get_h(df23, 2023), get_h(df24, 2024)], ignore_index=True)
-
-# 3.1 Harmonize Sociodemographics
 def harmonize_gender(val):
     v = str(val).lower().strip()
     if v in ['hombre', '1', '1.0', 'masculino']: return 1
     if v in ['mujer', '2', '2.0', 'femenino']: return 2
     return np.nan
 
-df_all['gender'] = df_all['gender'].apply(harmonize_gender)
-
 def harmonize_ses(val):
     try:
         return float(val)
     except:
         return np.nan
 
-df_all['ses'] = df_all['ses'].apply(harmonize_ses)
-
-# 4. Computed Scores
-df_all['FS_mean'] = df_all[[f"FS{i}" for i in fs_idx]].mean(axis=1)
-df_all['PT_mean'] = df_all[[f"PT{i}" for i in pt_idx]].mean(axis=1)
-df_all['EC_mean'] = df_all[[f"EC{i}" for i in ec_idx]].mean(axis=1)
-df_all['PD_mean'] = df_all[[f"PD{i}" for i in pd_idx]].mean(axis=1)
-df_all['IRI_total'] = df_all[['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean']].mean(axis=1)
-
-# 5. Case Cleaning (QC + Outliers)
 # QC: Attention checks
 def calc_qc(row):
     fails = 0
@@ -94,9 +60,6 @@ def calc_qc(row):
         if row['AC3'] != 1: fails += 1
     return fails
 
-df_all['qc_fail_count'] = df_all.apply(calc_qc, axis=1)
-df_clean = df_all[df_all['qc_fail_count'] == 0].copy()
-
 # Multivariate Outliers (Random Answers Check) using Mahalanobis Distance
 def get_md(df_items):
     data = df_items.dropna()
@@ -105,43 +68,125 @@ def get_md(df_items):
     prec = np.linalg.pinv(cov)
     diff = data - mu
     md = diff.apply(lambda x: np.sqrt(np.dot(np.dot(x, prec), x)), axis=1)
+    # Incomplete rows: distance over their answered items under the EM mean/covariance
+    partial = df_items[df_items.notna().any(axis=1) & df_items.isna().any(axis=1)]
+    if len(partial):
+        em_mu, em_cov, _ = imputation.em_mvn(df_items.to_numpy(dtype=float))
+        em_cov *= len(df_items) / (len(df_items) - 1)  # unbiased, like data.cov()
+        md = pd.concat([md, pd.Series(imputation.pattern_distances(partial.to_numpy(dtype=float), em_mu, em_cov),
+                                      index=partial.index)]).sort_index()
     return md
 
-# Use only items for MD
-md_items = [c for c in all_items if c in df_clean.columns]
-md_scores = get_md(df_clean[md_items])
-# Threshold: Chi2 df=28, p < 0.001
-threshold = np.sqrt(chi2.ppf(1 - 0.001, df=len(md_items)))
-df_clean['md_score'] = md_scores
-df_clean['is_outlier'] = df_clean['md_score'] > threshold
-df_final = df_clean[df_clean['is_outlier'] == False].drop(columns=['md_score', 'is_outlier'])
-
-# 6. Save
-df_all.to_csv('01_harmonized/df_iri_clean_raw.csv', index=False)
-df_clean.to_csv('01_harmonized/df_iri_clean_no_md.csv', index=False)
-df_final.to_csv('01_harmonized/df_iri_clean_with_md.csv', index=False)
-# Link the 'official' clean file to the one WITH MD for backward compatibility
-df_final.to_csv('01_harmonized/df_iri_clean.csv', index=False)
-
-# Save Descriptive Stats for Word Report (Three Versions)
-subscales = ['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean', 'IRI_total']
-df_all[subscales].describe().to_csv('02_eda/descriptive_stats_raw.csv')
-df_clean[subscales].describe().to_csv('02_eda/descriptive_stats_no_md.csv')
-df_final[subscales].describe().to_csv('02_eda/descriptive_stats_with_md.csv')
-# Keep default for backward compatibility
-df_final[subscales].describe().to_csv('02_eda/descriptive_stats.csv')
-
-# 7. EDA Summary Report
-count_raw = len(df_all)
-count_qc = len(df_clean)
-count_md = len(df_final)
-
-with open('02_eda/eda_cleaning_report.txt', 'w') as f:
-    f.write("=== MAP-8 EDA & Cleaning Report ===\n")
-    f.write(f"Raw cases total: {count_raw}\n")
-    f.write(f"Cases after Quality Control (AC2/AC3 filtering): {count_qc}\n")
-    f.write(f"Final cases after Outlier Removal (Mahalanobis Distance): {count_md}\n")
-    f.write(f"Dropped as inattentive: {count_raw - count_qc}\n")
-    f.write(f"Dropped as potentially random: {count_qc - count_md}\n")
-
-print(f"Data Prep Complete (2023-2024 only). Clean N = {len(df_final)}")
+def run(ctx):
+    # 1. Load Raw Data (Excluding 2025 as per user request)
+    with pipeline_profile.section('excel_load') as sec:
+        df23_raw = ctx.read_raw('00_raw/1_2023_data_IRI.xlsx')
+        df24_raw = ctx.read_raw('00_raw/2_2024_data_IRI.xlsx')
+        sec['rows'] = len(df23_raw) + len(df24_raw)
+
+    df23_raw['year'] = 2023
+    df24_raw['year'] = 2024
+
+    # 2. Harmonization Logic
+    # 2023: 0-4 to 1-5 (+1), already reversed
+    df23 = df23_raw.copy()
+    for cid in all_items:
+        if cid in df23.columns:
+            df23[cid] = df23[cid] + 1
+
+    # 2024: 1-5, already reversed
+    df24 = df24_raw.copy()
+    mapping24 = {f"E{get_canonical(i)}": get_canonical(i) for i in range(1, 29)}
+    df24 = df24.rename(columns=mapping24)
+
+    # 3. Concatenate (Excluding 2025)
+    df_all = pd.concat([get_h(df23, 2023), get_h(df24, 2024)], ignore_index=True)
+
+    # 3.1 Harmonize Sociodemographics
+    df_all['gender'] = df_all['gender'].apply(harmonize_gender)
+    df_all['ses'] = df_all['ses'].apply(harmonize_ses)
+
+    # 4. Computed Scores
+    df_all['FS_mean'] = df_all[[f"FS{i}" for i in fs_idx]].mean(axis=1)
+    df_all['PT_mean'] = df_all[[f"PT{i}" for i in pt_idx]].mean(axis=1)
+    df_all['EC_mean'] = df_all[[f"EC{i}" for i in ec_idx]].mean(axis=1)
+    df_all['PD_mean'] = df_all[[f"PD{i}" for i in pd_idx]].mean(axis=1)
+    df_all['IRI_total'] = df_all[['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean']].mean(axis=1)
+
+    # 4.1 Careless-responding indices (vectorized over the item matrix)
+    df_all = df_all.join(careless.indices(df_all, all_items))
+
+    # 5. Case Cleaning (QC + Careless filters + Outliers)
+    # Careless-responding filters dropped with the attention checks: MAP8_CARELESS, e.g.
+    # longstring,irv. Unset: the indices are computed and reported only.
+    careless_filters = careless.filter_setting()
+    df_all['qc_fail_count'] = df_all.apply(calc_qc, axis=1)
+    attentive = df_all['qc_fail_count'] == 0
+    is_careless = careless.flagged(df_all, careless_filters)
+    kept = attentive & ~is_careless
+    # Rows without a single item response have no Mahalanobis distance (nothing to screen
+    # or impute), so they are dropped here and reported instead of passing the screen
+    md_items = [c for c in all_items if c in df_all.columns]
+    is_empty = df_all[md_items].isna().all(axis=1)
+    count_careful = int(kept.sum())
+    df_clean = df_all[kept & ~is_empty].copy()
+
+    # Use only items for MD
+    with pipeline_profile.section('mahalanobis', rows=len(df_clean)):
+        md_scores = get_md(df_clean[md_items])
+    # Threshold: Chi2 df=28, p < 0.001 (df = answered items for incomplete rows)
+    md_p = 0.001
+    threshold = np.sqrt(chi2.ppf(1 - md_p, df=len(md_items)))
+    df_clean['md_score'] = md_scores
+    answered = df_clean[md_items].notna().sum(axis=1)
+    df_clean['is_outlier'] = df_clean['md_score'] > np.sqrt(chi2.ppf(1 - md_p, df=answered))
+    df_final = df_clean[df_clean['is_outlier'] == False].drop(columns=['md_score', 'is_outlier'])
+
+    # 6. Save
+    ctx.write_csv(df_all, '01_harmonized/df_iri_clean_raw.csv', index=False)
+    ctx.write_csv(df_clean, '01_harmonized/df_iri_clean_no_md.csv', index=False)
+    ctx.write_csv(df_final, '01_harmonized/df_iri_clean_with_md.csv', index=False)
+    # The 'official' clean file is the one WITH MD (a hardlink, kept for backward compatibility)
+    ctx.alias('01_harmonized/df_iri_clean.csv', '01_harmonized/df_iri_clean_with_md.csv')
+
+    # Save Descriptive Stats for Word Report (Three Versions)
+    subscales = ['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean', 'IRI_total']
+    ctx.write_csv(df_all[subscales].describe(), '02_eda/descriptive_stats_raw.csv')
+    ctx.write_csv(df_clean[subscales].describe(), '02_eda/descriptive_stats_no_md.csv')
+    ctx.write_csv(df_final[subscales].describe(), '02_eda/descriptive_stats_with_md.csv')
+    # Keep default for backward compatibility
+    ctx.alias('02_eda/descriptive_stats.csv', '02_eda/descriptive_stats_with_md.csv')
+
+    # 7. EDA Summary Report
+    count_raw = len(df_all)
+    count_attentive = int(attentive.sum())
+    count_qc = len(df_clean)
+    count_md = len(df_final)
+    careless_flagged = {name: int(careless.flagged(df_all, [name]).sum()) for name in careless.FILTERS}
+    careless_lines = "".join(f"  {careless.FILTERS[name][3]}: {n}{' (applied)' if name in careless_filters else ''}\n"
+                             for name, n in careless_flagged.items())
+
+    ctx.write_text('02_eda/eda_cleaning_report.txt',
+                   "=== MAP-8 EDA & Cleaning Report ===\n"
+                   f"Raw cases total: {count_raw}\n"
+                   f"Cases after Quality Control (AC2/AC3 + careless filters + no item responses): {count_qc}\n"
+                   f"Final cases after Outlier Removal (Mahalanobis Distance): {count_md}\n"
+                   f"Dropped as inattentive: {count_raw - count_attentive}\n"
+                   f"Dropped as careless (filters: {', '.join(careless_filters) or 'none'}): {count_attentive - count_careful}\n"
+                   f"Dropped with no item responses: {count_careful - count_qc}\n"
+                   f"Dropped as potentially random: {count_qc - count_md}\n"
+                   "Raw cases flagged by each careless-responding index:\n" + careless_lines)
+
+    # 8. Structured results for the report generators
+    for suffix, frame in [('_raw', df_all), ('_no_md', df_clean), ('_with_md', df_final)]:
+        results_store.record(ctx, 'prep', suffix, n=len(frame))
+    results_store.record(ctx, 'prep', n_raw=count_raw, n_qc=count_qc, n_final=count_md,
+                         dropped_inattentive=count_raw - count_attentive, dropped_careless=count_attentive - count_careful,
+                         dropped_empty=count_careful - count_qc, dropped_random=count_qc - count_md, careless_flagged=careless_flagged,
+                         careless_applied={name: careless_flagged[name] for name in careless_filters},
+                         md_p=md_p, md_df=len(md_items), md_threshold=threshold)
+
+    print(f"Data Prep Complete (2023-2024 only). Clean N = {len(df_final)}")
+
+if __name__ == "__main__":
+    run(PipelineContext.standalone())
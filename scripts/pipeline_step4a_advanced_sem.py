@@ -1,10 +1,16 @@
+import os
+
 import pandas as pd
 import numpy as np
 from factor_analyzer import calculate_kmo, calculate_bartlett_sphericity
-from semopy import Model, calc_stats
-import os
+import semopy  # noqa: F401 (imported up front: the 'cfa_fit' section times the fits, not the import)
 
-os.makedirs('03_sem', exist_ok=True)
+import factor_scores
+import pipeline_profile
+import results_store
+from pipeline_context import PipelineContext
+from cfa_cache import fit_cached
+from sem_estimator import cfa_description
 
 item_lists = {
     'FS': [f"FS{i}" for i in [1, 5, 7, 12, 16, 23, 26]],
@@ -20,32 +26,32 @@ def cronbach_alpha(df_scale):
     n = df_scale.shape[1]
     return (n / (n - 1)) * (1 - item_vars.sum() / t_var)
 
-def run_sem_analysis(input_file, suffix):
+def run_sem_analysis(ctx, input_file, suffix):
     print(f"Running SEM for {input_file}...")
-    df = pd.read_csv(input_file)
+    df = ctx.read_csv(input_file)
     
     # 1. Reliability & Factorability
-    kmo_all, kmo_model = calculate_kmo(df[all_iri])
-    chi_square, p_value = calculate_bartlett_sphericity(df[all_iri])
+    with pipeline_profile.section('kmo_bartlett', rows=len(df)):
+        kmo_all, kmo_model = calculate_kmo(df[all_iri])
+        chi_square, p_value = calculate_bartlett_sphericity(df[all_iri])
     
-    rel_data = []
+    rel_data, alphas = [], {}
     for name, items in item_lists.items():
-        alpha = cronbach_alpha(df[items])
+        alpha = alphas[name] = cronbach_alpha(df[items])
         rel_data.append({'Construct': name, 'Alpha': round(alpha, 3), 'Items': len(items)})
     
-    # 2. CFA
-    mod_desc = "\n".join([f"{name} =~ {' + '.join(items)}" for name, items in item_lists.items()])
-    model = Model(mod_desc)
-    model.fit(df)
+    # 2. CFA (served from the CFA cache, else a cold fit: warm starts shift the reported
+    # estimates within the optimizer tolerance depending on the fit order)
+    with pipeline_profile.section('cfa_fit', rows=len(df)):
+        fit = fit_cached(cfa_description(item_lists), df)
     
-    estimates = model.inspect()
-    stats = calc_stats(model)
+    estimates = fit.estimates
+    stats = fit.stats
     
     # 3. Factor Correlations
     latent_vars = ['FS', 'PT', 'EC', 'PD']
     corr_matrix = pd.DataFrame(index=latent_vars, columns=latent_vars)
-    try: std_ests = model.inspect(std_est=True)
-    except: std_ests = model.inspect(mode='std')
+    std_ests = fit.std_estimates
     
     if std_ests is not None:
         latent_std_cov = std_ests[std_ests['op'] == '~~']
@@ -58,45 +64,50 @@ def run_sem_analysis(input_file, suffix):
                     if not val.empty: corr_matrix.loc[v1, v2] = round(val.iloc[0]['Estimate'], 3)
     
     # 4. Save Outputs
-    pd.DataFrame(rel_data).to_csv(f'03_sem/reliability_stats{suffix}.csv', index=False)
-    corr_matrix.to_csv(f'03_sem/factor_correlations{suffix}.csv')
-    estimates.to_csv(f'03_sem/cfa_estimates{suffix}.csv', index=False)
-    stats.to_csv(f'03_sem/cfa_fit_indices{suffix}.csv')
-    
-    with open(f'03_sem/advanced_sem_detailed_report{suffix}.txt', 'w') as f:
-        f.write(f"Global KMO MSA: {kmo_model:.3f}\n")
-        f.write(f"Bartlett Sphericity: Chi2={chi_square:.2f}, p={p_value:.3e}\n\n")
-        f.write("--- Scale Reliabilities ---\n")
-        for r in rel_data: f.write(f"{r['Construct']}: Alpha = {r['Alpha']}\n")
-        f.write("\n=== CFA Model Fit ===\n")
-        f.write(stats.to_string())
-        f.write("\n\n=== Factor Loadings ===\n")
-        f.write(estimates[estimates['op'] == '~'].to_string())
-    
-    # For backward compatibility with report scripts that expect no suffix
+    report = (f"Global KMO MSA: {kmo_model:.3f}\n"
+              f"Bartlett Sphericity: Chi2={chi_square:.2f}, p={p_value:.3e}\n\n"
+              "--- Scale Reliabilities ---\n"
+              + "".join(f"{r['Construct']}: Alpha = {r['Alpha']}\n" for r in rel_data)
+              + "\n=== CFA Model Fit ===\n"
+              + stats.to_string())
+    ctx.write_csv(pd.DataFrame(rel_data), f'03_sem/reliability_stats{suffix}.csv', index=False)
+    ctx.write_csv(corr_matrix, f'03_sem/factor_correlations{suffix}.csv')
+    ctx.write_csv(estimates, f'03_sem/cfa_estimates{suffix}.csv', index=False)
+    ctx.write_csv(stats, f'03_sem/cfa_fit_indices{suffix}.csv')
+    ctx.write_text(f'03_sem/advanced_sem_detailed_report{suffix}.txt',
+                   report + "\n\n=== Factor Loadings ===\n" + estimates[estimates['op'] == '~'].to_string())
+
+    # 5. Regression and Bartlett factor scores next to the subscale means (scripts/factor_scores.py)
+    with pipeline_profile.section('factor_scores', rows=len(df)):
+        ctx.write_csv(factor_scores.add_scores(df, estimates, item_lists),
+                      factor_scores.SCORES_FILE.format(suffix=suffix), index=False)
+
+    results_store.record(ctx, 'sem', suffix, n=len(df), kmo=kmo_model, bartlett_chi2=chi_square,
+                         bartlett_p=p_value, alpha=alphas,
+                         fit=stats.iloc[0].to_dict(),
+                         factor_corr={f"{a}~~{b}": corr_matrix.loc[a, b] for i, a in enumerate(latent_vars)
+                                      for b in latent_vars[i + 1:] if pd.notnull(corr_matrix.loc[a, b])})
+
+    # For backward compatibility with report scripts that expect no suffix (hardlinks)
     if suffix == "_with_md":
-        pd.DataFrame(rel_data).to_csv('03_sem/reliability_stats.csv', index=False)
-        corr_matrix.to_csv('03_sem/factor_correlations.csv')
-        estimates.to_csv('03_sem/cfa_estimates.csv', index=False)
-        stats.to_csv('03_sem/cfa_fit_indices.csv')
-        # Rename report as well
-        with open('03_sem/advanced_sem_detailed_report.txt', 'w') as f:
-            f.write(f"Global KMO MSA: {kmo_model:.3f}\n")
-            f.write(f"Bartlett Sphericity: Chi2={chi_square:.2f}, p={p_value:.3e}\n\n")
-            f.write("--- Scale Reliabilities ---\n")
-            for r in rel_data: f.write(f"{r['Construct']}: Alpha = {r['Alpha']}\n")
-            f.write("\n=== CFA Model Fit ===\n")
-            f.write(stats.to_string())
+        for name in ['reliability_stats.csv', 'factor_correlations.csv', 'cfa_estimates.csv',
+                     'cfa_fit_indices.csv', 'advanced_sem_detailed_report.txt']:
+            stem, ext = os.path.splitext(name)
+            ctx.alias(f'03_sem/{name}', f'03_sem/{stem}{suffix}{ext}')
+
+def run(ctx):
+    # Run three versions for full sensitivity
+    run_sem_analysis(ctx, '01_harmonized/df_iri_clean_raw.csv', '_raw')
+    run_sem_analysis(ctx, '01_harmonized/df_iri_clean_no_md.csv', '_no_md')
+    run_sem_analysis(ctx, '01_harmonized/df_iri_clean_with_md.csv', '_with_md')
 
-# Run three versions for full sensitivity
-run_sem_analysis('01_harmonized/df_iri_clean_raw.csv', '_raw')
-run_sem_analysis('01_harmonized/df_iri_clean_no_md.csv', '_no_md')
-run_sem_analysis('01_harmonized/df_iri_clean_with_md.csv', '_with_md')
+    # Generate raw item correlation heatmap data for all 3 for report
+    for s in ['_raw', '_no_md', '_with_md']:
+        df_s = ctx.read_csv(f'01_harmonized/df_iri_clean{s}.csv')
+        subscales = ['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean']
+        ctx.write_csv(df_s[subscales].corr(), f'03_sem/subscale_corr{s}.csv')
 
-# Generate raw item correlation heatmap data for all 3 for report
-for s in ['_raw', '_no_md', '_with_md']:
-    df_s = pd.read_csv(f'01_harmonized/df_iri_clean{s}.csv')
-    subscales = ['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean']
-    df_s[subscales].corr().to_csv(f'03_sem/subscale_corr{s}.csv')
+    print("Advanced SEM Complete for all three versions.")
 
-print("Advanced SEM Complete for all three versions.")
+if __name__ == "__main__":
+    run(PipelineContext.standalone())
@@ -6,6 +6,8 @@ import semopy
 from semopy import Model, calc_stats
 from scipy.stats import chi2
 
+from cfa_cache import fit_cached
+
 # Create directory
 os.makedirs('03_sem', exist_ok=True)
 
@@ -85,9 +87,7 @@ PD =~ {" + ".join(pd_red)}
 
 for i, desc in enumerate([model1_desc, model2_desc], 1):
     try:
-        mod = Model(desc)
-        mod.fit(df_clean)
-        stats = semopy.calc_stats(mod)
+        stats = fit_cached(desc, df_clean).stats
         cfi = stats.loc['Value', 'CFI']
         rmsea = stats.loc['Value', 'RMSEA']
         tli = stats.loc['Value', 'TLI']
@@ -1,61 +1,67 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.preprocessing import StandardScaler
 from scipy.cluster.hierarchy import dendrogram, linkage, fcluster
-import os
 
-os.makedirs('05_clustering', exist_ok=True)
+import factor_scores
+import pipeline_profile
+from figure_farm import FigureSpec, render_all
+import results_store
+from pipeline_context import PipelineContext
 
-features = ['FS_mean', 'PT_mean', 'EC_mean', 'PD_mean']
+# Profiles are reported on the subscale means; the clustering itself runs on the
+# scores selected by MAP8_SCORES (means by default, or CFA factor scores)
+features = factor_scores.score_columns('mean')
 
-def run_clustering(input_file, suffix):
+def run_clustering(ctx, input_file, suffix):
     print(f"Running Clustering for {input_file}...")
-    df = pd.read_csv(input_file)
-    X = df[features]
+    df = ctx.read_csv(input_file)
+    X = df[factor_scores.score_columns()]
     
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
     # 1. Clustering
-    Z = linkage(X_scaled, method='ward')
+    with pipeline_profile.section('linkage', rows=len(X_scaled)):
+        Z = linkage(X_scaled, method='ward')
     k = 2
     df['cluster'] = fcluster(Z, k, criterion='maxclust')
     
     # 2. Profiles
     profiles = df.groupby('cluster')[features].mean()
-    profiles.to_csv(f'05_clustering/cluster_profiles{suffix}.csv')
+    ctx.write_csv(profiles, f'05_clustering/cluster_profiles{suffix}.csv')
+    results_store.record(ctx, 'clustering', suffix, n=len(df), k=k,
+                         sizes=df['cluster'].value_counts().sort_index().to_dict(),
+                         profiles=profiles.to_dict(orient='index'))
     
-    # 3. Visualization - Letter-width (8.5in), High DPI (300)
-    # 3a. Heatmap Profile
-    plt.figure(figsize=(8.5, 5))
-    sns.heatmap(profiles, annot=True, cmap='mako', fmt='.2f', annot_kws={"size": 12})
-    plt.title(f'Empathy Cluster Profiles - {suffix.replace("_", " ").title()}', fontsize=14)
-    plt.xlabel('Dimensions', fontsize=12)
-    plt.ylabel('Cluster', fontsize=12)
-    plt.savefig(f'05_clustering/cluster_profiles{suffix}.jpg', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 3b. Boxplots Distribution
-    plt.figure(figsize=(8.5, 6))
-    df_melt = df.melt(id_vars=['cluster'], value_vars=features)
-    sns.boxplot(x='variable', y='value', hue='cluster', data=df_melt, palette='mako')
-    plt.title(f'Empathy Subscale Distributions - {suffix.replace("_", " ").title()}', fontsize=14)
-    plt.xlabel('Subscales', fontsize=12)
-    plt.ylabel('Score (1-5)', fontsize=12)
-    plt.legend(title='Cluster', loc='upper right')
-    plt.savefig(f'05_clustering/cluster_boxplots{suffix}.jpg', dpi=300, bbox_inches='tight')
-    plt.close()
+    # 3. Visualization - Letter-width (8.5in), High DPI (300), rendered by the figure farm
+    title = suffix.replace("_", " ").title()
+    figures = [
+        # 3a. Heatmap Profile
+        FigureSpec(f'05_clustering/cluster_profiles{suffix}.png', 'cluster_heatmap', profiles,
+                   {'title': f'Empathy Cluster Profiles - {title}'}, figsize=(8.5, 5)),
+        # 3b. Boxplots Distribution
+        FigureSpec(f'05_clustering/cluster_boxplots{suffix}.png', 'cluster_boxplots',
+                   df.melt(id_vars=['cluster'], value_vars=features),
+                   {'title': f'Empathy Subscale Distributions - {title}'}, figsize=(8.5, 6)),
+    ]
 
     # Compatibility
     if suffix == "_with_md":
-        profiles.to_csv('05_clustering/cluster_profiles.csv')
+        ctx.alias('05_clustering/cluster_profiles.csv', f'05_clustering/cluster_profiles{suffix}.csv')
         # We don't overwrite the main boxplot yet as report expects certain names
+    return figures
+
+def run(ctx):
+    # Run three versions
+    figures = []
+    figures += run_clustering(ctx, factor_scores.score_input('_raw'), '_raw')
+    figures += run_clustering(ctx, factor_scores.score_input('_no_md'), '_no_md')
+    figures += run_clustering(ctx, factor_scores.score_input('_with_md'), '_with_md')
+    stats = render_all(ctx, figures)
+    print(f"Figures: {stats['rendered']} rendered, {stats['cached']} from cache.")
 
-# Run three versions
-run_clustering('01_harmonized/df_iri_clean_raw.csv', '_raw')
-run_clustering('01_harmonized/df_iri_clean_no_md.csv', '_no_md')
-run_clustering('01_harmonized/df_iri_clean_with_md.csv', '_with_md')
+    print("Clustering Complete for all three versions.")
 
-print("Clustering Complete for all three versions.")
+if __name__ == "__main__":
+    run(PipelineContext.standalone())
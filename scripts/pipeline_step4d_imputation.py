@@ -0,0 +1,134 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+import cfa_jobs
+import imputation
+import pipeline_profile
+import results_store
+from pipeline_context import PipelineContext
+from sem_estimator import cfa_description, estimator_settings
+
+# Multiple-imputation analysis of the three data variants.
+# Incomplete item responses are imputed M times (scripts/imputation.py: bootstrap EM +
+# predictive mean matching by default, M imputations in the CFA process pool), and
+# subscale alpha, the 4-factor CFA and the Ward clustering (k = 2, profiles ordered
+# high -> low) run on every completed data set. Estimates are pooled with Rubin's rules:
+# alpha with its asymptotic variance, CFA parameters with their standard errors and
+# cluster centroids with their sampling variance. Fit indices have no sampling variance
+# to pool, so their mean and range over the imputations are reported. A variant without
+# incomplete rows is analyzed once (all imputations would be identical).
+#
+#   python main.py imputation   (or: python scripts/pipeline_step4d_imputation.py [--m 20] [--method pmm|mvn])
+
+item_lists = {
+    'FS': [f"FS{i}" for i in [1, 5, 7, 12, 16, 23, 26]],
+    'PT': [f"PT{i}" for i in [3, 8, 11, 15, 21, 25, 28]],
+    'EC': [f"EC{i}" for i in [2, 4, 9, 14, 18, 20, 22]],
+    'PD': [f"PD{i}" for i in [6, 10, 13, 17, 19, 24, 27]]
+}
+all_iri = item_lists['FS'] + item_lists['PT'] + item_lists['EC'] + item_lists['PD']
+VARIANTS = ['_raw', '_no_md', '_with_md']
+OUT_DIR = '06_reports/imputation'
+FIT_INDICES = ['chi2', 'CFI', 'TLI', 'RMSEA']
+
+def clusters(values):
+    """Ward clusters (k = 2) of the standardized subscale means: centroids and their sampling variances."""
+    from scipy.cluster.hierarchy import fcluster, linkage
+    means = np.column_stack([values[:, [all_iri.index(i) for i in items]].mean(axis=1) for items in item_lists.values()])
+    labels = fcluster(linkage((means - means.mean(axis=0)) / means.std(axis=0), method='ward'), 2, criterion='maxclust')
+    groups = sorted(np.unique(labels), key=lambda k: -means[labels == k].mean())
+    out = {}
+    for level, k in zip(['high', 'low'], groups):
+        members = means[labels == k]
+        out[level] = (members.mean(axis=0), members.var(axis=0, ddof=1) / len(members), len(members) / len(means))
+    return out
+
+def pool_table(frames, keys):
+    """Rubin-pooled 'Estimate' / 'Std. Err' of per-imputation tables aligned on `keys`."""
+    q = np.stack([f['Estimate'].to_numpy(dtype=float) for f in frames])
+    u = np.stack([pd.to_numeric(f['Std. Err'], errors='coerce').to_numpy(dtype=float) ** 2 for f in frames])
+    pooled = imputation.rubin(q, u)
+    return frames[0][keys].assign(**{'Estimate': pooled['estimate'], 'Std. Err': pooled['se'],
+                                     'df': pooled['df'], 'fmi': pooled['fmi']})
+
+def run_imputation_analysis(ctx, input_file, suffix, m, method, pool, settings, seed=0):
+    print(f"Running multiple imputation for {input_file}...")
+    df = ctx.read_csv(input_file)
+    X = df[all_iri].to_numpy(dtype=float)
+    missing = np.isnan(X)
+    n_incomplete = int((missing.any(axis=1) & ~missing.all(axis=1)).sum())
+    m_used = m if n_incomplete else 1
+    with pipeline_profile.section('imputation', rows=len(df)):
+        completed = imputation.impute(X, m_used, method, seed, pool) if n_incomplete else [X]
+    # Respondents without any answered item stay missing and are left out
+    completed = [values[~np.isnan(values).any(axis=1)] for values in completed]
+
+    # 1. Per imputation: alpha, CFA (in the pool) and clusters
+    desc = cfa_description(item_lists)
+    frames = [pd.DataFrame(values, columns=all_iri) for values in completed]
+    with pipeline_profile.section('cfa_fit', rows=len(df) * m_used):
+        if pool is not None:
+            futures = [pool.submit(cfa_jobs.fit_job, desc, frame, settings, False) for frame in frames]
+            fits = [f.result() for f in futures]
+        else:
+            fits = [cfa_jobs.fit_job(desc, frame, settings, False) for frame in frames]
+    alphas = [[imputation.alpha_variance(values[:, [all_iri.index(i) for i in items]]) for items in item_lists.values()]
+              for values in completed]
+    cluster_runs = [clusters(values) for values in completed]
+
+    # 2. Rubin's rules
+    a = np.array(alphas)  # imputations x subscales x (alpha, variance)
+    pooled_alpha = imputation.rubin(a[:, :, 0], a[:, :, 1])
+    reliability = pd.DataFrame({'Construct': list(item_lists), 'Alpha': pooled_alpha['estimate'],
+                                'Std. Err': pooled_alpha['se'], 'fmi': pooled_alpha['fmi']})
+    keys = ['lval', 'op', 'rval']
+    cfa = pool_table([fit.estimates for fit in fits], keys)
+    cfa['Est. Std'] = np.mean([fit.std_estimates['Est. Std'].to_numpy(dtype=float) for fit in fits], axis=0)
+    stats = pd.DataFrame([{k: float(fit.stats[k].iloc[0]) for k in FIT_INDICES if k in fit.stats} for fit in fits])
+    fit = pd.DataFrame({'mean': stats.mean(), 'min': stats.min(), 'max': stats.max()})
+    rows = []
+    for level in ['high', 'low']:
+        centroid = imputation.rubin([run[level][0] for run in cluster_runs], [run[level][1] for run in cluster_runs])
+        share = np.mean([run[level][2] for run in cluster_runs])
+        rows += [{'cluster': level, 'share': share, 'subscale': f"{name}_mean", 'mean': centroid['estimate'][j],
+                  'se': centroid['se'][j], 'fmi': centroid['fmi'][j]} for j, name in enumerate(item_lists)]
+    centroids = pd.DataFrame(rows)
+
+    # 3. Save Outputs
+    ctx.write_csv(reliability, f'{OUT_DIR}/pooled_reliability{suffix}.csv', index=False)
+    ctx.write_csv(cfa, f'{OUT_DIR}/pooled_cfa{suffix}.csv', index=False)
+    ctx.write_csv(fit, f'{OUT_DIR}/pooled_fit{suffix}.csv')
+    ctx.write_csv(centroids, f'{OUT_DIR}/pooled_clusters{suffix}.csv', index=False)
+    results_store.record(ctx, 'imputation', suffix, n=len(completed[0]), n_incomplete=n_incomplete, m=m_used,
+                         alpha=dict(zip(item_lists, pooled_alpha['estimate'])), fit=fit['mean'].to_dict(),
+                         fmi_max=np.nanmax(cfa['fmi']) if n_incomplete else 0.0,
+                         high_share=centroids.loc[centroids['cluster'] == 'high', 'share'].iloc[0])
+    print(f"  {n_incomplete} incomplete respondents, {m_used} imputation(s); "
+          f"pooled alpha {', '.join(f'{k}={v:.3f}' for k, v in zip(item_lists, pooled_alpha['estimate']))}")
+
+def run(ctx, m=imputation.DEFAULT_M, method='pmm', workers=cfa_jobs.MAX_WORKERS, seed=0):
+    settings = estimator_settings()
+    pool = cfa_jobs.make_pool(workers) if workers > 1 else None
+    try:
+        for s in VARIANTS:
+            run_imputation_analysis(ctx, f'01_harmonized/df_iri_clean{s}.csv', s, m, method, pool, settings, seed)
+    finally:
+        if pool:
+            pool.shutdown()
+    print("Multiple-imputation analysis complete for all three versions.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multiple imputation of incomplete items with Rubin-pooled alpha, CFA and clusters.")
+    parser.add_argument('--m', type=int, default=imputation.DEFAULT_M, help="Number of imputations")
+    parser.add_argument('--method', choices=imputation.METHODS, default='pmm')
+    parser.add_argument('--workers', type=int, default=cfa_jobs.MAX_WORKERS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    run(PipelineContext.standalone(), args.m, args.method, args.workers, args.seed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.special import chdtri
+
+import careless
+import imputation
+from sem_estimator import cfa_description
+
+# Data cleaning of the Streamlit playground, shared by the app (which wraps it in its
+# caches) and the offline precompute job, so both see exactly the same subsets.
+# Imports are kept light (no scipy.stats / semopy) because the app loads this module at start-up.
+
+PLAYGROUND_FILE = '01_harmonized/df_iri_playground.csv'
+# Typed binary copy written next to the CSV; loads in milliseconds
+PLAYGROUND_BINARY = '01_harmonized/df_iri_playground.feather'
+SUBSCALES = {
+    'FS': [f"FS{i}" for i in [1, 5, 7, 12, 16, 23, 26]],
+    'PT': [f"PT{i}" for i in [3, 8, 11, 15, 21, 25, 28]],
+    'EC': [f"EC{i}" for i in [2, 4, 9, 14, 18, 20, 22]],
+    'PD': [f"PD{i}" for i in [6, 10, 13, 17, 19, 24, 27]]
+}
+ALL_ITEMS = [i for items in SUBSCALES.values() for i in items]
+# Attention check strictness -> highest qc_fail_count kept (None = everyone)
+QC_MAX = {"Relaxed": None, "Standard (Default)": 1, "Strict": 0}
+
+def load_playground():
+    """Playground rows from the Feather copy, or the CSV when it is missing (None if neither exists)."""
+    if os.path.exists(PLAYGROUND_BINARY):
+        return pd.read_feather(PLAYGROUND_BINARY)
+    if os.path.exists(PLAYGROUND_FILE):
+        return pd.read_csv(PLAYGROUND_FILE)
+    return None
+
+def md_threshold(p_val, n_items):
+    # chdtri(k, p) = chi2.ppf(1 - p, k)
+    return np.sqrt(chdtri(n_items, p_val))
+
+def distances(df, qc, active_items, years=None, careless_filters=(), impute=False):
+    """Complete cases of the selection and their Mahalanobis distances (None when too few cases).
+
+    careless_filters: careless.FILTERS names; flagged cases are dropped after the attention checks.
+    impute: fill missing active items with one PMM imputation instead of dropping the case.
+    """
+    temp = df
+
+    # 0. Filter by selected years
+    if years:
+        temp = temp[temp['year'].isin(years)]
+
+    # 1. Reversal: FS7/PD13 are already harmonized in the playground CSV
+
+    # 2. QC Filtering
+    if QC_MAX[qc] is not None:
+        temp = temp[temp['qc_fail_count'] <= QC_MAX[qc]]
+    if careless_filters:
+        temp = temp[~careless.flagged(temp, careless_filters)]
+
+    # 3. Missing active items: one PMM imputation (scripts/imputation.py), else listwise deletion
+    values = temp[list(active_items)].to_numpy(dtype=float)
+    if impute and np.isnan(values).any():
+        temp = temp.copy()
+        temp[list(active_items)] = imputation.impute_once(values, 'pmm', seed=0)
+    temp = temp.dropna(subset=list(active_items)).copy()
+
+    # 4. Mahalanobis distances (vectorized quadratic form)
+    if len(temp) <= len(active_items):
+        return temp, None
+    data = temp[list(active_items)].to_numpy(dtype=float)
+    diff = data - data.mean(axis=0)
+    prec = np.linalg.pinv(np.cov(data, rowvar=False))
+    return temp, np.sqrt(np.einsum('ij,jk,ik->i', diff, prec, diff))
+
+def remove_outliers(temp, md, p_val, n_items):
+    if md is None:
+        return temp
+    return temp[md <= md_threshold(p_val, n_items)].copy()
+
+def model_description(active_items, markers=None):
+    """4-factor CFA over the active items; each factor's marker (default: first item) goes first."""
+    item_lists = {}
+    for name, items in SUBSCALES.items():
+        current = [i for i in items if i in active_items]
+        marker = (markers or {}).get(name)
+        if marker and marker in current:
+            current.remove(marker)
+            current.insert(0, marker)
+        item_lists[name] = current
+    return cfa_description(item_lists)
@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import cfa_jobs
+import playground_engine as engine
+from cfa_cache import CFAResult, cache_key, fit_cached, semopy_version
+from pipeline_context import PipelineContext
+from sem_estimator import CFASession, estimator_settings
+from stats_cube import Moments
+
+# Offline precomputed results for the hosted playground.
+# Evaluates the dashboard's discrete parameter space (every non-empty subset of the
+# survey years x the three QC levels x a grid of Mahalanobis p-thresholds x the default
+# item set and each single-item drop, default marker variables) and stores, per point,
+# the CFA fit indices and loadings (raw and standardized), plus subscale alpha and
+# corrected item-total correlations, in an indexed SQLite file next to the playground
+# data. Points are indexed by the number of removed outliers rather than the p-value,
+# so any slider position that yields a precomputed subset is served. Identical subsets
+# are fitted once. The app checks the grid before fitting live and ignores it when it
+# was built from other data or with another estimator.
+#
+#   python main.py playground_grid   (or: python scripts/playground_grid.py [--md-grid ...] [--workers N])
+
+GRID_FILE = os.path.join('01_harmonized', 'playground_grid.sqlite')
+DEFAULT_MD_GRID = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05]
+
+def source_hash(df):
+    """Fingerprint of the playground rows the grid was computed from (None for other data)."""
+    cols = ['year', 'qc_fail_count'] + engine.ALL_ITEMS
+    if not set(cols) <= set(df.columns):
+        return None
+    return hashlib.sha256(pd.util.hash_pandas_object(df[cols], index=False).values.tobytes()).hexdigest()
+
+def years_key(years):
+    return ','.join(str(int(y)) for y in sorted(years))
+
+def dropped_key(dropped):
+    return ','.join(i for i in engine.ALL_ITEMS if i in dropped)
+
+def reliability(data, active_items):
+    """Subscale alpha and corrected item-total correlations of a cleaned subset."""
+    values = data[active_items].to_numpy(dtype=float)
+    moments = Moments.from_rows(values, active_items, np.unique(values))
+    alpha, item_total = {}, {}
+    for name, items in engine.SUBSCALES.items():
+        current = [i for i in items if i in active_items]
+        if len(current) > 1:
+            alpha[name] = round(float(moments.alpha(current)), 4)
+            item_total.update({k: round(float(v), 4) for k, v in moments.item_total(current).items()})
+    return {'alpha': alpha, 'item_total': item_total}
+
+def encode(result, extra):
+    """Fit indices and the loading rows of the standardized estimates (all the app displays), 4 decimals."""
+    std = result.std_estimates
+    frames = {'stats': result.stats, 'loadings': std[std['op'] == '~']}
+    frames = {k: df.map(lambda v: round(v, 4) if isinstance(v, float) else v).to_dict(orient='split')
+              for k, df in frames.items()}
+    return zlib.compress(json.dumps({**frames, **extra}).encode())
+
+class PlaygroundGrid:
+    def __init__(self, path=GRID_FILE):
+        self.path = path
+        with sqlite3.connect(path) as con:
+            self.meta = {k: json.loads(v) for k, v in con.execute("SELECT key, value FROM meta")}
+
+    @classmethod
+    def open(cls, path=GRID_FILE):
+        return cls(path) if os.path.exists(path) else None
+
+    def matches(self, df, settings):
+        """True when the grid was built from these rows with these estimator settings."""
+        return (self.meta.get('source') == source_hash(df) and self.meta.get('settings') == settings
+                and self.meta.get('semopy') == semopy_version())
+
+    def lookup(self, years, qc, dropped, n_removed, desc):
+        """(CFAResult, reliability) for a grid point, or None outside the grid."""
+        with sqlite3.connect(self.path) as con:
+            row = con.execute("SELECT m.desc, r.payload FROM points p JOIN results r ON r.id = p.result "
+                              "JOIN models m ON m.id = r.model WHERE p.years = ? AND p.qc = ? AND p.dropped = ? AND p.n_removed = ?",
+                              (years_key(years), qc, dropped_key(dropped), int(n_removed))).fetchone()
+        if row is None or row[0] != desc:
+            return None
+        payload = json.loads(zlib.decompress(row[1]))
+        stats, loadings = (pd.DataFrame(**payload.pop(k)) for k in ('stats', 'loadings'))
+        result = CFAResult(stats=stats, estimates=loadings.drop(columns='Est. Std'), std_estimates=loadings,
+                           precomputed=True)
+        return result, payload
+
+def grid_points(df, md_grid):
+    """Yield (years, qc, dropped, p, n_removed, desc, data) for every point of the dashboard grid."""
+    all_years = sorted(int(y) for y in df['year'].unique())
+    year_sets = [c for r in range(1, len(all_years) + 1) for c in itertools.combinations(all_years, r)]
+    # Item set outermost: consecutive fits share a model structure and warm-start each other
+    for dropped in [()] + [(i,) for i in engine.ALL_ITEMS]:
+        active = [i for i in engine.ALL_ITEMS if i not in dropped]
+        desc = engine.model_description(active)
+        for qc, years in itertools.product(engine.QC_MAX, year_sets):
+            temp, md = engine.distances(df, qc, active, years)
+            seen = set()
+            for p in md_grid:
+                data = engine.remove_outliers(temp, md, p, len(active))
+                n_removed = len(temp) - len(data)
+                if n_removed not in seen:
+                    seen.add(n_removed)
+                    yield years, qc, dropped, p, n_removed, desc, data[active]
+
+def precompute(df, md_grid=DEFAULT_MD_GRID, path=GRID_FILE, workers=cfa_jobs.MAX_WORKERS, min_n=50):
+    settings = estimator_settings()
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    con.execute("CREATE TABLE models (id INTEGER PRIMARY KEY, desc TEXT)")
+    con.execute("CREATE TABLE results (id INTEGER PRIMARY KEY, model INTEGER, n INTEGER, payload BLOB)")
+    con.execute("CREATE TABLE points (years TEXT, qc TEXT, dropped TEXT, n_removed INTEGER, p REAL, result INTEGER, "
+                "PRIMARY KEY (years, qc, dropped, n_removed)) WITHOUT ROWID")
+    pool = cfa_jobs.make_pool(workers) if workers > 1 else None
+    session = CFASession(settings)
+    start = time.perf_counter()
+    result_ids = {}  # CFA cache key -> results.id (identical subsets are fitted once)
+    n_points, n_fits, n_failed = 0, 0, 0
+
+    # One batch per item set keeps memory bounded and the workers warm
+    for model_id, (dropped, batch) in enumerate(itertools.groupby(grid_points(df, md_grid), key=lambda pt: pt[2]), 1):
+        jobs = {}
+        for years, qc, _, p, n_removed, desc, data in batch:
+            if len(data) < min_n:
+                continue
+            key = cache_key(desc, data, settings)
+            if key not in result_ids:
+                result_ids[key] = len(result_ids) + 1
+                jobs[key] = (desc, data)
+            con.execute("INSERT INTO points VALUES (?, ?, ?, ?, ?, ?)",
+                        (years_key(years), qc, dropped_key(dropped), n_removed, p, result_ids[key]))
+            n_points += 1
+        con.execute("INSERT INTO models VALUES (?, ?)", (model_id, desc))
+        futures = {key: pool.submit(cfa_jobs.fit_job, desc, data, settings) for key, (desc, data) in jobs.items()} if pool else {}
+        for key, (desc, data) in jobs.items():
+            try:
+                result = futures[key].result() if pool else fit_cached(desc, data, session)
+            except Exception as e:
+                print(f"  [WARN] fit failed ({dropped_key(dropped) or 'all items'}): {type(e).__name__}: {e}")
+                n_failed += 1
+                continue
+            if result.stats.empty or 'CFI' not in result.stats or pd.isnull(result.stats['CFI'].iloc[0]):
+                n_failed += 1
+                continue
+            con.execute("INSERT INTO results VALUES (?, ?, ?, ?)",
+                        (result_ids[key], model_id, len(data), encode(result, reliability(data, list(data.columns)))))
+            n_fits += 1
+        con.commit()
+        print(f"  dropped={dropped_key(dropped) or '-':<6} points={n_points:<6} fits={n_fits:<6} "
+              f"failed={n_failed:<4} {time.perf_counter() - start:7.1f}s")
+    if pool:
+        pool.shutdown()
+
+    # Points whose fit failed fall back to live fitting
+    con.execute("DELETE FROM points WHERE result NOT IN (SELECT id FROM results)")
+    meta = {'source': source_hash(df), 'settings': settings, 'semopy': semopy_version(), 'md_grid': list(md_grid),
+            'generated': time.strftime('%Y-%m-%d %H:%M:%S')}
+    con.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+    con.commit()
+    con.execute("VACUUM")
+    con.close()
+    os.replace(tmp_path, path)
+    return n_points, n_fits, n_failed
+
+def run(ctx, md_grid=DEFAULT_MD_GRID, workers=cfa_jobs.MAX_WORKERS):
+    df = ctx.read_csv(engine.PLAYGROUND_FILE)
+    print(f"[*] Precomputing the playground grid (MD grid: {list(md_grid)}, workers: {workers})...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'grid.sqlite')
+        n_points, n_fits, n_failed = precompute(df, md_grid, path, workers)
+        with open(path, 'rb') as f:
+            ctx.write_bytes(GRID_FILE, f.read())
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"[SUCCESS] {n_points} points ({n_fits} distinct fits, {n_failed} failed) -> {GRID_FILE} ({size_mb:.1f} MB)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute playground results over the dashboard parameter grid.")
+    parser.add_argument('--md-grid', default=','.join(map(str, DEFAULT_MD_GRID)), help="Mahalanobis p-thresholds")
+    parser.add_argument('--workers', type=int, default=cfa_jobs.MAX_WORKERS)
+    args = parser.parse_args(argv)
+    run(PipelineContext.standalone(), [float(p) for p in args.md_grid.split(',') if p], args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,13 @@
+import io
+
 import pandas as pd
 import numpy as np
-import os
-
-# Create directory
-os.makedirs('01_harmonized', exist_ok=True)
-
-print("[*] Harmonizing all three datasets (2023, 2024, 2025) for Playground...")
 
-# 1. Load 2023
-df23_raw = pd.read_excel('00_raw/1_2023_data_IRI.xlsx')
-df23_raw['year'] = 2023
-
-# 2. Load 2024
-df24_raw = pd.read_excel('00_raw/2_2024_data_IRI.xlsx')
-df24_raw['year'] = 2024
-
-# 3. Load 2025
-df25_raw = pd.read_excel('00_raw/3_2025_data_IRI.xlsx')
-df25_raw['year'] = 2025
+import careless
+import pipeline_profile
+from pipeline_context import PipelineContext
+from playground_engine import PLAYGROUND_BINARY
+from stats_cube import CUBE_FILE, build_cube, cube_bytes
 
 # Item indices
 fs_idx = [1, 5, 7, 12, 16, 23, 26]
@@ -34,24 +24,6 @@ def get_canonical(idx):
 
 all_items = [get_canonical(idx) for idx in range(1, 29)]
 
-# --- Harmonization of 2023 ---
-df23 = df23_raw.copy()
-# 2023 scale is 0-4, standard is 1-5
-for cid in all_items:
-    if cid in df23.columns:
-        df23[cid] = df23[cid] + 1
-
-# --- Harmonization of 2024 ---
-df24 = df24_raw.copy()
-mapping24 = {f"E{get_canonical(i)}": get_canonical(i) for i in range(1, 29)}
-df24 = df24.rename(columns=mapping24)
-
-# --- Harmonization of 2025 ---
-df25 = df25_raw.copy()
-# Prefix is 'iri_'
-mapping25 = {f"iri_{get_canonical(i)}": get_canonical(i) for i in range(1, 29)}
-df25 = df25.rename(columns=mapping25)
-
 # Mapping generic columns
 map_cols = {
     'ID': 'respondent_id', 'iri_id': 'respondent_id',
@@ -70,13 +42,6 @@ def get_h(df, year):
         if c not in df_h.columns: df_h[c] = np.nan
     return df_h[cols]
 
-# Combine all
-df_total = pd.concat([
-    get_h(df23, 2023), 
-    get_h(df24, 2024), 
-    get_h(df25, 2025)
-], ignore_index=True)
-
 # Basic Cleaning for sociodemographics
 def harmonize_gender(val):
     v = str(val).lower().strip()
@@ -84,8 +49,6 @@ def harmonize_gender(val):
     if v in ['mujer', '2', '2.0', 'femenino']: return 2
     return np.nan
 
-df_total['gender'] = df_total['gender'].apply(harmonize_gender)
-
 # Define qc_fail_count (Used by Playground)
 def calc_qc(row):
     fails = 0
@@ -97,10 +60,68 @@ def calc_qc(row):
         if row['AC3'] != 1: fails += 1
     return fails
 
-df_total['qc_fail_count'] = df_total.apply(calc_qc, axis=1)
-
-# Save the special playground file
-output_path = '01_harmonized/df_iri_playground.csv'
-df_total.to_csv(output_path, index=False)
-
-print(f"[SUCCESS] Playground data saved to {output_path} (N={len(df_total)})")
+def run(ctx):
+    print("[*] Harmonizing all three datasets (2023, 2024, 2025) for Playground...")
+
+    with pipeline_profile.section('excel_load') as sec:
+        # 1. Load 2023
+        df23_raw = ctx.read_raw('00_raw/1_2023_data_IRI.xlsx')
+        df23_raw['year'] = 2023
+
+        # 2. Load 2024
+        df24_raw = ctx.read_raw('00_raw/2_2024_data_IRI.xlsx')
+        df24_raw['year'] = 2024
+
+        # 3. Load 2025
+        df25_raw = ctx.read_raw('00_raw/3_2025_data_IRI.xlsx')
+        df25_raw['year'] = 2025
+        sec['rows'] = len(df23_raw) + len(df24_raw) + len(df25_raw)
+
+    # --- Harmonization of 2023 ---
+    df23 = df23_raw.copy()
+    # 2023 scale is 0-4, standard is 1-5
+    for cid in all_items:
+        if cid in df23.columns:
+            df23[cid] = df23[cid] + 1
+
+    # --- Harmonization of 2024 ---
+    df24 = df24_raw.copy()
+    mapping24 = {f"E{get_canonical(i)}": get_canonical(i) for i in range(1, 29)}
+    df24 = df24.rename(columns=mapping24)
+
+    # --- Harmonization of 2025 ---
+    df25 = df25_raw.copy()
+    # Prefix is 'iri_'
+    mapping25 = {f"iri_{get_canonical(i)}": get_canonical(i) for i in range(1, 29)}
+    df25 = df25.rename(columns=mapping25)
+
+    # Combine all
+    df_total = pd.concat([
+        get_h(df23, 2023), 
+        get_h(df24, 2024), 
+        get_h(df25, 2025)
+    ], ignore_index=True)
+
+    df_total['gender'] = df_total['gender'].apply(harmonize_gender)
+    df_total['qc_fail_count'] = df_total.apply(calc_qc, axis=1)
+    # Careless-responding indices, filtered on in the app (scripts/careless.py)
+    df_total = df_total.join(careless.indices(df_total, all_items))
+
+    # Save the special playground file
+    output_path = '01_harmonized/df_iri_playground.csv'
+    ctx.write_csv(df_total, output_path, index=False)
+
+    print(f"[SUCCESS] Playground data saved to {output_path} (N={len(df_total)})")
+
+    # Typed binary copy for the app (Feather loads in milliseconds; the CSV stays the reference)
+    buf = io.BytesIO()
+    df_total.to_feather(buf)
+    ctx.write_bytes(PLAYGROUND_BINARY, buf.getvalue())
+
+    # Sufficient-statistics cube (year x QC fail count cells) for instant playground filters
+    cube = build_cube(df_total, all_items)
+    ctx.write_bytes(CUBE_FILE, cube_bytes(cube))
+    print(f"[SUCCESS] Statistics cube saved to {CUBE_FILE} ({len(cube['n'])} cells)")
+
+if __name__ == "__main__":
+    run(PipelineContext.standalone())
@@ -0,0 +1,133 @@
+import json
+import math
+import numbers
+
+# Structured results store.
+# Every stage records its headline numbers as one typed, versioned JSON record per
+# stage and data variant under 06_reports/results/ (e.g. sem_with_md.json), written
+# through the PipelineContext like any other artifact. Report generators load the
+# whole store once and query exact values from it instead of parsing text reports.
+# Tables (descriptives, loadings, truth tables) stay in their CSV/TXT artifacts.
+
+RESULTS_DIR = '06_reports/results'
+SCHEMA_VERSION = 1
+VARIANTS = ['_raw', '_no_md', '_with_md']
+
+# stage -> field -> type. Values are checked and coerced on write; a record whose
+# schema_version differs from SCHEMA_VERSION is ignored on load (re-run the stage).
+SCHEMA = {
+    'prep': {
+        'n': int,                    # cases in this variant
+        'n_raw': int, 'n_qc': int, 'n_final': int,
+        'dropped_inattentive': int, 'dropped_careless': int, 'dropped_empty': int, 'dropped_random': int,
+        'careless_flagged': dict,    # careless filter -> raw cases it flags
+        'careless_applied': dict,    # filters step 2 applied (MAP8_CARELESS) -> raw cases they flag
+        'md_p': float, 'md_df': int, 'md_threshold': float,
+    },
+    'sem': {
+        'n': int,
+        'kmo': float, 'bartlett_chi2': float, 'bartlett_p': float,
+        'alpha': dict,               # subscale -> Cronbach's alpha
+        'fit': dict,                 # semopy fit index -> value (CFI, TLI, RMSEA, ...)
+        'factor_corr': dict,         # "FS~~PT" -> standardized latent correlation
+    },
+    'clustering': {
+        'n': int, 'k': int,
+        'sizes': dict,               # cluster -> cases
+        'profiles': dict,            # cluster -> {subscale mean -> centroid}
+    },
+    'imputation': {
+        'n': int, 'n_incomplete': int,
+        'm': int,                    # imputations analyzed (1 when nothing is missing)
+        'alpha': dict,               # subscale -> Rubin-pooled Cronbach's alpha
+        'fit': dict,                 # fit index -> mean over the imputations
+        'fmi_max': float,            # largest fraction of missing information of a CFA parameter
+        'high_share': float,         # share of the high-empathy cluster
+    },
+    'multiverse': {
+        'n_points': int, 'n_subsets': int, 'n_analyses': int,
+        'baseline': dict,            # metric -> value of the published specification
+        'spread': dict,              # metric -> {min, median, max} over all specifications
+    },
+}
+
+def record_path(stage, variant=''):
+    return f"{RESULTS_DIR}/{stage}{variant}.json"
+
+def record_paths(stage):
+    return [record_path(stage, v) for v in VARIANTS]
+
+def _leaf(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return int(value) if isinstance(value, numbers.Integral) else float(value)
+
+def _coerce(stage, values):
+    fields = SCHEMA[stage]
+    unknown = set(values) - set(fields)
+    if unknown:
+        raise KeyError(f"Unknown {stage} result field(s): {', '.join(sorted(unknown))}")
+    out = {}
+    for name, value in values.items():
+        if fields[name] is dict:
+            out[name] = {str(k): {str(a): _leaf(b) for a, b in v.items()} if isinstance(v, dict) else _leaf(v)
+                         for k, v in value.items()}
+        else:
+            out[name] = None if _leaf(value) is None else fields[name](value)
+    return out
+
+def record(ctx, stage, variant='', **values):
+    """Write the result record of `stage` for one data variant ('' = variant independent)."""
+    payload = {'schema_version': SCHEMA_VERSION, 'stage': stage, 'variant': variant,
+               'values': _coerce(stage, values)}
+    ctx.write_text(record_path(stage, variant), json.dumps(payload, indent=1))
+
+class ResultsStore:
+    def __init__(self, records):
+        self.records = records  # (stage, variant) -> values
+
+    @classmethod
+    def load(cls, ctx, stages=None):
+        """Read every record of the known stages and variants (one read per file)."""
+        records = {}
+        for stage in stages or SCHEMA:
+            for variant in [''] + VARIANTS:
+                path = record_path(stage, variant)
+                if not ctx.exists(path):
+                    continue
+                payload = json.loads(ctx.read_text(path))
+                if payload.get('schema_version') == SCHEMA_VERSION:
+                    records[(stage, variant)] = payload['values']
+        return cls(records)
+
+    def get(self, stage, variant='', field=None, default=None):
+        """One value (or the whole record when `field` is None); `default` when absent."""
+        values = self.records.get((stage, variant))
+        if values is None:
+            return default
+        if field is None:
+            return values
+        return values.get(field, default)
+
+    def across(self, stage, field, variants=VARIANTS, default=None):
+        """{variant: value} of one field over the data variants."""
+        return {v: self.get(stage, v, field, default) for v in variants}
+
+    def query(self, stage=None, variant=None):
+        """Tidy DataFrame (stage, variant, field, key, value) of the matching records."""
+        import pandas as pd
+        rows = []
+        for (st, var), values in sorted(self.records.items()):
+            if (stage is not None and st != stage) or (variant is not None and var != variant):
+                continue
+            for name, value in values.items():
+                items = value.items() if isinstance(value, dict) else [(None, value)]
+                for key, v in items:
+                    if isinstance(v, dict):
+                        rows += [(st, var, name, f"{key}.{k}", x) for k, x in v.items()]
+                    else:
+                        rows.append((st, var, name, key, v))
+        return pd.DataFrame(rows, columns=['stage', 'variant', 'field', 'key', 'value'])
+
+def fmt(value, spec='.3f', missing='N/A'):
+    return missing if value is None else format(value, spec)
@@ -0,0 +1,95 @@
+import json
+import os
+
+# CFA estimator settings shared by the SEM stage, the case-dropping script and the
+# Streamlit playground. The default is semopy's Wishart ML (MLW) with SLSQP, which is
+# what every published table was produced with. `scripts/benchmark_sem.py --select`
+# writes the fastest objective/solver that stays within tolerance of that reference
+# to ESTIMATOR_FILE; MAP8_SEM_OBJ / MAP8_SEM_SOLVER override both.
+# semopy is imported on first fit, so reading the settings stays cheap (playground start-up).
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESTIMATOR_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'sem_estimator.json')
+DEFAULT_ESTIMATOR = {'obj': 'MLW', 'solver': 'SLSQP'}
+
+def estimator_settings():
+    """Active {'obj', 'solver'}: environment > selection file > default."""
+    settings = dict(DEFAULT_ESTIMATOR)
+    if os.path.exists(ESTIMATOR_FILE):
+        with open(ESTIMATOR_FILE, 'r') as f:
+            selected = json.load(f)
+        settings.update({k: selected[k] for k in DEFAULT_ESTIMATOR if k in selected})
+    for key in DEFAULT_ESTIMATOR:
+        env = os.environ.get(f'MAP8_SEM_{key.upper()}')
+        if env:
+            settings[key] = env
+    return settings
+
+def fit_cfa(model, data, settings=None, **kwargs):
+    """`model.fit(data)` with the configured objective and solver."""
+    settings = settings or estimator_settings()
+    return model.fit(data, obj=settings['obj'], solver=settings['solver'], **kwargs)
+
+def cfa_description(item_lists):
+    """lavaan-style measurement model for {factor: [items]}."""
+    return "\n".join(f"{name} =~ {' + '.join(items)}" for name, items in item_lists.items() if items)
+
+def parameter_keys(model):
+    """{semopy parameter name: (matrix, lval, rval)}; the key survives item adds/drops."""
+    keys = {}
+    for name, param in model.parameters.items():
+        loc = param.locations[0]
+        n = next(i for i, mx in enumerate(model.matrices) if mx is loc.matrix)
+        row, col = model.names[n]
+        keys[name] = (model.matrices_names[n], row[loc.indices[0]], col[loc.indices[1]])
+    return keys
+
+class CFASession:
+    """Warm-starting CFA fitter for sensitivity loops and interactive refits.
+
+    The last converged solution is kept per model structure. A new fit starts from
+    the solution of the same structure, or else from the most recent estimate of each
+    (matrix, lval, rval) parameter, so adding or dropping items only re-initializes the
+    parameters that are new. Parameters without a previous estimate get semopy's usual
+    data-driven starting values; a warm fit that fails to converge is redone cold.
+    A warm fit stops somewhere in the solver's tolerance region around the cold optimum
+    (estimates can differ in the 4th decimal), so the reported pipeline tables are
+    fitted cold and sessions are kept for the playground and the sensitivity grids.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or estimator_settings()
+        self._by_structure = {}  # description -> {key: estimate}
+        self._latest = {}        # key -> most recent estimate from any structure
+        self.history = []        # one record per fit: warm/cold, seeded share, iterations
+
+    def _starts(self, desc, keys):
+        solution = self._by_structure.get(desc)
+        if solution is None:
+            return {name: self._latest[k] for name, k in keys.items() if k in self._latest}
+        return {name: solution[k] for name, k in keys.items() if k in solution}
+
+    def fit(self, desc, data, **kwargs):
+        """Fit `desc` to `data`; returns the fitted semopy Model."""
+        from semopy import Model
+        model = Model(desc)
+        keys = parameter_keys(model)
+        starts = self._starts(desc, keys)
+        for name, value in starts.items():
+            model.parameters[name].start = value
+        res = fit_cfa(model, data, self.settings, **kwargs)
+        warm = bool(starts)
+        if warm and not res.success:
+            model = Model(desc)
+            res = fit_cfa(model, data, self.settings, **kwargs)
+            warm = False
+        self.history.append({'warm': warm, 'seeded': len(starts) / max(len(keys), 1),
+                             'n_it': res.n_it, 'success': bool(res.success)})
+        if res.success:
+            solution = {}
+            for name, key in keys.items():
+                loc = model.parameters[name].locations[0]
+                solution[key] = float(loc.matrix[loc.indices])
+            self._by_structure[desc] = solution
+            self._latest.update(solution)
+        return model
@@ -0,0 +1,187 @@
+import io
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Mergeable sufficient-statistics cube for the Streamlit playground.
+# The playground stage groups the harmonized rows into cells of (year, QC fail count,
+# missingness pattern) and stores, per cell and for all 28 items: n, sums, the
+# cross-product matrix and a histogram over the response levels. Any filter
+# combination (years, QC strictness, item exclusions) is then a sum over cells plus a
+# slice of the active items: means, covariance, correlations, KMO, alpha, item-total
+# correlations and item descriptives need no row-level work. Rows removed by the
+# Mahalanobis filter are subtracted from the sum (`minus`), which only touches the
+# outliers. Listwise deletion is exact because a cell only qualifies when its
+# missingness pattern observes every active item.
+
+CUBE_FILE = '01_harmonized/iri_stats_cube.npz'
+CELL_KEYS = ['year', 'qc_fail_count']
+
+def build_cube(df, items, keys=CELL_KEYS):
+    """Cube arrays for `df` grouped by `keys` and missingness pattern over `items`."""
+    data = df[items].to_numpy(dtype=float)
+    observed = ~np.isnan(data)
+    levels = np.unique(data[observed])
+    pattern = observed @ (1 << np.arange(len(items), dtype=np.int64))  # bit i set = item i observed
+    cell_index = np.column_stack([df[k].to_numpy(dtype=np.int64) for k in keys] + [pattern])
+    cells, inverse = np.unique(cell_index, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    filled = np.where(observed, data, 0.0)
+    n = np.bincount(inverse, minlength=len(cells)).astype(np.int64)
+    sums = np.zeros((len(cells), len(items)))
+    np.add.at(sums, inverse, filled)
+    xprod = np.zeros((len(cells), len(items), len(items)))
+    for c in range(len(cells)):
+        rows = filled[inverse == c]
+        xprod[c] = rows.T @ rows
+    hist = np.zeros((len(cells), len(items), len(levels)), dtype=np.int64)
+    level_idx = np.searchsorted(levels, np.where(observed, data, levels[0]))
+    for j in range(len(items)):
+        np.add.at(hist, (inverse[observed[:, j]], j, level_idx[observed[:, j], j]), 1)
+    return {'items': np.array(items), 'keys': np.array(keys), 'levels': levels, 'cells': cells,
+            'n': n, 'sums': sums, 'xprod': xprod, 'hist': hist}
+
+def cube_bytes(cube):
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **cube)
+    return buf.getvalue()
+
+@dataclass
+class Moments:
+    """Sufficient statistics of one selection of rows over `items`."""
+    items: list
+    levels: np.ndarray
+    n: int
+    sums: np.ndarray   # (k,)
+    xprod: np.ndarray  # (k, k)
+    hist: np.ndarray   # (k, levels)
+
+    @classmethod
+    def from_rows(cls, data, items, levels):
+        """Moments of a complete-case row array (used for subtracted rows and as a fallback)."""
+        data = np.asarray(data, dtype=float).reshape(-1, len(items))
+        hist = np.stack([(data == v).sum(axis=0) for v in levels], axis=1) if len(data) else \
+            np.zeros((len(items), len(levels)), dtype=np.int64)
+        return cls(list(items), levels, len(data), data.sum(axis=0), data.T @ data, hist)
+
+    def __sub__(self, other):
+        return Moments(self.items, self.levels, self.n - other.n, self.sums - other.sums,
+                       self.xprod - other.xprod, self.hist - other.hist)
+
+    def subset(self, items):
+        idx = [self.items.index(i) for i in items]
+        return Moments(list(items), self.levels, self.n, self.sums[idx], self.xprod[np.ix_(idx, idx)], self.hist[idx])
+
+    @property
+    def mean(self):
+        return pd.Series(self.sums / self.n, index=self.items)
+
+    @property
+    def cov(self):
+        centered = self.xprod - np.outer(self.sums, self.sums) / self.n
+        return pd.DataFrame(centered / (self.n - 1), index=self.items, columns=self.items)
+
+    @property
+    def corr(self):
+        cov = self.cov.to_numpy()
+        sd = np.sqrt(np.diag(cov))
+        return pd.DataFrame(cov / np.outer(sd, sd), index=self.items, columns=self.items)
+
+    def combined_corr(self, weights):
+        """Correlations of linear composites, e.g. subscale means: {name: {item: weight}}."""
+        W = np.array([[w.get(i, 0.0) for i in self.items] for w in weights.values()])
+        cov = W @ self.cov.to_numpy() @ W.T
+        sd = np.sqrt(np.diag(cov))
+        return pd.DataFrame(cov / np.outer(sd, sd), index=list(weights), columns=list(weights))
+
+    def kmo(self):
+        """Overall Kaiser-Meyer-Olkin measure (as factor_analyzer.calculate_kmo)."""
+        corr = self.corr.to_numpy()
+        inv = np.linalg.pinv(corr)
+        partial = -inv / np.sqrt(np.outer(np.diag(inv), np.diag(inv)))
+        off = ~np.eye(len(corr), dtype=bool)
+        r2, p2 = (corr[off] ** 2).sum(), (partial[off] ** 2).sum()
+        return r2 / (r2 + p2)
+
+    def alpha(self, items=None):
+        """Cronbach's alpha of `items` (default: all)."""
+        cov = (self.subset(items) if items is not None else self).cov.to_numpy()
+        k = len(cov)
+        if self.n < 2 or k < 2:
+            return 0
+        return (k / (k - 1)) * (1 - np.trace(cov) / cov.sum())
+
+    def item_total(self, items):
+        """Corrected item-total correlation of each item with the sum of the others."""
+        cov = self.subset(items).cov.to_numpy()
+        rest_cov = cov.sum(axis=1) - np.diag(cov)
+        rest_var = cov.sum() - 2 * cov.sum(axis=1) + np.diag(cov)
+        return pd.Series(rest_cov / np.sqrt(np.diag(cov) * rest_var), index=list(items))
+
+    def describe(self):
+        """DataFrame.describe().T plus skew and kurtosis, from the level histograms."""
+        n = self.n
+        mean = self.sums / n
+        dev = self.levels[None, :] - mean[:, None]
+        m2, m3, m4 = ((self.hist * dev ** p).sum(axis=1) for p in (2, 3, 4))
+        cum = np.cumsum(self.hist, axis=1)
+
+        def order_stat(k):  # k-th smallest value (0-based) of every item
+            return self.levels[(cum <= k[:, None]).sum(axis=1)]
+
+        def quantile(q):  # linear interpolation, as pandas
+            h = (n - 1) * q
+            lo = np.full(len(self.items), int(np.floor(h)))
+            hi = np.minimum(lo + 1, n - 1)
+            return order_stat(lo) + (h - lo) * (order_stat(hi) - order_stat(lo))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5
+            kurt = (n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                    - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        present = self.hist > 0
+        return pd.DataFrame({
+            'count': float(n), 'mean': mean, 'std': np.sqrt(m2 / (n - 1)),
+            'min': self.levels[present.argmax(axis=1)], '25%': quantile(0.25), '50%': quantile(0.5),
+            '75%': quantile(0.75), 'max': self.levels[len(self.levels) - 1 - present[:, ::-1].argmax(axis=1)],
+            'skew': skew, 'kurtosis': kurt}, index=self.items)
+
+class StatsCube:
+    def __init__(self, arrays):
+        self.items = [str(i) for i in arrays['items']]
+        self.keys = [str(k) for k in arrays['keys']]
+        self.levels = arrays['levels']
+        self.cells = arrays['cells']
+        self.n, self.sums, self.xprod, self.hist = arrays['n'], arrays['sums'], arrays['xprod'], arrays['hist']
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        with np.load(path) as f:
+            return cls({k: f[k] for k in f.files})
+
+    @property
+    def total(self):
+        return int(self.n.sum())
+
+    def select(self, active_items, years=None, max_qc=None):
+        """Mask of the cells kept by the filters (years None/empty = all, max_qc None = no QC filter)."""
+        year, qc, pattern = self.cells[:, self.keys.index('year')], self.cells[:, self.keys.index('qc_fail_count')], self.cells[:, -1]
+        need = sum(1 << self.items.index(i) for i in active_items)
+        mask = (pattern & need) == need
+        if years:
+            mask &= np.isin(year, list(years))
+        if max_qc is not None:
+            mask &= qc <= max_qc
+        return mask
+
+    def moments(self, active_items, years=None, max_qc=None, minus=None):
+        """Moments of the active items over the selected cells, less the rows in `minus`."""
+        mask = self.select(active_items, years, max_qc)
+        idx = [self.items.index(i) for i in active_items]
+        total = Moments(list(active_items), self.levels, int(self.n[mask].sum()), self.sums[mask][:, idx].sum(axis=0),
+                        self.xprod[mask][:, idx][:, :, idx].sum(axis=0), self.hist[mask][:, idx].sum(axis=0))
+        if minus is not None and len(minus):
+            total = total - Moments.from_rows(minus, active_items, self.levels)
+        return total
@@ -0,0 +1,221 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic IRI survey generator (for benchmarks and scale tests).
+# Responses are sampled from a 4-factor population model (FS, PT, EC, PD; 7 items each)
+# and written in the exact raw layouts of the 2023 / 2024 / 2025 workbooks, including
+# attention-check columns, careless responders (straight-lining / random answering)
+# and multivariate outliers. Items are generated already scored in the keyed direction,
+# like the real raw files.
+
+# Item indices
+fs_idx = [1, 5, 7, 12, 16, 23, 26]
+pt_idx = [3, 8, 11, 15, 21, 25, 28]
+ec_idx = [2, 4, 9, 14, 18, 20, 22]
+pd_idx = [6, 10, 13, 17, 19, 24, 27]
+
+FACTORS = ['FS', 'PT', 'EC', 'PD']
+FACTOR_ITEMS = {'FS': fs_idx, 'PT': pt_idx, 'EC': ec_idx, 'PD': pd_idx}
+
+def get_canonical(idx):
+    for name, idxs in FACTOR_ITEMS.items():
+        if idx in idxs: return f"{name}{idx}"
+    return None
+
+all_items = [get_canonical(idx) for idx in range(1, 29)]
+
+# Population model (roughly the published IRI structure)
+DEFAULT_FACTOR_CORR = np.array([
+    #  FS    PT    EC    PD
+    [1.00, 0.25, 0.35, 0.15],
+    [0.25, 1.00, 0.40, -0.10],
+    [0.35, 0.40, 1.00, 0.20],
+    [0.15, -0.10, 0.20, 1.00],
+])
+DEFAULT_LOADING_RANGE = (0.45, 0.80)
+
+RAW_FILES = {
+    2023: '1_2023_data_IRI',
+    2024: '2_2024_data_IRI',
+    2025: '3_2025_data_IRI',
+}
+YEAR_SHARES = {2023: 0.48, 2024: 0.42, 2025: 0.10}
+
+def population_model(seed=0, factor_corr=None, loading_range=DEFAULT_LOADING_RANGE):
+    """Loadings, residual SDs and category thresholds for the 28 items."""
+    rng = np.random.default_rng(seed)
+    corr = DEFAULT_FACTOR_CORR if factor_corr is None else np.asarray(factor_corr, dtype=float)
+    loadings = np.zeros((28, 4))
+    for f, name in enumerate(FACTORS):
+        for idx in FACTOR_ITEMS[name]:
+            loadings[idx - 1, f] = rng.uniform(*loading_range)
+    # Standardized latent responses: residual variance = 1 - communality
+    communality = np.einsum('if,fg,ig->i', loadings, corr, loadings)
+    resid_sd = np.sqrt(np.clip(1 - communality, 0.05, None))
+    # Item-specific 5-category thresholds (items differ in difficulty)
+    shift = rng.normal(0, 0.35, size=(28, 1))
+    thresholds = np.array([-1.6, -0.6, 0.3, 1.2]) + shift
+    return {'factor_corr': corr, 'loadings': loadings, 'resid_sd': resid_sd, 'thresholds': thresholds}
+
+def sample_items(n, model, rng, careless_rate=0.05, outlier_rate=0.01, missing_rate=0.0):
+    """n x 28 integer responses on the 1-5 scale plus the respondent type."""
+    eta = rng.multivariate_normal(np.zeros(4), model['factor_corr'], size=n)
+    latent = eta @ model['loadings'].T + rng.standard_normal((n, 28)) * model['resid_sd']
+    # Vectorized ordinal cut: count thresholds below the latent response
+    items = 1 + (latent[:, :, None] > model['thresholds'][None, :, :]).sum(axis=2)
+
+    kind = np.full(n, 'attentive', dtype=object)
+    u = rng.random(n)
+    careless = u < careless_rate
+    outlier = (u >= careless_rate) & (u < careless_rate + outlier_rate)
+    straight = careless & (rng.random(n) < 0.5)
+    random_resp = careless & ~straight
+    items[straight] = rng.integers(1, 6, size=(straight.sum(), 1))
+    items[random_resp] = rng.integers(1, 6, size=(random_resp.sum(), 28))
+    # Outliers: extreme, internally inconsistent patterns (alternating 1/5 blocks)
+    flip = rng.random((outlier.sum(), 28)) < 0.5
+    items[outlier] = np.where(flip, 1, 5)
+    kind[straight] = 'straightliner'
+    kind[random_resp] = 'random'
+    kind[outlier] = 'outlier'
+
+    if missing_rate > 0:
+        items = items.astype(float)
+        items[rng.random(items.shape) < missing_rate] = np.nan
+    return items, kind
+
+def attention_checks(kind, rng, passed, failed_values=(1, 2, 3, 4, 5)):
+    """Attention-check answers: attentive respondents mostly give `passed`, careless ones answer at random."""
+    n = len(kind)
+    attentive = kind == 'attentive'
+    # A few attentive respondents still slip (as in the real data)
+    slip = attentive & (rng.random(n) < 0.03)
+    out = np.where(attentive & ~slip, passed, rng.choice(failed_values, size=n))
+    return out.astype(int)
+
+def demographics(n, rng):
+    age = np.clip(np.round(16 + rng.gamma(2.0, 3.5, size=n)), 16, 77)
+    ses = rng.choice([0, 1, 2, 3, 4, 5, 6], size=n, p=[0.05, 0.22, 0.33, 0.24, 0.12, 0.03, 0.01])
+    gender = rng.choice([1, 2, 0, 3, 4], size=n, p=[0.56, 0.41, 0.01, 0.01, 0.01])
+    return age, gender, ses
+
+def build_year(year, n, model, rng, careless_rate=0.05, outlier_rate=0.01, missing_rate=0.0, id_offset=0):
+    """DataFrame in the raw workbook layout of `year`."""
+    items, kind = sample_items(n, model, rng, careless_rate, outlier_rate, missing_rate)
+    age, gender, ses = demographics(n, rng)
+    scores = {name: np.nansum(items[:, [i - 1 for i in FACTOR_ITEMS[name]]], axis=1).astype(int) for name in FACTORS}
+
+    if year == 2023:
+        # 0-4 scale, Spanish gender labels, subscale totals stored in the workbook
+        labels = np.array(['Hombre', 'Mujer', 'NR', 'No binario', 'Otro'])
+        df = pd.DataFrame({
+            'ID': np.arange(1, n + 1) + id_offset,
+            'age': age.astype(int),
+            'gender': labels[rng.choice(5, size=n, p=[0.55, 0.44, 0.005, 0.004, 0.001])],
+            'faculty': rng.choice(['Fisicomecánicas', 'Ciencias Humanas', 'Fisicoquímicas', 'Ciencias', 'Salud', 'Otros'],
+                                  size=n, p=[0.51, 0.19, 0.17, 0.07, 0.03, 0.03]),
+            'school_location': rng.choice(['Otro municipio', 'Área Metropolitana BGA'], size=n, p=[0.61, 0.39]),
+            'public_school': (rng.random(n) < 0.79).astype(int),
+            'economic_level': ses,
+        })
+        for i in range(1, 29):
+            df[get_canonical(i)] = items[:, i - 1] - 1
+        sums = {name: scores[name] - 7 for name in FACTORS}
+        df['IRITOTAL'] = sum(sums.values())
+        df['IRI_COG_PT&FS'] = sums['PT'] + sums['FS']
+        df['PT'] = sums['PT']
+        df['FS'] = sums['FS']
+        df['IRI_EMOTION_EC&PD'] = sums['EC'] + sums['PD']
+        df['EC'] = sums['EC']
+        df['PD'] = sums['PD']
+        return df
+
+    if year == 2024:
+        df = pd.DataFrame({
+            'ID': np.arange(1, n + 1) + id_offset,
+            'age': np.where(rng.random(n) < 0.07, np.nan, age),
+            'gender': gender,
+            'socioeconomic_level': ses,
+            'university_student': (rng.random(n) < 0.76).astype(int),
+        })
+        for i in range(1, 29):
+            df[f"E{get_canonical(i)}"] = items[:, i - 1]
+        # Observed pass pattern in the 2024 workbook: AC1=5, AC2=1, AC3=1, AC4=5
+        ac = {name: attention_checks(kind, rng, passed) for name, passed in
+              [('AC1', 5), ('AC2', 1), ('AC3', 1), ('AC4', 5)]}
+        df = df.assign(**ac)
+        df['attention_check'] = ((ac['AC1'] == 5) & (ac['AC2'] == 1) & (ac['AC3'] == 1) & (ac['AC4'] == 5)).astype(int)
+        for name in ['PT', 'FS', 'EC', 'PD']:
+            df[f"IRI_{name.lower()}"] = scores[name]
+        return df
+
+    if year == 2025:
+        # Form export: 'iri_' prefix, attention checks interleaved with the items, blank demographics
+        blank = rng.random(n) < 0.11
+        def demo(values):
+            return np.where(blank, np.nan, values.astype(float))
+        cols = {
+            'iri_id': 2_200_000 + rng.permutation(max(10 * n, 100_000))[:n],
+            'age': demo(age),
+            'sex': demo(np.where(gender == 2, 2, 1)),
+            'gender': demo(gender),
+            'socioeconomic_level': demo(ses),
+            'academic_unit': demo(rng.choice([0, 1, 2, 3, 4], size=n, p=[0.07, 0.15, 0.48, 0.29, 0.01])),
+            'iri_commitment': np.where(kind == 'attentive', 1, rng.choice([0, 1, 2], size=n)),
+        }
+        for i in range(1, 29):
+            cols[f"iri_{get_canonical(i)}"] = items[:, i - 1]
+            if i == 9:
+                cols['iri_ac1_rta5'] = attention_checks(kind, rng, 5)
+            if i == 19:
+                cols['iri_ac2_rta1'] = attention_checks(kind, rng, 1)
+        return pd.DataFrame(cols)
+
+    raise ValueError(f"No raw layout for year {year}")
+
+def generate(n_total, years=(2023, 2024, 2025), seed=0, careless_rate=0.05, outlier_rate=0.01,
+             missing_rate=0.0, model=None):
+    """{year: raw-layout DataFrame} with `n_total` respondents split like the real waves."""
+    rng = np.random.default_rng(seed)
+    model = model or population_model(seed)
+    shares = np.array([YEAR_SHARES[y] for y in years])
+    counts = np.floor(n_total * shares / shares.sum()).astype(int)
+    counts[0] += n_total - counts.sum()
+    return {year: build_year(year, int(n), model, rng, careless_rate, outlier_rate, missing_rate)
+            for year, n in zip(years, counts)}
+
+def write_raw(frames, out_dir, fmt='xlsx'):
+    """Write the frames as `00_raw/<file>.xlsx` (or `.csv`) under `out_dir`."""
+    raw_dir = os.path.join(out_dir, '00_raw')
+    os.makedirs(raw_dir, exist_ok=True)
+    paths = []
+    for year, df in frames.items():
+        path = os.path.join(raw_dir, f"{RAW_FILES[year]}.{fmt}")
+        if fmt == 'xlsx':
+            df.to_excel(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic IRI survey data in the raw workbook layouts.")
+    parser.add_argument('-n', '--respondents', type=int, default=2322, help="Total respondents across all years")
+    parser.add_argument('-o', '--out', default='synthetic', help="Output root (files go to <out>/00_raw)")
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--careless-rate', type=float, default=0.05)
+    parser.add_argument('--outlier-rate', type=float, default=0.01)
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="Share of item responses left blank")
+    args = parser.parse_args(argv)
+
+    frames = generate(args.respondents, seed=args.seed, careless_rate=args.careless_rate,
+                      outlier_rate=args.outlier_rate, missing_rate=args.missing_rate)
+    for path in write_raw(frames, args.out, args.format):
+        print(f"[SUCCESS] {path}")
+
+if __name__ == "__main__":
+    main()
@@ -11,12 +11,17 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import plotly.figure_factory as ff
-from factor_analyzer import calculate_kmo, calculate_bartlett_sphericity
-from semopy import Model, calc_stats
-from scipy.stats import chi2
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from sem_estimator import estimator_settings
+from stats_cube import CUBE_FILE, Moments, StatsCube
+import careless
+import playground_engine as engine
+from playground_engine import QC_MAX, md_threshold
+from playground_grid import GRID_FILE, PlaygroundGrid
+import cfa_jobs
+
 # Set page config
 st.set_page_config(page_title="MAP-8 IRI Playground", layout="wide", page_icon="🧬")
 
@@ -34,16 +39,134 @@ st.title("🧬 MAP-8 Empathy Research: Psychometric Playground")
 st.markdown("Explore sensitivity, data cleaning thresholds, and latent structures of the IRI dataset dynamically.")
 
 # 1. Data Loading
-@st.cache_data
+# Start-up is kept light: the playground rows come from the Feather copy, semopy is only
+# imported by the CFA workers, and each tab's content runs only while that tab is open.
+# scripts/benchmark_startup.py tracks the cold-start time.
+@st.cache_resource
 def load_data():
-    path = '01_harmonized/df_iri_playground.csv'
-    if not os.path.exists(path):
+    df = engine.load_playground()
+    if df is None:
         # Fallback to standard if playground doesn't exist for some reason
         path = '01_harmonized/df_iri_all_harmonized.csv'
         if not os.path.exists(path):
             st.error(f"Data not found. Please run 'python scripts/prepare_playground_data.py' first.")
             return None
-    return pd.read_csv(path)
+        df = pd.read_csv(path)
+    return freeze(df)
+
+# --- Processing Engine ---
+# Cleaning is split in two cached stages and shared across reruns and sessions without
+# copying (st.cache_resource; st.cache_data would unpickle a fresh copy on every hit):
+#   distance_stage  (QC level, active items, years, careless filters, imputation)
+#                                                   -> complete cases + Mahalanobis distances
+#   process_data    (... + MD p-threshold)          -> re-mask of the precomputed distances
+# Moving the p-value slider therefore never recomputes the covariance or its inverse.
+# The frames are frozen, so treat them as read-only.
+PROCESS_CACHE_MB = float(os.environ.get('MAP8_PLAYGROUND_CACHE_MB', 256))
+
+def freeze(df):
+    """Mark the frame's column blocks read-only; in-place writes then raise instead of corrupting the cache."""
+    for block in df._mgr.blocks:
+        block.values.flags.writeable = False
+    return df
+
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def distance_stage(qc, active_items, years=None, careless_filters=(), impute=False):
+    # Year / QC / careless filters, imputation or listwise deletion and Mahalanobis distances (scripts/playground_engine.py)
+    temp, md = engine.distances(load_data(), qc, active_items, years, careless_filters, impute)
+    temp = freeze(temp)
+    if md is None:
+        return temp, None, None
+    md_sorted = np.sort(md)
+    md.flags.writeable = False
+    md_sorted.flags.writeable = False
+    return temp, md, md_sorted
+
+@st.cache_resource(max_entries=32, ttl=3600, show_spinner=False)
+def process_data(qc, p_val, active_items, years=None, careless_filters=(), impute=False):
+    temp, md, _ = distance_stage(qc, active_items, years, careless_filters, impute)
+    if md is None:
+        return temp
+    return freeze(engine.remove_outliers(temp, md, p_val, len(active_items)))
+
+def outlier_curve(md_sorted, n_items, p_values=np.geomspace(1e-4, 0.05, 80)):
+    """Outlier counts over a grid of p-thresholds, by binary search in the sorted distances."""
+    counts = len(md_sorted) - np.searchsorted(md_sorted, md_threshold(p_values, n_items), side='right')
+    return pd.DataFrame({'p-value threshold': p_values, 'Outliers': counts})
+
+@st.cache_resource
+def _process_cache_usage():
+    return {}
+
+def processing_key(qc, active_items, years, careless_filters=(), impute=False):
+    return (qc, tuple(active_items), tuple(sorted(int(y) for y in years)) if years else None,
+            tuple(sorted(careless_filters)), bool(impute))
+
+def get_processed(qc, p_val, active_items, years=None, careless_filters=(), impute=False):
+    """Cached cleaned subset; both caches are dropped once they exceed PROCESS_CACHE_MB."""
+    key = processing_key(qc, active_items, years, careless_filters, impute)
+    df = process_data(key[0], float(p_val), key[1], key[2], key[3], key[4])
+    base, md, _ = distance_stage(*key)
+    usage = _process_cache_usage()
+    usage[('distance',) + key] = int(base.memory_usage(deep=True).sum()) + (md.nbytes * 2 if md is not None else 0)
+    usage[('process', float(p_val)) + key] = int(df.memory_usage(deep=True).sum())
+    if sum(usage.values()) > PROCESS_CACHE_MB * 1024 * 1024:
+        process_data.clear()
+        distance_stage.clear()
+        usage.clear()
+    return df
+
+# --- Statistics Cube ---
+# Correlations, KMO, alpha and item descriptives come from the sufficient-statistics cube
+# built by the playground stage: the (year x QC) cells of the selection are summed and
+# the Mahalanobis outliers subtracted, so no filter change touches the rows for them.
+# The cube has no careless-responding dimension and deletes incomplete cases listwise:
+# with careless filters or imputation on, the moments come from the cleaned rows.
+@st.cache_resource
+def load_cube():
+    """The cube shipped in 01_harmonized, or None when it is missing or out of date."""
+    df = load_data()
+    if df is None or not os.path.exists(CUBE_FILE):
+        return None
+    cube = StatsCube.load(CUBE_FILE)
+    return cube if cube.total == len(df) else None
+
+def selection_moments(qc, p_val, active_items, years=None, careless_filters=(), impute=False):
+    """Moments of the active items over the cleaned subset."""
+    cube = load_cube()
+    if cube is None or careless_filters or impute:
+        data = get_processed(qc, p_val, active_items, years, careless_filters, impute)[list(active_items)].to_numpy(dtype=float)
+        return Moments.from_rows(data, active_items, np.unique(data))
+    base, md, _ = distance_stage(*processing_key(qc, active_items, years))
+    outliers = None
+    if md is not None:
+        outliers = base.iloc[np.flatnonzero(md > md_threshold(p_val, len(active_items)))][list(active_items)].to_numpy(dtype=float)
+    return cube.moments(active_items, years, QC_MAX[qc], minus=outliers)
+
+@st.cache_resource
+def load_grid():
+    """Offline results over the dashboard grid (scripts/playground_grid.py), or None when
+    missing or built from other data or with another estimator."""
+    df = load_data()
+    grid = PlaygroundGrid.open(GRID_FILE)
+    if df is None or grid is None or not grid.matches(df, estimator_settings()):
+        return None
+    return grid
+
+@st.cache_resource
+def cfa_pool():
+    """Process pool shared by all sessions for background CFA fits."""
+    return cfa_jobs.make_pool()
+
+@st.fragment(run_every=1.0)
+def job_progress(keys, label):
+    """Progress bar over the given jobs; reruns the page once they have all finished."""
+    jobs = st.session_state['cfa_jobs']
+    jobs.collect()
+    done, total = jobs.progress(keys)
+    st.progress(done / max(total, 1), text=f"{label} ({done}/{total})")
+    if not any(k in jobs.pending for k in keys):
+        st.rerun()
 
 df_raw = load_data()
 
@@ -54,8 +177,17 @@ if df_raw is not None:
     # Cleaning Parameters
     st.sidebar.subheader("Data Cleaning")
     qc_level = st.sidebar.select_slider("Attention Check Strictness", options=["Relaxed", "Standard (Default)", "Strict"], value="Standard (Default)")
+    careless_filters = st.sidebar.multiselect("Careless-Responding Filters", list(careless.FILTERS),
+                                              format_func=lambda name: careless.FILTERS[name][3],
+                                              help="Drop cases flagged by these indices (scripts/careless.py).")
+    # Only offered when some respondents skipped items
+    impute_missing = False
+    if df_raw[engine.ALL_ITEMS].isna().any(axis=None):
+        impute_missing = st.sidebar.toggle("Impute Missing Items (PMM)", value=True,
+                                           help="Fill skipped items by predictive mean matching instead of dropping the respondent.")
     
     md_p_threshold = st.sidebar.slider("Mahalanobis P-value Threshold", 0.0001, 0.05, 0.001, format="%.4f", help="Lower p-value = fewer cases dropped as outliers.")
+    md_curve_slot = st.sidebar.container()
     
     # Reverse Coding Simulator
     st.sidebar.subheader("Reversal Logic")
@@ -73,11 +205,8 @@ if df_raw is not None:
     
     # Feature Selection
     st.sidebar.subheader("Variable Management")
-    fs_items = [f"FS{i}" for i in [1, 5, 7, 12, 16, 23, 26]]
-    pt_items = [f"PT{i}" for i in [3, 8, 11, 15, 21, 25, 28]]
-    ec_items = [f"EC{i}" for i in [2, 4, 9, 14, 18, 20, 22]]
-    pd_items = [f"PD{i}" for i in [6, 10, 13, 17, 19, 24, 27]]
-    all_all = fs_items + pt_items + ec_items + pd_items
+    fs_items, pt_items, ec_items, pd_items = engine.SUBSCALES.values()
+    all_all = engine.ALL_ITEMS
     
     exclude_items = st.sidebar.multiselect("Drop Specific Items", all_all, help="Drop problematic items (e.g. FS7) to check fit improvement.")
     
@@ -96,195 +225,208 @@ if df_raw is not None:
                 marker_vars[name] = None
 
     # --- CFA Model Setup ---
-    mod_parts = []
-    for name, items in [('FS', fs_items), ('PT', pt_items), ('EC', ec_items), ('PD', pd_items)]:
-        current = [i for i in items if i in active_items]
-        if current:
-            # Reorder current list to put marker variable first (semopy fixes the first item by default)
-            marker = marker_vars.get(name)
-            if marker and marker in current:
-                current.remove(marker)
-                current.insert(0, marker)
-            mod_parts.append(f"{name} =~ {' + '.join(current)}")
-    mod_desc = "\n".join(mod_parts)
-
-    # --- Processing Engine ---
-    def process_data(df, qc, p_val, reverse, drops, years=None):
-        temp = df.copy()
-        
-        # 0. Filter by selected years
-        if years:
-            temp = temp[temp['year'].isin(years)]
-            
-        # 1. Optional Reversal simulation
-        if reverse:
-            # Note: The 'all_harmonized' file already has some logic applied. 
-            # This playground assumes we tweak on top or reset.
-            # In our pipeline FS7/PD13 were reversed in 2025.
-            pass # Already harmonized in the CSV we are loading
-            
-        # 2. QC Filtering
-        if qc == "Strict":
-            temp = temp[temp['qc_fail_count'] == 0]
-        elif qc == "Standard (Default)":
-            temp = temp[temp['qc_fail_count'] <= 1]
-            
-        # 3. Drop missing in active items
-        temp = temp.dropna(subset=active_items)
-        
-        # 4. Mahalanobis Step
-        if len(temp) > len(active_items):
-            data = temp[active_items]
-            mu = data.mean()
-            cov = data.cov()
-            prec = np.linalg.pinv(cov)
-            diff = data - mu
-            md = diff.apply(lambda x: np.sqrt(np.dot(np.dot(x, prec), x)), axis=1)
-            threshold = np.sqrt(chi2.ppf(1 - p_val, df=len(active_items)))
-            temp['is_outlier'] = md > threshold
-            temp_clean = temp[~temp['is_outlier']].copy()
-        else:
-            temp_clean = temp.copy()
-            
-        return temp_clean
+    # Marker variables go first in each factor (semopy fixes the first item by default)
+    mod_desc = engine.model_description(active_items, marker_vars)
+
+    df_active = get_processed(qc_level, md_p_threshold, active_items, selected_years, careless_filters, impute_missing)
+    moments = selection_moments(qc_level, md_p_threshold, active_items, selected_years, careless_filters, impute_missing)
 
-    df_active = process_data(df_raw, qc_level, md_p_threshold, do_reversal, exclude_items, selected_years)
+    # Background CFA: fits run in a shared process pool (warm-started and cached in the
+    # workers); finished results stay in session state until the inputs change.
+    if 'cfa_jobs' not in st.session_state:
+        st.session_state['cfa_jobs'] = cfa_jobs.JobBoard()
+    jobs = st.session_state['cfa_jobs']
+    jobs.collect()
+
+    # Job keys for the current inputs: the CFA tab fit and one fit per comparison dataset
+    cfa_key = jobs.key(mod_desc, df_active)
+    compare_sets = [(f"Year {yr}", [yr]) for yr in available_years]
+    if len(selected_years) > 1:
+        compare_sets.append(("Merged Selection", selected_years))
+    compare_sets = [(label, years, get_processed(qc_level, md_p_threshold, active_items, years, careless_filters, impute_missing)) for label, years in compare_sets]
+    compare_sets = [(label, years, data) for label, years, data in compare_sets if len(data) >= 50]
+    compare_keys = {label: jobs.key(mod_desc, data) for label, _, data in compare_sets}
+    # Queued jobs for inputs the user has moved away from are cancelled
+    jobs.cancel_stale({cfa_key, *compare_keys.values()})
+
+    # Points on the precomputed grid are served without fitting; the rest fit live
+    # (the grid has no careless-responding filters or imputation)
+    grid = load_grid()
+    if grid is not None and not careless_filters and not impute_missing:
+        for key, years, data in [(cfa_key, selected_years, df_active)] + [(compare_keys[label], years, data) for label, years, data in compare_sets]:
+            if key in jobs.results:
+                continue
+            base, _, _ = distance_stage(*processing_key(qc_level, active_items, years))
+            hit = grid.lookup(years or available_years, qc_level, exclude_items, len(base) - len(data), mod_desc)
+            if hit is not None:
+                jobs.preload(key, hit[0])
 
     # --- Dashboard Layout ---
     m1, m2, m3, m4 = st.columns(4)
     m1.metric("Sample Size", len(df_active), delta=f"{len(df_active) - len(df_raw)}")
+
+    # Outlier count vs. threshold, straight from the cached sorted distances
+    df_base, _, md_sorted = distance_stage(*processing_key(qc_level, active_items, selected_years, careless_filters, impute_missing))
+    m3.metric("MD Outliers Removed", len(df_base) - len(df_active))
+    if md_sorted is not None:
+        with md_curve_slot.expander("📉 Outliers vs. Threshold", expanded=False):
+            fig_md = px.line(outlier_curve(md_sorted, len(active_items)), x='p-value threshold', y='Outliers', log_x=True)
+            fig_md.add_vline(x=md_p_threshold, line_dash='dash', line_color='#ef4444')
+            fig_md.update_layout(height=250, margin=dict(l=0, r=0, t=10, b=0))
+            st.plotly_chart(fig_md, use_container_width=True)
     
     # Calculate global KMO
     try:
-        _, kmo_model = calculate_kmo(df_active[active_items])
+        kmo_model = moments.kmo()
         m2.metric("KMO MSA", f"{kmo_model:.3f}")
     except: m2.metric("KMO MSA", "Err")
 
-    # Alpha calculation
-    def get_alpha(d):
-        if d.empty: return 0
-        v = d.var(axis=0, ddof=1)
-        tv = d.sum(axis=1).var(ddof=1)
-        n = d.shape[1]
-        return (n/(n-1)) * (1-(v.sum()/tv))
-
-    # Tabs
+    # Tabs (lazy: only the open tab's content runs)
     tab0, tab1, tab2, tab3, tab4 = st.tabs([
         "🏠 Welcome & Guide", 
         "📊 Correlations & Descriptives", 
         "📉 CFA & Fit", 
         "🧩 Subscale Reliability", 
         "🚀 Cross-Dataset Comparison"
-    ])
+    ], key="active_tab", on_change="rerun")
 
     with tab0:
-        st.header("Welcome to the MAP-8 Psychometric Playground! 🧪")
-        st.markdown("""
-        This tool is designed to help researchers explore the **Interpersonal Reactivity Index (IRI)** dataset across three years of data collection. 
-        Adjust the filters in the sidebar to see how data cleaning decisions impact latent structures and fit.
-        """)
+        if tab0.open:
+            st.header("Welcome to the MAP-8 Psychometric Playground! 🧪")
+            st.markdown("""
+            This tool is designed to help researchers explore the **Interpersonal Reactivity Index (IRI)** dataset across three years of data collection. 
+            Adjust the filters in the sidebar to see how data cleaning decisions impact latent structures and fit.
+            """)
         
-        col_doc1, col_doc2 = st.columns(2)
+            col_doc1, col_doc2 = st.columns(2)
         
-        with col_doc1:
-            st.subheader("🧹 Data Cleaning Logic")
+            with col_doc1:
+                st.subheader("🧹 Data Cleaning Logic")
             
-            with st.expander("1. Attention Check Strictness", expanded=True):
-                st.write("""
-                **Why?** Respondents sometimes click through surveys without reading. We use 'Trap Questions' (e.g., *'Select Strongly Agree for this item'*) to detect noise.
-                - **Relaxed:** Includes everyone.
-                - **Standard (Default):** Allows 1 failure ($QC \le 1$).
-                - **Strict:** Only includes perfect responders ($QC = 0$).
-                """)
+                with st.expander("1. Attention Check Strictness", expanded=True):
+                    st.write("""
+                    **Why?** Respondents sometimes click through surveys without reading. We use 'Trap Questions' (e.g., *'Select Strongly Agree for this item'*) to detect noise.
+                    - **Relaxed:** Includes everyone.
+                    - **Standard (Default):** Allows 1 failure ($QC \le 1$).
+                    - **Strict:** Only includes perfect responders ($QC = 0$).
+                    """)
             
-            with st.expander("2. Mahalanobis Distance (Outliers)", expanded=True):
-                st.write("""
-                **Why?** To detect multivariate outliers—patterns of responses that are mathematically 'too far' from the average.
-                """)
-                st.latex(r"D_M(x) = \sqrt{(x - \mu)^T \Sigma^{-1} (x - \mu)}")
-                st.write("""
-                **Example:** If someone answers '5' to all Empathic Concern items but '1' to all Personal Distress items in a way that is highly improbable, the distance increases. 
-                *Lower p-value threshold = stricter exclusion.*
-                """)
-
-        with col_doc2:
-            st.subheader("⚙️ Psychometric Controls")
+                with st.expander("1b. Careless-Responding Indices", expanded=False):
+                    st.write("""
+                    **Why?** Attention checks catch only some careless responders. These indices look at the answer pattern itself:
+                    - **Longstring:** long runs of the same answer (straightlining).
+                    - **IRV:** almost no variation across the 28 answers.
+                    - **Even-odd / Synonyms / Antonyms:** answers that disagree with themselves on items that should agree.
+                    - **Person-total:** an answer profile unrelated to everyone else's.
+                    """)
+
+                with st.expander("2. Mahalanobis Distance (Outliers)", expanded=True):
+                    st.write("""
+                    **Why?** To detect multivariate outliers—patterns of responses that are mathematically 'too far' from the average.
+                    """)
+                    st.latex(r"D_M(x) = \sqrt{(x - \mu)^T \Sigma^{-1} (x - \mu)}")
+                    st.write("""
+                    **Example:** If someone answers '5' to all Empathic Concern items but '1' to all Personal Distress items in a way that is highly improbable, the distance increases. 
+                    *Lower p-value threshold = stricter exclusion.*
+                    """)
+
+            with col_doc2:
+                st.subheader("⚙️ Psychometric Controls")
             
-            with st.expander("3. Reversal Logic", expanded=True):
-                st.write("""
-                **Why?** Items like **FS7** (*"I am usually objective when I watch a movie..."*) are reversed because a high score indicates *lower* fantasy engagement. 
-                Reversing ensures that all items in a subscale point in the **same psychological direction**, which is critical for valid Alpha ($\alpha$) and CFA results.
-                """)
+                with st.expander("3. Reversal Logic", expanded=True):
+                    st.write("""
+                    **Why?** Items like **FS7** (*"I am usually objective when I watch a movie..."*) are reversed because a high score indicates *lower* fantasy engagement. 
+                    Reversing ensures that all items in a subscale point in the **same psychological direction**, which is critical for valid Alpha ($\alpha$) and CFA results.
+                    """)
                 
-            with st.expander("4. Variable Management", expanded=True):
-                st.write("""
-                **Why?** Some items might be 'noisy' or misunderstood by a specific population. By dropping them, you can observe if the **Model Fit (CFI/TLI)** increases. 
-                If dropping an item significantly improves fit, it might be a candidate for permanent removal in future research versions.
-                """)
-
-        st.divider()
-        st.subheader("🛠️ Map of the Playground")
-        st.markdown("""
-        - **📊 Correlations:** Visualize how items talk to each other. Look for 'blobs' of color within subscales.
-        - **📉 CFA & Fit:** The 'Gold Standard' for validation. Checks if the 4-factor structure actually holds up.
-        - **🧩 Reliability:** Check Cronbach's Alpha. If $\alpha < 0.70$, the subscale is considered 'weak'.
-        - **🚀 Comparison:** The most powerful tool. See if the model performs better in 2023 vs 2025.
-        """)
+                with st.expander("4. Variable Management", expanded=True):
+                    st.write("""
+                    **Why?** Some items might be 'noisy' or misunderstood by a specific population. By dropping them, you can observe if the **Model Fit (CFI/TLI)** increases. 
+                    If dropping an item significantly improves fit, it might be a candidate for permanent removal in future research versions.
+                    """)
+
+            st.divider()
+            st.subheader("🛠️ Map of the Playground")
+            st.markdown("""
+            - **📊 Correlations:** Visualize how items talk to each other. Look for 'blobs' of color within subscales.
+            - **📉 CFA & Fit:** The 'Gold Standard' for validation. Checks if the 4-factor structure actually holds up.
+            - **🧩 Reliability:** Check Cronbach's Alpha. If $\alpha < 0.70$, the subscale is considered 'weak'.
+            - **🚀 Comparison:** The most powerful tool. See if the model performs better in 2023 vs 2025.
+            """)
 
     with tab1:
-        st.subheader("Interactive Correlation Matrix")
-        corr_type = st.radio("Analyze:", ["Items", "Subscales"], horizontal=True)
+        if tab1.open:
+            st.subheader("Interactive Correlation Matrix")
+            corr_type = st.radio("Analyze:", ["Items", "Subscales"], horizontal=True)
         
-        if corr_type == "Items":
-            corr = df_active[active_items].corr()
-        else:
-            # Recompute means for active items
-            for name, items in [('FS', fs_items), ('PT', pt_items), ('EC', ec_items), ('PD', pd_items)]:
-                current = [i for i in items if i in active_items]
-                if current: df_active[f'{name}_dyn'] = df_active[current].mean(axis=1)
-            sub_cols = [c for c in df_active.columns if c.endswith('_dyn')]
-            corr = df_active[sub_cols].corr()
+            if corr_type == "Items":
+                corr = moments.corr
+            else:
+                # Subscale means of the active items: correlations from the cube, descriptives from the
+                # rows (in a separate frame: df_active is shared by the cache)
+                df_dyn = pd.DataFrame(index=df_active.index)
+                weights = {}
+                for name, items in [('FS', fs_items), ('PT', pt_items), ('EC', ec_items), ('PD', pd_items)]:
+                    current = [i for i in items if i in active_items]
+                    if current:
+                        df_dyn[f'{name}_dyn'] = df_active[current].mean(axis=1)
+                        weights[f'{name}_dyn'] = {i: 1 / len(current) for i in current}
+                corr = moments.combined_corr(weights)
 
-        fig = px.imshow(corr, text_auto=".2f", color_continuous_scale='RdBu_r', range_color=[-1, 1],
-                       aspect="auto", title=f"Correlation Heatmap ({corr_type})")
-        fig.update_layout(height=700)
-        st.plotly_chart(fig, use_container_width=True)
+            fig = px.imshow(corr, text_auto=".2f", color_continuous_scale='RdBu_r', range_color=[-1, 1],
+                           aspect="auto", title=f"Correlation Heatmap ({corr_type})")
+            fig.update_layout(height=700)
+            st.plotly_chart(fig, use_container_width=True)
 
-        st.divider()
-        st.subheader(f"📈 Descriptive Statistics ({corr_type})")
+            st.divider()
+            st.subheader(f"📈 Descriptive Statistics ({corr_type})")
         
-        if corr_type == "Items":
-            stats_df = df_active[active_items].describe().T
-            # Add Skew and Kurtosis
-            stats_df['skew'] = df_active[active_items].skew()
-            stats_df['kurtosis'] = df_active[active_items].kurtosis()
-        else:
-            sub_cols = [c for c in df_active.columns if c.endswith('_dyn')]
-            stats_df = df_active[sub_cols].describe().T
-            stats_df['skew'] = df_active[sub_cols].skew()
-            stats_df['kurtosis'] = df_active[sub_cols].kurtosis()
-            # Clean up index labels for subscales
-            stats_df.index = [i.replace('_dyn', '') for i in stats_df.index]
-
-        # Formatting for display
-        st.dataframe(stats_df.style.format("{:.3f}"), use_container_width=True)
-        st.caption(f"Summary metrics for the currently selected data subset (N={len(df_active)})")
+            if corr_type == "Items":
+                # describe() plus skew and kurtosis, from the cube's response histograms
+                stats_df = moments.describe()
+            else:
+                stats_df = df_dyn.describe().T
+                stats_df['skew'] = df_dyn.skew()
+                stats_df['kurtosis'] = df_dyn.kurtosis()
+                # Clean up index labels for subscales
+                stats_df.index = [i.replace('_dyn', '') for i in stats_df.index]
+
+            # Formatting for display
+            st.dataframe(stats_df.style.format("{:.3f}"), use_container_width=True)
+            st.caption(f"Summary metrics for the currently selected data subset (N={len(df_active)})")
 
     with tab2:
-        st.subheader("Confirmatory Factor Analysis (CFA)")
-        st.info("Dynamic CFA using semopy. This may take a few seconds after changing items.")
+        if tab2.open:
+            st.subheader("Confirmatory Factor Analysis (CFA)")
+            st.info("Dynamic CFA using semopy. This may take a few seconds after changing items.")
         
-        with st.expander("View Model Specification"):
-            st.code(mod_desc)
-
-        if st.button("Run CFA"):
-            with st.spinner("Optimizing Latent Model..."):
-                try:
-                    model = Model(mod_desc)
-                    model.fit(df_active)
-                    est = model.inspect()
-                    stats = calc_stats(model)
-                    
+            with st.expander("View Model Specification"):
+                st.code(mod_desc)
+                est_cfg = estimator_settings()
+                st.caption(f"Estimator: {est_cfg['obj']} / {est_cfg['solver']} (see scripts/benchmark_sem.py)")
+
+            b1, b2 = st.columns([1, 4])
+            if b1.button("Run CFA"):
+                jobs.submit(cfa_pool(), mod_desc, df_active)
+            if jobs.pending and b2.button("Cancel queued fits"):
+                jobs.cancel_all()
+
+            if cfa_key in jobs.pending:
+                job_progress([cfa_key], "Optimizing Latent Model...")
+            elif cfa_key in jobs.results:
+                fit = jobs.results[cfa_key]
+                if isinstance(fit, Exception):
+                    st.error(f"SEM Error: {fit}")
+                else:
+                    est = fit.estimates
+                    stats = fit.stats
+                    if fit.precomputed:
+                        st.caption("Precomputed offline (scripts/playground_grid.py).")
+                    elif fit.cached:
+                        st.caption("Served from the CFA result cache.")
+                    else:
+                        st.caption(f"Converged in {fit.n_it} iterations ({'warm start' if fit.warm else 'cold start'}).")
+
                     c1, c2 = st.columns([1, 2])
                     with c1:
                         st.write("**Core Fit Indices**")
@@ -296,167 +438,130 @@ if df_raw is not None:
                         f3, f4 = st.columns(2)
                         f3.metric("RMSEA", f"{s.get('RMSEA', 0):.3f}")
                         f4.metric("SRMR", f"{s.get('SRMR', 0):.3f}" if 'SRMR' in s else "N/A")
-                        
+
                         st.divider()
                         st.write("**All Parameters**")
                         st.dataframe(stats.T, height=400)
                     with c2:
                         st.write("**Standardized Factor Loadings**")
                         # Get standardized loadings if possible
-                        try:
-                            std_est = model.inspect(std_est=True)
-                        except:
-                            std_est = est
+                        std_est = fit.std_estimates if fit.std_estimates is not None else est
                         loadings = std_est[std_est['op'] == '~'].rename(columns={'lval': 'Item', 'rval': 'Latent', 'Estimate': 'Loading'})
                         st.dataframe(loadings[['Latent', 'Item', 'Loading', 'p-value']], height=600)
-                except Exception as e:
-                    st.error(f"SEM Error: {e}")
 
     with tab3:
-        st.subheader("Cronbach's Alpha Sensitivity")
-        rel_data = []
-        for name, items in [('Fantasy', fs_items), ('Perspective Taking', pt_items), ('Empathic Concern', ec_items), ('Personal Distress', pd_items)]:
-            current = [i for i in items if i in active_items]
-            if current:
-                alpha = get_alpha(df_active[current])
-                rel_data.append({"Subscale": name, "Alpha": alpha, "Items Included": len(current)})
+        if tab3.open:
+            st.subheader("Cronbach's Alpha Sensitivity")
+            rel_data = []
+            for name, items in [('Fantasy', fs_items), ('Perspective Taking', pt_items), ('Empathic Concern', ec_items), ('Personal Distress', pd_items)]:
+                current = [i for i in items if i in active_items]
+                if current:
+                    alpha = moments.alpha(current)
+                    rel_data.append({"Subscale": name, "Alpha": alpha, "Items Included": len(current)})
         
-        st.table(pd.DataFrame(rel_data))
+            st.table(pd.DataFrame(rel_data))
         
-        # Item-Total Correlation
-        target_sub = st.selectbox("Detailed Sensitivity for:", ["Fantasy", "Perspective Taking", "Empathic Concern", "Personal Distress"])
-        sub_map = {"Fantasy": fs_items, "Perspective Taking": pt_items, "Empathic Concern": ec_items, "Personal Distress": pd_items}
-        sel_items = [i for i in sub_map[target_sub] if i in active_items]
+            # Item-Total Correlation
+            target_sub = st.selectbox("Detailed Sensitivity for:", ["Fantasy", "Perspective Taking", "Empathic Concern", "Personal Distress"])
+            sub_map = {"Fantasy": fs_items, "Perspective Taking": pt_items, "Empathic Concern": ec_items, "Personal Distress": pd_items}
+            sel_items = [i for i in sub_map[target_sub] if i in active_items]
         
-        if sel_items:
-            it_corr = {}
-            total = df_active[sel_items].sum(axis=1)
-            for item in sel_items:
-                it_corr[item] = df_active[item].corr(total - df_active[item])
-            st.bar_chart(pd.Series(it_corr), color="#1e3a8a")
-            st.caption(f"Corrected Item-Total Correlations for {target_sub}")
+            if sel_items:
+                st.bar_chart(moments.item_total(sel_items), color="#1e3a8a")
+                st.caption(f"Corrected Item-Total Correlations for {target_sub}")
 
     with tab4:
-        st.subheader("🚀 Cross-Dataset Model Fit Comparison")
-        st.markdown("Compare psychometric indicators across individual years and the merged selection.")
+        if tab4.open:
+            st.subheader("🚀 Cross-Dataset Model Fit Comparison")
+            st.markdown("Compare psychometric indicators across individual years and the merged selection.")
         
-        if st.button("Generate Comparison Table"):
-            results = []
-            
-            # Helper to run analysis
-            def run_quick_cfa(data, label):
-                if len(data) < 50: return None
-                try:
-                    m = Model(mod_desc)
-                    m.fit(data)
-                    s = calc_stats(m).iloc[0].to_dict()
+            if st.button("Generate Comparison Table"):
+                # One background job per dataset; the years fit in parallel
+                for label, _, data in compare_sets:
+                    jobs.submit(cfa_pool(), mod_desc, data)
+
+            compare_done, compare_total = jobs.progress(compare_keys.values())
+            if any(k in jobs.pending for k in compare_keys.values()):
+                job_progress(list(compare_keys.values()), "Fitting the comparison datasets...")
+            elif compare_total and compare_done == compare_total:
+                results = []
+                all_loadings = []
+                for label, _, data in compare_sets:
+                    fit = jobs.results[compare_keys[label]]
+                    if isinstance(fit, Exception): continue
+                    s = fit.stats.iloc[0].to_dict()
                     s['Dataset'] = label
                     s['N'] = len(data)
-                    return s
-                except: return None
-
-            # 1. Individual Years
-            for yr in available_years:
-                df_yr = process_data(df_raw, qc_level, md_p_threshold, do_reversal, exclude_items, [yr])
-                res = run_quick_cfa(df_yr, f"Year {yr}")
-                if res: results.append(res)
-            
-            # 2. Merged Selection
-            if len(selected_years) > 1:
-                res_merged = run_quick_cfa(df_active, "Merged Selection")
-                if res_merged: results.append(res_merged)
-            
-            if results:
-                df_res = pd.DataFrame(results)
-                cols_to_show = ['Dataset', 'N', 'CFI', 'TLI', 'RMSEA', 'SRMR']
-                existing_cols = [c for c in cols_to_show if c in df_res.columns]
-                
-                df_display = df_res[existing_cols].set_index('Dataset')
-                
-                # Safely prepare styling
-                format_dict = {c: '{:.3f}' for c in ['CFI', 'TLI', 'RMSEA', 'SRMR'] if c in df_display.columns}
-                high_max_cols = [c for c in ['CFI', 'TLI'] if c in df_display.columns]
-                high_min_cols = [c for c in ['RMSEA', 'SRMR'] if c in df_display.columns]
-
-                st.write("### Fit Indices Comparison")
-                styler = df_display.style.format(format_dict)
-                if high_max_cols:
-                    styler = styler.highlight_max(subset=high_max_cols, color='#dcfce7')
-                if high_min_cols:
-                    styler = styler.highlight_min(subset=high_min_cols, color='#dcfce7')
-                
-                st.dataframe(styler, use_container_width=True)
-                
-                # Plotly Visualization
-                plot_cols = [c for c in ['CFI', 'TLI'] if c in df_res.columns]
-                if plot_cols:
-                    fig_comp = px.bar(df_res, x='Dataset', y=plot_cols, barmode='group',
-                                     title="Comparative Fit (Higher is Better)",
-                                     color_discrete_sequence=['#1e3a8a', '#3b82f6'])
-                    st.plotly_chart(fig_comp, use_container_width=True)
+                    results.append(s)
+                    est = fit.std_estimates
+                    load_label = "Merged" if label == "Merged Selection" else label
+                    loadings = est[est['op'] == '~'].rename(columns={'lval': 'Item', 'rval': 'Latent', 'Estimate': f'Loading_{load_label}'})
+                    all_loadings.append(loadings[['Latent', 'Item', f'Loading_{load_label}']])
+
+                if results:
+                    df_res = pd.DataFrame(results)
+                    cols_to_show = ['Dataset', 'N', 'CFI', 'TLI', 'RMSEA', 'SRMR']
+                    existing_cols = [c for c in cols_to_show if c in df_res.columns]
                 
-                st.info("💡 **Interpretation:** CFI/TLI > 0.90 are acceptable; > 0.95 good. RMSEA/SRMR < 0.08 acceptable; < 0.05 good.")
+                    df_display = df_res[existing_cols].set_index('Dataset')
                 
-                # --- NEW: Loadings Comparison ---
-                st.divider()
-                st.subheader("📈 Cross-Dataset Factor Loadings Comparison")
-                st.markdown("Compare how strongly each item loads onto its latent construct across datasets.")
+                    # Safely prepare styling
+                    format_dict = {c: '{:.3f}' for c in ['CFI', 'TLI', 'RMSEA', 'SRMR'] if c in df_display.columns}
+                    high_max_cols = [c for c in ['CFI', 'TLI'] if c in df_display.columns]
+                    high_min_cols = [c for c in ['RMSEA', 'SRMR'] if c in df_display.columns]
+
+                    st.write("### Fit Indices Comparison")
+                    styler = df_display.style.format(format_dict)
+                    if high_max_cols:
+                        styler = styler.highlight_max(subset=high_max_cols, color='#dcfce7')
+                    if high_min_cols:
+                        styler = styler.highlight_min(subset=high_min_cols, color='#dcfce7')
                 
-                loading_results = []
+                    st.dataframe(styler, use_container_width=True)
                 
-                def get_loadings(data, label):
-                    if len(data) < 50: return None
-                    try:
-                        m = Model(mod_desc)
-                        m.fit(data)
-                        est = m.inspect(std_est=True)
-                        loadings = est[est['op'] == '~'].copy()
-                        loadings = loadings.rename(columns={'lval': 'Item', 'rval': 'Latent', 'Estimate': f'Loading_{label}'})
-                        return loadings[['Latent', 'Item', f'Loading_{label}']]
-                    except: return None
-
-                # Collect loadings for each subset
-                all_loadings = []
+                    # Plotly Visualization
+                    plot_cols = [c for c in ['CFI', 'TLI'] if c in df_res.columns]
+                    if plot_cols:
+                        fig_comp = px.bar(df_res, x='Dataset', y=plot_cols, barmode='group',
+                                         title="Comparative Fit (Higher is Better)",
+                                         color_discrete_sequence=['#1e3a8a', '#3b82f6'])
+                        st.plotly_chart(fig_comp, use_container_width=True)
                 
-                # 1. Individual Years
-                for yr in available_years:
-                    df_yr = process_data(df_raw, qc_level, md_p_threshold, do_reversal, exclude_items, [yr])
-                    res = get_loadings(df_yr, f"Year {yr}")
-                    if res is not None: all_loadings.append(res)
+                    st.info("💡 **Interpretation:** CFI/TLI > 0.90 are acceptable; > 0.95 good. RMSEA/SRMR < 0.08 acceptable; < 0.05 good.")
                 
-                # 2. Merged Selection
-                if len(selected_years) > 1:
-                    res_merged = get_loadings(df_active, "Merged")
-                    if res_merged is not None: all_loadings.append(res_merged)
+                    # --- NEW: Loadings Comparison ---
+                    st.divider()
+                    st.subheader("📈 Cross-Dataset Factor Loadings Comparison")
+                    st.markdown("Compare how strongly each item loads onto its latent construct across datasets.")
                 
-                if all_loadings:
-                    # Merge all loading dataframes on Latent and Item
-                    df_comp_load = all_loadings[0]
-                    for df_next in all_loadings[1:]:
-                        df_comp_load = pd.merge(df_comp_load, df_next, on=['Latent', 'Item'], how='outer')
+                    if all_loadings:
+                        # Merge all loading dataframes on Latent and Item
+                        df_comp_load = all_loadings[0]
+                        for df_next in all_loadings[1:]:
+                            df_comp_load = pd.merge(df_comp_load, df_next, on=['Latent', 'Item'], how='outer')
                     
-                    # Display Table
-                    st.write("#### Standardized Loadings (β)")
-                    loading_cols = [c for c in df_comp_load.columns if 'Loading_' in c]
-                    st.dataframe(df_comp_load.style.background_gradient(subset=loading_cols, cmap='Blues', vmin=0, vmax=1).format({c: '{:.3f}' for c in loading_cols}), use_container_width=True)
+                        # Display Table
+                        st.write("#### Standardized Loadings (β)")
+                        loading_cols = [c for c in df_comp_load.columns if 'Loading_' in c]
+                        st.dataframe(df_comp_load.style.background_gradient(subset=loading_cols, cmap='Blues', vmin=0, vmax=1).format({c: '{:.3f}' for c in loading_cols}), use_container_width=True)
                     
-                    # Visualization: Stability of Loadings
-                    df_melt = df_comp_load.melt(id_vars=['Latent', 'Item'], value_vars=loading_cols, var_name='Dataset', value_name='Loading')
-                    df_melt['Dataset'] = df_melt['Dataset'].str.replace('Loading_', '')
+                        # Visualization: Stability of Loadings
+                        df_melt = df_comp_load.melt(id_vars=['Latent', 'Item'], value_vars=loading_cols, var_name='Dataset', value_name='Loading')
+                        df_melt['Dataset'] = df_melt['Dataset'].str.replace('Loading_', '')
                     
-                    fig_load = px.bar(df_melt, x='Item', y='Loading', color='Dataset', barmode='group', 
-                                     facet_col='Latent', facet_col_wrap=2,
-                                     title="Latent Structure Stability (Comparative Loadings)",
-                                     color_discrete_sequence=px.colors.qualitative.Prism)
-                    fig_load.update_yaxes(range=[0, 1])
-                    fig_load.update_layout(height=800)
-                    st.plotly_chart(fig_load, use_container_width=True)
+                        fig_load = px.bar(df_melt, x='Item', y='Loading', color='Dataset', barmode='group', 
+                                         facet_col='Latent', facet_col_wrap=2,
+                                         title="Latent Structure Stability (Comparative Loadings)",
+                                         color_discrete_sequence=px.colors.qualitative.Prism)
+                        fig_load.update_yaxes(range=[0, 1])
+                        fig_load.update_layout(height=800)
+                        st.plotly_chart(fig_load, use_container_width=True)
                     
-                    st.info("💡 **Insight:** High stability across years indicates 'Measurement Invariance'—the items mean the same thing to different cohorts.")
+                        st.info("💡 **Insight:** High stability across years indicates 'Measurement Invariance'—the items mean the same thing to different cohorts.")
+                    else:
+                        st.warning("Could not calculate loadings for subsets.")
                 else:
-                    st.warning("Could not calculate loadings for subsets.")
-            else:
-                st.error("Insufficient data or model failure in subsets. Ensure enough items are active.")
+                    st.error("Insufficient data or model failure in subsets. Ensure enough items are active.")
 
 else:
     st.info("Awaiting pipeline completion to load harmonized data...")
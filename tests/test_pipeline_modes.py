@@ -0,0 +1,46 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'scripts'))
+
+from pipeline_runner import STAGE_MAP
+
+# In-process runs hand frames from stage to stage in memory; subprocess runs read the
+# flushed CSVs back. Both must produce byte-identical artifacts (e.g. the Ward partitions
+# in clustering are sensitive to the last bit of the factor scores).
+
+STAGES = ['prep', 'clustering']
+TREE = ['main.py', 'scripts', 'benchmarks', '00_raw', '01_harmonized', '02_eda', '03_sem', '05_clustering', '06_reports']
+
+def run_mode(tree, mode):
+    subprocess.run([sys.executable, 'main.py', '--mode', mode, '--force-all'] + STAGES,
+                   cwd=tree, check=True, capture_output=True)
+    outputs = {}
+    for name in STAGES:
+        for path in STAGE_MAP[name].outputs:
+            with open(os.path.join(tree, path), 'rb') as f:
+                outputs[path] = f.read()
+    return outputs
+
+@pytest.fixture(scope='module')
+def tree(tmp_path_factory):
+    tree = tmp_path_factory.mktemp('pipeline')
+    for name in TREE:
+        src = os.path.join(ROOT_DIR, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, tree / name, ignore=shutil.ignore_patterns('__pycache__'))
+        else:
+            shutil.copy2(src, tree / name)
+    return tree
+
+def test_inprocess_matches_subprocess(tree):
+    pytest.importorskip('semopy')
+    subprocess_outputs = run_mode(tree, 'subprocess')
+    inprocess_outputs = run_mode(tree, 'inprocess')
+    differ = [path for path in subprocess_outputs if inprocess_outputs[path] != subprocess_outputs[path]]
+    assert not differ